@@ -0,0 +1,317 @@
+"""Canned product and service answers, ranked with an in-memory BM25 index"""
+
+import math
+import re
+from functools import lru_cache
+
+from keyword_matching import COMPREHENSIVE_KEYWORD_MAPPING
+
+PRODUCT_CATEGORIES = ['inventory', 'payroll', 'crewing', 'tms', 'procurement']
+SERVICE_CATEGORIES = ['custom_development', 'mobile', 'ai_ml', 'data_services', 'integration', 'chatbot']
+
+# =============================================================================
+# CANNED ANSWERS
+# =============================================================================
+# Each answer is indexed on its text plus its category's keyword list (or an
+# explicit 'keywords' list), so a new product is added here as data.
+
+CANNED_ANSWERS = [
+    {
+        'category': 'inventory',
+        'kind': 'product',
+        'answer': """**AniSol Inventory Control** - Fleet inventory management SOFTWARE for tracking spares and consumables across vessels.
+
+**Key Features:**
+• Software for tracking spares & consumables inventory
+• Real-time ROB (Remaining Onboard) monitoring system
+• Automated reordering and shortage alert software
+• Integration with maintenance and procurement systems
+• Fleet-wide visibility and audit compliance tools
+
+*We provide inventory management SOFTWARE - not physical supplies or chandlery services.*
+
+Contact info@aniketsolutions.com for software implementation.""",
+    },
+    {
+        'category': 'payroll',
+        'kind': 'product',
+        'answer': """**AniSol Payroll & Master Cash** - Maritime crew financial management SOFTWARE with compliance features.
+
+**Key Features:**
+• Automated payroll software with overtime and allowances
+• Multi-currency support and exchange rate systems
+• Digital master's cash and petty cash management
+• Portage bill generation and audit trail software
+• Integration with accounting systems
+
+*We provide payroll management SOFTWARE - not financial services or banking.*
+
+Contact info@aniketsolutions.com for software setup consultation.""",
+    },
+    {
+        'category': 'crewing',
+        'kind': 'product',
+        'answer': """**AniSol Crewing Module** - Complete crew lifecycle management SOFTWARE for maritime operations.
+
+**Key Features:**
+• Crew scheduling and deployment planning software
+• Digital document and certification management
+• STCW and MLC compliance tracking systems
+• Performance appraisals and training record software
+• Payroll and cash management integration
+
+*We provide crew management SOFTWARE - not recruitment or manning services.*
+
+Contact info@aniketsolutions.com for software consultation.""",
+    },
+    {
+        'category': 'tms',
+        'kind': 'product',
+        'answer': """**AniSol TMS** - Technical Management SOFTWARE for maritime maintenance and compliance tracking.
+
+**Key Features:**
+• Planned and unplanned maintenance scheduling software
+• PSC inspection and class survey tracking systems
+• Digital work order management and history
+• Certificate lifecycle management software
+• Integration with inventory for spare parts tracking
+
+*We provide maintenance management SOFTWARE - not physical repair or drydocking services.*
+
+Contact info@aniketsolutions.com for software implementation.""",
+    },
+    {
+        'category': 'procurement',
+        'kind': 'product',
+        'answer': """**AniSol Procurement** - AI-powered maritime purchasing management SOFTWARE with vendor tracking.
+
+**Key Features:**
+• Multi-type requisition management software
+• Vendor database and performance tracking systems
+• Automated approval workflow software
+• ShipServ integration and quote comparison tools
+• Budget control and audit logging systems
+
+*We provide procurement management SOFTWARE - not physical supplies or chandlery services.*
+
+Contact info@aniketsolutions.com for software setup.""",
+    },
+    {
+        'category': 'chatbot',
+        'kind': 'service',
+        'answer': """**AI Chatbot & Virtual Assistant Services** - Intelligent customer service automation with 24/7 support capabilities.
+
+**Key Features:**
+• Natural language conversation management
+• Multi-channel deployment (website, WhatsApp, SMS)
+• Smart escalation to human agents
+• CRM integration and analytics
+• Custom knowledge base training
+
+Contact info@aniketsolutions.com for chatbot implementation.""",
+    },
+    {
+        'category': 'custom_development',
+        'kind': 'service',
+        'answer': """**Custom Application Development** - Tailored software solutions for specific business requirements.
+
+**Key Features:**
+• Enterprise web and desktop applications
+• Modern frameworks (React, Angular, Node.js)
+• Database design and API development
+• Legacy system modernization
+• Cloud deployment and scaling
+
+Contact info@aniketsolutions.com for development consultation.""",
+    },
+    {
+        'category': 'mobile',
+        'kind': 'service',
+        'answer': """**Mobile Application Development** - Native and cross-platform mobile solutions.
+
+**Key Features:**
+• iOS and Android native development
+• Cross-platform solutions (React Native, Flutter)
+• Offline capabilities and data sync
+• Enterprise integration and security
+• App store deployment support
+
+Contact info@aniketsolutions.com for mobile development.""",
+    },
+    {
+        'category': 'ai_ml',
+        'kind': 'service',
+        'answer': """**AI & Machine Learning Services** - Intelligent automation and predictive analytics solutions.
+
+**Key Features:**
+• Predictive analytics and forecasting
+• Natural language processing
+• Computer vision and automation
+• Custom AI model development
+• Business intelligence integration
+
+Contact info@aniketsolutions.com for AI consultation.""",
+    },
+    {
+        'category': 'data_services',
+        'kind': 'service',
+        'answer': """**Data Services & Migration** - Database solutions and business intelligence platforms.
+
+**Key Features:**
+• Database migration and optimization
+• Data warehousing and analytics
+• Business intelligence dashboards
+• ETL processes and data integration
+• Cloud data platform setup
+
+Contact info@aniketsolutions.com for data consultation.""",
+    },
+    {
+        'category': 'integration',
+        'kind': 'service',
+        'answer': """**System Integration Services** - Connecting business applications and data flow automation.
+
+**Key Features:**
+• API development and management
+• ERP and CRM integration
+• Real-time data synchronization
+• Cloud and on-premise connectivity
+• Workflow automation
+
+Contact info@aniketsolutions.com for integration planning.""",
+    },
+]
+
+FALLBACK_ANSWERS = {
+    'product': """**AniSol Maritime Software Suite** - Integrated fleet management solutions:
+
+• **TMS** - Technical maintenance management
+• **Procurement** - AI-powered purchasing
+• **Inventory** - Fleet-wide stock control
+• **Crewing** - Crew lifecycle management
+• **Payroll** - Maritime financial management
+
+Contact info@aniketsolutions.com for product consultation.""",
+    'service': """**Technology Services Portfolio** - Comprehensive business technology solutions:
+
+• **Custom Development** - Tailored software solutions
+• **Mobile Apps** - iOS/Android development
+• **AI & ML** - Intelligent automation
+• **Data Services** - Migration and analytics
+• **Integration** - System connectivity
+• **Chatbots** - Customer service automation
+
+Contact info@aniketsolutions.com for service consultation.""",
+}
+
+# =============================================================================
+# BM25 RANKED RETRIEVAL
+# =============================================================================
+
+# Function words and the contact boilerplate every answer shares
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from',
+    'how', 'i', 'in', 'is', 'it', 'me', 'my', 'not', 'of', 'on', 'or', 'our', 'the', 'to',
+    'we', 'what', 'with', 'you', 'your', 'about', 'tell', 'need', 'want', 'any',
+    'contact', 'info', 'aniketsolutions', 'com'
+])
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of token lists, with an inverted index for lookup"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.document_count = len(documents)
+        self.document_lengths = [len(tokens) for tokens in documents]
+        self.average_length = sum(self.document_lengths) / max(self.document_count, 1)
+
+        self.postings = {}
+        for doc_id, tokens in enumerate(documents):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, frequency in counts.items():
+                self.postings.setdefault(token, []).append((doc_id, frequency))
+
+        self.idf = {
+            token: math.log(1 + (self.document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self.postings.items()
+        }
+
+    def score(self, query_tokens):
+        """Return {doc_id: score} for every document sharing a term with the query"""
+        scores = {}
+        for token in set(query_tokens):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for doc_id, frequency in self.postings[token]:
+                length_norm = 1 - self.b + self.b * self.document_lengths[doc_id] / self.average_length
+                term_score = idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + term_score
+        return scores
+
+
+# Below this BM25 score a ranked answer is not trusted and the query goes to the LLM
+MIN_ANSWER_SCORE = 3.0
+# Distinct query terms the answer must share: one rare word ("cost", "offline") scores
+# high on its own but says little about which answer the visitor wants
+MIN_MATCHED_TERMS = 2
+
+class AnswerStore:
+    """Table-driven canned answers with category lookup and BM25 ranked search"""
+
+    def __init__(self, answers, fallbacks, keyword_mapping=COMPREHENSIVE_KEYWORD_MAPPING):
+        self.answers = list(answers)
+        self.fallbacks = fallbacks
+        self.by_category = {entry['category']: entry for entry in self.answers}
+        documents = [
+            tokenize(entry['answer'] + ' ' + ' '.join(entry.get('keywords', keyword_mapping.get(entry['category'], []))))
+            for entry in self.answers
+        ]
+        self.document_terms = [frozenset(tokens) for tokens in documents]
+        self.index = BM25Index(documents)
+
+    def answer_for_category(self, category):
+        """Canned answer for a keyword-matched category, or None"""
+        entry = self.by_category.get(category)
+        return entry['answer'] if entry else None
+
+    def fallback_answer(self, kind):
+        """Portfolio overview for 'product' or 'service'"""
+        return self.fallbacks[kind]
+
+    def _rank(self, query_tokens, kind=None):
+        """(score, doc_id) pairs for answers sharing a term with the query, best first"""
+        scores = self.index.score(query_tokens)
+        return sorted(
+            ((score, doc_id) for doc_id, score in scores.items()
+             if kind is None or self.answers[doc_id]['kind'] == kind),
+            key=lambda pair: -pair[0]
+        )
+
+    def search(self, query, kind=None, limit=3):
+        """Return up to `limit` (score, entry) pairs, best first"""
+        return [(score, self.answers[doc_id]) for score, doc_id in self._rank(tokenize(query), kind)[:limit]]
+
+    def best_answer(self, query, kind=None, min_score=MIN_ANSWER_SCORE, min_terms=MIN_MATCHED_TERMS):
+        """Highest-ranked answer text if it clears min_score and shares min_terms query terms, else None"""
+        query_tokens = set(tokenize(query))
+        ranked = self._rank(query_tokens, kind)
+        if ranked and ranked[0][0] >= min_score:
+            doc_id = ranked[0][1]
+            if len(query_tokens & self.document_terms[doc_id]) >= min_terms:
+                return self.answers[doc_id]['answer']
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_answer_store():
+    """Shared AnswerStore, indexed on first use"""
+    return AnswerStore(CANNED_ANSWERS, FALLBACK_ANSWERS)
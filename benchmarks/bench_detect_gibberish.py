@@ -0,0 +1,43 @@
+"""Microbenchmark for the local gibberish checks at short and long message sizes
+
+Usage: python benchmarks/bench_detect_gibberish.py [--number 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gibberish import classify_with_language_model, detect_gibberish, get_language_model
+
+SAMPLE_TEXTS = {
+    "valid": "We need help with the inventory of spare parts on our vessels. ",
+    "keyboard mash": "please help asdf ",
+    "repeated pattern": "hello test123 hello ",
+}
+MESSAGE_SIZES = [10, 2000]
+
+def make_message(seed, size):
+    return (seed * (size // len(seed) + 1))[:size]
+
+def per_call_microseconds(function, text, number):
+    best = min(timeit.repeat(lambda: function(text), number=number, repeat=5))
+    return best / number * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args()
+
+    get_language_model()  # Exclude one-off training from the timings
+
+    print(f"{'check':30} {'sample':18} {'chars':>6} {'us/call':>10}")
+    for name, function in (("detect_gibberish", detect_gibberish),
+                           ("classify_with_language_model", classify_with_language_model)):
+        for label, seed in SAMPLE_TEXTS.items():
+            for size in MESSAGE_SIZES:
+                text = make_message(seed, size)
+                print(f"{name:30} {label:18} {size:>6} {per_call_microseconds(function, text, args.number):>10.2f}")
@@ -0,0 +1,61 @@
+"""Memory and lookup latency of SortedDomainSet against a plain set for a large synthetic blocklist
+
+Usage: python benchmarks/bench_domain_blocklist.py [--domains 500000] [--number 20000]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain_blocklist import SortedDomainSet
+
+TLDS = ["com", "net", "org", "io", "co.uk", "de", "ru"]
+
+def make_domains(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(5, 14))) + "." + rng.choice(TLDS)
+        for _ in range(count)
+    ]
+
+def traced_bytes(build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+def per_call_microseconds(function, queries, number):
+    cycle = (queries * (number // len(queries) + 1))[:number]
+    best = min(timeit.repeat(lambda: [function(query) for query in cycle], number=1, repeat=5))
+    return best / number * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domains", type=int, default=500000, help="blocklist size")
+    parser.add_argument("--number", type=int, default=20000, help="lookups per timing run")
+    args = parser.parse_args()
+
+    domains = make_domains(args.domains)
+    compact, compact_bytes = traced_bytes(lambda: SortedDomainSet(domains))
+    plain, plain_bytes = traced_bytes(lambda: {(domain + ".")[:-1] for domain in domains})  # Own the strings, as a loaded list would
+    listed = random.Random(1).sample(domains, 1000)
+    queries = {
+        "listed": listed,
+        "listed subdomain": ["mx1.eu." + domain for domain in listed],
+        "unlisted": ["corp-" + domain for domain in listed],
+    }
+
+    print(f"{args.domains} domains: SortedDomainSet {compact_bytes / 1e6:.1f} MB, set {plain_bytes / 1e6:.1f} MB")
+    print(f"{'query':18} {'in set us':>10} {'contains us':>12} {'suffix us':>10}")
+    for label, sample in queries.items():
+        print(f"{label:18} {per_call_microseconds(plain.__contains__, sample, args.number):>10.2f}"
+              f" {per_call_microseconds(compact.__contains__, sample, args.number):>12.2f}"
+              f" {per_call_microseconds(compact.match_suffix, sample, args.number):>10.2f}")
@@ -0,0 +1,85 @@
+"""Cold-start cost: import time per app module and the first full run of the Streamlit script
+
+Every measurement runs in a fresh interpreter, as after a sleeping instance wakes up.
+
+Usage: python benchmarks/bench_import_time.py [--top 10] [--no-app]
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "chat_assistant_With_OTP.py")
+
+MODULES = [
+    "streamlit", "openai", "boto3", "dns.asyncresolver", "numpy",
+    "keyword_matching", "answer_store", "gibberish", "response_cache",
+    "email_validation", "otp_mailer", "otp_store", "rate_limit", "domain_blocklist",
+    "health", "conversation_memory", "llm_gateway", "sqlite_wal",
+]
+
+FIRST_RUN = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=120).run()
+print(time.perf_counter() - start)
+print(len(app.exception))
+"""
+
+def run_python(arguments):
+    """Completed python subprocess in ROOT; exits with its stderr if it failed, so no partial timing is reported"""
+    completed = subprocess.run([sys.executable, *arguments], capture_output=True, text=True, cwd=ROOT)
+    if completed.returncode:
+        errors = "\n".join(line for line in completed.stderr.splitlines() if not line.startswith("import time:"))
+        sys.exit(f"python {' '.join(arguments)[:60]}... exited with {completed.returncode}:\n{errors[-2000:]}")
+    return completed
+
+def import_times(statement, top_level_only=False):
+    """{module: cumulative microseconds} from python -X importtime for one statement"""
+    stderr = run_python(["-X", "importtime", "-c", statement]).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        nested = name.startswith("  ")  # importtime indents modules imported by other modules
+        if cumulative.strip().isdigit() and not (top_level_only and nested):
+            times[name.strip()] = int(cumulative)
+    return times
+
+def first_run_seconds(path=APP_PATH):
+    """Wall time of the first AppTest run of the app in a fresh interpreter, and its exception count"""
+    stdout = run_python(["-c", FIRST_RUN.format(path=path)]).stdout.split()
+    return float(stdout[-2]), int(stdout[-1])
+
+def module_imports(path=APP_PATH):
+    """The module-level import statements of a script, as source (multi-line imports included)"""
+    with open(path, encoding="utf-8") as source_file:
+        source = source_file.read()
+    return "\n".join(ast.get_source_segment(source, node) for node in ast.parse(source).body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list for the app script")
+    parser.add_argument("--no-app", action="store_true", help="skip the first-run timing of the app")
+    args = parser.parse_args()
+
+    print(f"{'module':22} {'import ms':>10}")
+    for module in MODULES:
+        print(f"{module:22} {import_times(f'import {module}').get(module, 0) / 1000:>10.1f}")
+
+    # What the app script imports at module level, without running it
+    top_level = import_times(module_imports(), top_level_only=True)
+    print(f"\napp imports: {sum(top_level.values()) / 1000:.1f} ms; heaviest:")
+    for name, micros in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:20} {micros / 1000:>8.1f} ms")
+
+    if not args.no_app:
+        seconds, exceptions = first_run_seconds()
+        print(f"\nfirst app run (imports + first paint): {seconds * 1000:.0f} ms, exceptions: {exceptions}")
@@ -0,0 +1,88 @@
+"""Tail latency of LLM answers through LlmGateway (with and without hedging) against a plain client,
+during simulated provider incidents
+
+Runs against benchmarks/fake_openai_server.py in-process; needs the openai package.
+
+Usage: python benchmarks/bench_llm_gateway.py [--calls 40] [--concurrency 4] [--hang-seconds 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI
+
+from fake_openai_server import Behaviour, FakeOpenAIServer
+from llm_gateway import CircuitBreaker, HedgePolicy, LlmGateway, LlmUnavailable, LocalTier, OpenAITier
+
+MESSAGES = [{"role": "user", "content": "What does the crewing module cost for 12 vessels?"}]
+
+def scenarios(hang_seconds):
+    return {
+        "healthy": {"*": Behaviour()},
+        "gpt-4 10% slow 4s": {"gpt-4": Behaviour(hang_rate=0.1, hang_seconds=4.0), "*": Behaviour()},
+        "gpt-4 30% 429": {"gpt-4": Behaviour(error_rate=0.3, status=429), "*": Behaviour()},
+        "gpt-4 20% hangs": {"gpt-4": Behaviour(hang_rate=0.2, hang_seconds=hang_seconds), "*": Behaviour()},
+        "gpt-4 down (500)": {"gpt-4": Behaviour(error_rate=1.0, status=500), "*": Behaviour()},
+        "all models down": {"*": Behaviour(error_rate=1.0, status=503)},
+    }
+
+def make_gateway(client, hedge=None):
+    return LlmGateway([
+        OpenAITier("gpt-4", client, "gpt-4", breaker=CircuitBreaker(3, 30.0)),
+        OpenAITier("gpt-3.5-turbo", client, "gpt-3.5-turbo", breaker=CircuitBreaker(3, 30.0)),
+        LocalTier("canned", lambda messages: "Contact info@aniketsolutions.com"),
+    ], deadline=6.0, attempt_timeout=3.0, hedge=hedge)
+
+def plain_call(client):
+    """The call as the app made it before the gateway: default timeout and SDK retries"""
+    response = client.chat.completions.create(model="gpt-4", messages=MESSAGES)
+    return response.choices[0].message.content, "gpt-4"
+
+def run(call, calls, concurrency):
+    def timed(_):
+        started = time.perf_counter()
+        try:
+            tier = call()[1]
+        except (LlmUnavailable, Exception):
+            tier = "error"
+        return time.perf_counter() - started, tier
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed, range(calls)))
+    latencies = sorted(latency for latency, tier in results)
+    tiers = {}
+    for latency, tier in results:
+        tiers[tier] = tiers.get(tier, 0) + 1
+    return latencies, tiers
+
+def percentile(latencies, share):
+    return latencies[int(share * (len(latencies) - 1))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hang-seconds", type=float, default=20.0, help="stall of a hung request")
+    args = parser.parse_args()
+
+    print(f"{'scenario':18} {'client':8} {'p50 s':>6} {'p95 s':>6} {'max s':>6}  answers by tier")
+    for name, behaviours in scenarios(args.hang_seconds).items():
+        server = FakeOpenAIServer(behaviours, seed=7)
+        client = OpenAI(api_key="sk-fake", base_url=server.start())
+        gateway = make_gateway(client)
+        hedged = make_gateway(client, HedgePolicy(initial_delay=1.0, min_samples=10, max_ratio=0.2))
+        for label, call in (("plain", lambda: plain_call(client)),
+                            ("gateway", lambda: gateway.complete(MESSAGES)),
+                            ("hedged", lambda: hedged.complete(MESSAGES))):
+            latencies, tiers = run(call, args.calls, args.concurrency)
+            print(f"{name:18} {label:8} {percentile(latencies, 0.5):>6.2f} {percentile(latencies, 0.95):>6.2f}"
+                  f" {latencies[-1]:>6.2f}  {tiers}")
+        hedges = hedged.stats()['hedges']
+        print(f"{'':18} hedges fired {hedges['fired']}/{hedges['races']}, won {hedges['won']}")
+        server.stop()
@@ -0,0 +1,104 @@
+"""Local stub DNS server (UDP) with fixed zones and injectable per-domain delays
+
+Point email validation at it with DNS_NAMESERVERS=127.0.0.1 DNS_PORT=5353, or pass
+make_async_resolver(["127.0.0.1"], port) in code. Names missing from the zones are
+NXDOMAIN; a known name without the asked record type gets an empty (NoAnswer) reply.
+
+Usage: python benchmarks/fake_dns_server.py [--port 5353] [--delay 0.0]
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+import dns.exception
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+ZONES = {
+    "acme.test": {"MX": ["10 mail.acme.test."], "A": ["192.0.2.10"]},
+    "web-only.test": {"A": ["192.0.2.20"]},
+    "txt-only.test": {"TXT": ['"v=spf1 -all"']},
+}
+
+class FakeDnsServer:
+    """
+    Threaded UDP stub server; start() returns the (host, port) to give the resolver
+    delays maps a domain, a (domain, record type) pair or "*" (the default) to seconds before the reply
+    """
+
+    def __init__(self, zones=None, delays=None, host="127.0.0.1", port=0, ttl=60):
+        self.zones = {name.lower().rstrip("."): records for name, records in (zones or ZONES).items()}
+        self.delays = delays or {}
+        self.ttl = ttl
+        self.queries = []  # (domain, record type) in arrival order
+        self._lock = threading.Lock()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+
+    def delay(self, domain, rdtype):
+        return self.delays.get((domain, rdtype), self.delays.get(domain, self.delays.get("*", 0.0)))
+
+    def response(self, query):
+        """Reply to a parsed query from the zones"""
+        question = query.question[0]
+        domain = question.name.to_text().lower().rstrip(".")
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        response = dns.message.make_response(query)
+        records = self.zones.get(domain)
+        if records is None:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif records.get(rdtype):
+            response.answer.append(dns.rrset.from_text_list(question.name, self.ttl, "IN", rdtype, records[rdtype]))
+        return response
+
+    def _reply(self, query, address):
+        question = query.question[0]
+        domain = question.name.to_text().lower().rstrip(".")
+        time.sleep(self.delay(domain, dns.rdatatype.to_text(question.rdtype)))
+        try:
+            self.socket.sendto(self.response(query).to_wire(), address)
+        except OSError:
+            pass  # Stopped while the reply was delayed
+
+    def _serve(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(4096)
+            except OSError:
+                return  # Socket closed by stop()
+            try:
+                query = dns.message.from_wire(data)
+            except dns.exception.DNSException:
+                continue
+            question = query.question[0]
+            with self._lock:
+                self.queries.append((question.name.to_text().lower().rstrip("."),
+                                     dns.rdatatype.to_text(question.rdtype)))
+            # Each reply on its own thread, so a delayed answer does not hold up the others
+            threading.Thread(target=self._reply, args=(query, address), daemon=True).start()
+
+    def start(self):
+        threading.Thread(target=self._serve, name="fake-dns", daemon=True).start()
+        return self.socket.getsockname()[:2]
+
+    def stop(self):
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=5353)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds before every reply")
+    args = parser.parse_args()
+
+    server = FakeDnsServer(delays={"*": args.delay}, port=args.port)
+    host, port = server.start()
+    print(f"Stub DNS server on {host}:{port} for {', '.join(ZONES)} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,144 @@
+"""Local fake of the OpenAI chat completions API with injectable latency, errors and hangs
+
+Point the app (or any openai client) at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+and any OPENAI_API_KEY. Behaviour is set per model, "*" being the default.
+
+Usage: python benchmarks/fake_openai_server.py [--port 8900] [--latency 0.5]
+       [--error-rate 0.0] [--status 429] [--hang-rate 0.0] [--fail-model gpt-4]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("Our specialists can walk you through the options for your fleet. "
+          "Contact info@aniketsolutions.com for a detailed consultation.")
+
+@dataclass
+class Behaviour:
+    latency: float = 0.2        # Seconds before the first byte
+    token_delay: float = 0.01   # Seconds between streamed tokens
+    error_rate: float = 0.0     # Share of requests answered with `status`
+    status: int = 429
+    hang_rate: float = 0.0      # Share of requests that stall for hang_seconds
+    hang_seconds: float = 60.0
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients that time out hang up mid-response; that is the point of the exercise
+
+class FakeOpenAIServer:
+    """Threaded fake server; start() returns the base_url to give the openai client"""
+
+    def __init__(self, behaviours=None, host="127.0.0.1", port=0, seed=None):
+        self.behaviours = behaviours or {"*": Behaviour()}
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.requests_by_model = {}
+        self._lock = threading.Lock()
+        self.server = _QuietServer((host, port), self._handler())
+
+    def behaviour(self, model):
+        return self.behaviours.get(model) or self.behaviours.get("*") or Behaviour()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._json(404, {"error": {"message": "not found"}})
+                model = body.get("model", "")
+                with fake._lock:
+                    fake.requests += 1
+                    fake.requests_by_model[model] = fake.requests_by_model.get(model, 0) + 1
+                behaviour = fake.behaviour(model)
+                roll = fake.random.random()
+                if roll < behaviour.hang_rate:
+                    time.sleep(behaviour.hang_seconds)
+                time.sleep(behaviour.latency)
+                if fake.random.random() < behaviour.error_rate:
+                    headers = {"retry-after": "0.2"} if behaviour.status == 429 else {}
+                    return self._json(behaviour.status, {"error": {"message": f"fake {behaviour.status}",
+                                                                   "type": "fake_error"}}, headers)
+                if body.get("stream"):
+                    return self._stream(model, behaviour)
+                self._json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion",
+                    "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": ANSWER}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, model, behaviour):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+                for token in ANSWER.split(" "):
+                    chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": token + " "},
+                                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(behaviour.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True).start()
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first byte")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--status", type=int, default=429, help="HTTP status of failed requests")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="share of requests that stall for 60 s")
+    parser.add_argument("--fail-model", action="append", default=[], help="model that always fails with --status")
+    args = parser.parse_args()
+
+    behaviours = {"*": Behaviour(latency=args.latency, error_rate=args.error_rate, status=args.status,
+                                 hang_rate=args.hang_rate)}
+    for model in args.fail_model:
+        behaviours[model] = Behaviour(latency=args.latency, error_rate=1.0, status=args.status)
+    server = FakeOpenAIServer(behaviours, port=args.port)
+    print(f"Fake OpenAI API on {server.start()} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,20 +1,25 @@
 import streamlit as st
-from openai import OpenAI
-import time
-from datetime import datetime, timedelta
-import json
-import re
-import dns.resolver
-import socket
-from urllib.parse import urlparse
-import requests
-from bs4 import BeautifulSoup
+from datetime import datetime
 import os
 from dotenv import load_dotenv
-import boto3
-from botocore.exceptions import ClientError
 import random
 import string
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from keyword_matching import get_best_match_category, correct_keyword_typos, get_category_index, get_keyword_term_index
+from answer_store import PRODUCT_CATEGORIES, SERVICE_CATEGORIES, get_answer_store
+from response_cache import SemanticResponseCache, TTLCache, content_hash
+from gibberish import detect_gibberish, classify_with_language_model, get_language_model
+from otp_store import OTP_MAX_ATTEMPTS, get_otp_store
+from rate_limit import (chat_limits, client_address, email_check_limits, format_retry_after, get_rate_limiter,
+                        llm_hedge_limits, otp_send_limits)
+from otp_mailer import OtpSendQueue, SesTransport, ensure_ses_template, make_ses_client
+from domain_blocklist import get_disposable_domains, get_personal_domains
+from health import HealthRegistry, KeepWarm, parse_ports, start_health_server
+from conversation_memory import ConversationMemory
+from llm_gateway import CircuitBreaker, HedgePolicy, LlmGateway, LlmUnavailable, LocalTier, OpenAITier
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,19 +34,218 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")  # Default to us-east-1
 SES_FROM_EMAIL = os.getenv("SES_FROM_EMAIL")  # Optional - will auto-detect if not specified
 VERIFICATION_BASE_URL = os.getenv("VERIFICATION_BASE_URL", "http://localhost:8501")  # Your app URL
 
-# Initialize OpenAI client
-client = None
-if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
-# Initialize AWS SES client
-ses_client = None
-if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
-    ses_client = boto3.client(
-        'ses',
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
+# LLM response cache configuration
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # Seconds (24 hours)
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.92"))  # Cosine threshold
+
+# Moderation and AI gibberish verdict cache (keyed by content hash)
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "10000"))
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", "3600"))  # Seconds (1 hour)
+
+# Stream LLM answers into the chat bubble token by token
+LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+
+# LLM fallback ladder: primary model -> cheaper model -> best local canned answer
+# (set OPENAI_BASE_URL to use another OpenAI-compatible endpoint, e.g. benchmarks/fake_openai_server.py)
+LLM_PRIMARY_MODEL = os.getenv("LLM_PRIMARY_MODEL", "gpt-4")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-3.5-turbo")  # Empty to skip this tier
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "20"))  # Seconds for a whole answer, all tiers included
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "10"))  # Seconds per request
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))  # Per model, on 429/5xx (timeouts: last model only)
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))  # Failed calls before a model is skipped
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))  # Seconds a model is skipped for
+LOCAL_ANSWER_MIN_SCORE = float(os.getenv("LOCAL_ANSWER_MIN_SCORE", "1.0"))  # BM25 score for the last tier
+
+# Hedged LLM requests: a model request still silent after the recent latency percentile
+# gets a second request; the first to finish wins (budgets: RATE_LIMIT_LLM_HEDGE_SESSION and _CLIENT)
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "3"))  # Seconds, until latencies are known
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")  # Optional - cheaper model for hedges (default: the same model)
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))  # Share of recent calls that may hedge
+
+# Background OTP email delivery (throttled sends are retried with backoff)
+OTP_SEND_WORKERS = int(os.getenv("OTP_SEND_WORKERS", "4"))
+OTP_SEND_ATTEMPTS = int(os.getenv("OTP_SEND_ATTEMPTS", "4"))
+SES_MAX_POOL_CONNECTIONS = int(os.getenv("SES_MAX_POOL_CONNECTIONS", "10"))
+SES_SENDER_REFRESH = int(os.getenv("SES_SENDER_REFRESH", "3600"))  # Seconds to reuse an auto-detected sender
+SES_TEMPLATE_NAME = os.getenv("SES_TEMPLATE_NAME")  # Optional - send OTPs with a stored SES template
+
+# Chat history display: messages shown before the "show earlier messages" button
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "30"))
+CHAT_MESSAGE_LIMIT = int(os.getenv("CHAT_MESSAGE_LIMIT", "500"))  # Oldest messages are dropped past this
+
+# Conversation memory sent to the LLM: recent turns verbatim, older ones as a rolling summary
+CONVERSATION_MEMORY_TURNS = int(os.getenv("CONVERSATION_MEMORY_TURNS", "6"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "200"))
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "3000"))  # Prompt budget (estimated locally)
+
+# Health probes (/healthz, /readyz) on their own port, and a per-process keep-warm task
+# Per process: a range such as 8502-8509 lets each app process on a host bind the next free port
+HEALTH_PORT = os.getenv("HEALTH_PORT", "8502")  # 0 disables the probe server
+HEALTH_HOST = os.getenv("HEALTH_HOST", "127.0.0.1")  # 0.0.0.0 to expose the probes beyond this host
+KEEP_WARM_URL = os.getenv("KEEP_WARM_URL")  # Optional - public app URL pinged from the server, not from each tab
+KEEP_WARM_INTERVAL = int(os.getenv("KEEP_WARM_INTERVAL", "240"))  # Seconds
+BROWSER_HEARTBEAT = os.getenv("BROWSER_HEARTBEAT", "false").lower() == "true"  # Legacy in-page heartbeat script
+
+# Start generating the answer while the remote content checks are still running
+# (costs an LLM call for messages that end up rejected, so off by default)
+SPECULATIVE_ANSWERS = os.getenv("SPECULATIVE_ANSWERS", "false").lower() == "true"
+
+LOCAL_ANSWER_TIER = "canned answers"
+
+# Heavy dependencies (openai, boto3, dnspython) are imported on first use inside the
+# factories and handlers below, so a woken-up instance paints the email step sooner
+
+@st.cache_resource
+def get_openai_client(api_key):
+    """One OpenAI client per API key for the whole process"""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+def env_openai_client():
+    """Client for OPENAI_API_KEY from .env (used by the moderation checks), or None"""
+    return get_openai_client(OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+def local_canned_answer(messages):
+    """Last tier of the LLM ladder: best canned answer for the user's message, on a lower bar"""
+    return get_answer_store().best_answer(messages[-1]["content"], min_score=LOCAL_ANSWER_MIN_SCORE, min_terms=1)
+
+@st.cache_resource
+def get_llm_gateway(api_key):
+    """LLM fallback ladder for one API key; its circuit breakers are shared by every session using it"""
+    client = get_openai_client(api_key)
+    params = {'temperature': 0.2, 'max_tokens': 600, 'presence_penalty': 0.0, 'frequency_penalty': 0.0}
+    models = [model for model in (LLM_PRIMARY_MODEL, LLM_FALLBACK_MODEL) if model]
+    tiers = [
+        OpenAITier(model, client, model, max_attempts=LLM_MAX_ATTEMPTS,
+                   breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET), **params)
+        for model in dict.fromkeys(models)
+    ]
+    hedge = None
+    if LLM_HEDGING:
+        hedge_tier = None
+        if LLM_HEDGE_MODEL:
+            hedge_tier = next((tier for tier in tiers if tier.name == LLM_HEDGE_MODEL), None) or OpenAITier(
+                LLM_HEDGE_MODEL, client, LLM_HEDGE_MODEL,
+                breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET), **params
+            )
+        hedge = HedgePolicy(percentile=LLM_HEDGE_PERCENTILE, initial_delay=LLM_HEDGE_INITIAL_DELAY,
+                            max_ratio=LLM_HEDGE_MAX_RATIO, hedge_tier=hedge_tier)
+    tiers.append(LocalTier(LOCAL_ANSWER_TIER, local_canned_answer))
+    return LlmGateway(tiers, deadline=LLM_DEADLINE, attempt_timeout=LLM_ATTEMPT_TIMEOUT, hedge=hedge)
+
+def session_llm_gateway():
+    """LLM gateway for the API key this session chats with, or None"""
+    api_key = st.session_state.get("api_key")
+    return get_llm_gateway(api_key) if api_key else None
+
+def session_hedge_budget():
+    """allow_hedge callback spending this session's and client's hedge budget (safe to call off the script thread)"""
+    limits = llm_hedge_limits(st.session_state.rate_limit_id, rate_limit_client())
+    return lambda: get_rate_limiter().hit(limits)[0]
+
+@st.cache_resource
+def get_ses_client():
+    """Process-wide pooled SES client, or None when AWS credentials are missing"""
+    if not (AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY):
+        return None
+    return make_ses_client(
+        AWS_ACCESS_KEY_ID,
+        AWS_SECRET_ACCESS_KEY,
+        AWS_REGION,
+        max_pool_connections=SES_MAX_POOL_CONNECTIONS
+    )
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide cache of LLM answers, shared by every session"""
+    return SemanticResponseCache(
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl_seconds=RESPONSE_CACHE_TTL,
+        similarity_threshold=RESPONSE_CACHE_SIMILARITY
+    )
+
+@st.cache_resource
+def get_verdict_cache():
+    """Process-wide cache of moderation and AI gibberish verdicts, flagged or not"""
+    return TTLCache(max_entries=VERDICT_CACHE_SIZE, ttl_seconds=VERDICT_CACHE_TTL)
+
+@st.cache_resource
+def get_background_executor():
+    """Process-wide worker pool for network-bound checks and speculative answers"""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="chat-worker")
+
+def warm_chat_resources():
+    """Build the chat indexes and domain lists and import openai (idempotent)"""
+    get_category_index()
+    get_keyword_term_index()
+    get_answer_store()
+    get_language_model()
+    get_personal_domains()
+    get_disposable_domains()
+    import openai
+
+def chat_resources_ready():
+    """True once warm_chat_resources has built everything (readiness check)"""
+    factories = (get_category_index, get_keyword_term_index, get_answer_store, get_language_model,
+                 get_personal_domains, get_disposable_domains)
+    return all(factory.cache_info().currsize for factory in factories)
+
+@st.cache_resource
+def warm_up_chat_resources():
+    """Warm the chat resources in the background, once per process, after first paint"""
+    return get_background_executor().submit(warm_chat_resources)
+
+def sweep_rate_limiter():
+    limiter = get_rate_limiter()
+    if hasattr(limiter, "sweep"):
+        limiter.sweep()
+
+@st.cache_resource
+def get_health_services():
+    """
+    Probe server, keep-warm task and probe status text, once per process
+    The server is None when disabled or no port in HEALTH_PORT could be bound
+    """
+    registry = HealthRegistry()
+    registry.register("chat_resources", chat_resources_ready)
+    server = None
+    probe_status = "disabled"
+    if HEALTH_PORT != "0":
+        try:
+            server = start_health_server(registry, host=HEALTH_HOST, port=parse_ports(HEALTH_PORT))
+            host, port = server.server_address[:2]
+            probe_status = f"http://{host}:{port}/readyz"
+        except (OSError, ValueError) as e:
+            probe_status = f"not running ({e})"
+            print(f"Health probe server not started, this process has no /healthz or /readyz: {e}")
+    keep_warm = KeepWarm(
+        interval=KEEP_WARM_INTERVAL,
+        url=KEEP_WARM_URL,
+        tasks=[warm_chat_resources, get_otp_store().sweep, sweep_rate_limiter]
+    ).start()
+    return server, keep_warm, probe_status
+
+@st.cache_resource
+def get_otp_queue():
+    """Process-wide OTP send queue, or None when AWS SES is not configured"""
+    ses_client = get_ses_client()
+    if not ses_client:
+        return None
+    template_name = None
+    if SES_TEMPLATE_NAME:
+        try:
+            ensure_ses_template(ses_client, SES_TEMPLATE_NAME)
+            template_name = SES_TEMPLATE_NAME
+        except Exception as e:
+            print(f"SES template '{SES_TEMPLATE_NAME}' unavailable, sending inline emails: {e}")
+    return OtpSendQueue(
+        SesTransport(ses_client, SES_FROM_EMAIL, sender_refresh_interval=SES_SENDER_REFRESH,
+                     template_name=template_name),
+        max_workers=OTP_SEND_WORKERS,
+        max_attempts=OTP_SEND_ATTEMPTS
     )
 
 # Configure the page
@@ -53,11 +257,13 @@ st.set_page_config(
 )
 
 # =============================================================================
-# ADVANCED KEEP-ALIVE SYSTEM TO PREVENT STREAMLIT SLEEPING
+# ACTIVITY TRACKING AND KEEP-ALIVE
 # =============================================================================
+# Keeping the process warm is done server-side (get_health_services): one probe
+# server and one keep-warm thread per process, whatever the number of open tabs
 
 def keep_alive_system():
-    """Advanced keep-alive system to prevent Streamlit app from sleeping"""
+    """Track per-session activity (message count and last interaction time)"""
     
     # Initialize session state for activity tracking
     if "last_activity" not in st.session_state:
@@ -65,30 +271,19 @@ def keep_alive_system():
         st.session_state.app_start_time = datetime.now()
         st.session_state.interaction_count = 0
         st.session_state.last_message_count = 0
-        st.session_state.heartbeat_count = 0
-    
-    # Update activity timestamp on any interaction
-    current_time = datetime.now()
     
     # Track interactions (messages, button clicks, etc.)
     current_message_count = len(st.session_state.get("messages", []))
     if current_message_count > st.session_state.last_message_count:
-        st.session_state.last_activity = current_time
+        st.session_state.last_activity = datetime.now()
         st.session_state.interaction_count += 1
         st.session_state.last_message_count = current_message_count
-    
-    # Auto-refresh logic - refresh if inactive for 8 minutes
-    time_since_activity = current_time - st.session_state.last_activity
-    uptime = current_time - st.session_state.app_start_time
-    
-    # Refresh if inactive too long (but not immediately on first load)
-    if time_since_activity.total_seconds() > 480 and uptime.total_seconds() > 60:  # 8 minutes
-        st.session_state.last_activity = current_time
-        st.session_state.heartbeat_count += 1
-        st.rerun()
 
 def add_javascript_keepalive():
-    """Add comprehensive JavaScript keep-alive system"""
+    """Add the in-page JavaScript heartbeat (BROWSER_HEARTBEAT only), once per session"""
+    if not BROWSER_HEARTBEAT or st.session_state.get("heartbeat_injected"):
+        return
+    st.session_state.heartbeat_injected = True
     js_code = """
     <script>
     // Advanced Keep-alive system for Streamlit
@@ -157,55 +352,6 @@ def add_javascript_keepalive():
     """
     st.markdown(js_code, unsafe_allow_html=True)
 
-def add_auto_refresh():
-    """Add emergency auto-refresh to prevent long-term sleeping"""
-    refresh_code = """
-    <script>
-    // Emergency auto-refresh after 20 minutes
-    setTimeout(function(){
-        console.log('Emergency auto-refresh activated to prevent sleep...');
-        // Show user a brief message before refresh
-        if (confirm('App refreshing to maintain connection. Continue?')) {
-            window.location.reload(1);
-        } else {
-            window.location.reload(1); // Refresh anyway after 5 seconds
-        }
-    }, 1200000); // 20 minutes
-    </script>
-    """
-    st.markdown(refresh_code, unsafe_allow_html=True)
-
-def add_service_worker():
-    """Add service worker for background keep-alive"""
-    sw_code = """
-    <script>
-    // Register service worker for background activity
-    if ('serviceWorker' in navigator) {
-        const swCode = `
-            self.addEventListener('message', function(event) {
-                if (event.data && event.data.type === 'SKIP_WAITING') {
-                    self.skipWaiting();
-                }
-            });
-            
-            setInterval(() => {
-                fetch('/', {method: 'HEAD'}).catch(() => {});
-            }, 300000); // 5 minutes
-        `;
-        
-        const blob = new Blob([swCode], {type: 'application/javascript'});
-        const swUrl = URL.createObjectURL(blob);
-        
-        navigator.serviceWorker.register(swUrl).then(function(registration) {
-            console.log('Keep-alive service worker registered');
-        }).catch(function(error) {
-            console.log('Service worker registration failed:', error);
-        });
-    }
-    </script>
-    """
-    st.markdown(sw_code, unsafe_allow_html=True)
-
 # Avatar Configuration
 ALEX_AVATAR_URL = "https://raw.githubusercontent.com/AShirsat96/WebsiteChatbot/main/Alex_AI_Avatar.png"
 USER_AVATAR_URL = "https://api.dicebear.com/7.x/initials/svg?seed=User&backgroundColor=4f46e5&fontSize=40"
@@ -240,386 +386,6 @@ Services and Expertise:
 - Marine IoT solutions development
 """
 
-# =============================================================================
-# COMPREHENSIVE KEYWORD MAPPING FOR PRODUCTS AND SERVICES
-# =============================================================================
-
-INVENTORY_KEYWORDS = [
-    # Primary terms
-    'inventory', 'stock', 'spare', 'spares', 'consumable', 'consumables', 'stores', 'rob',
-    'parts', 'supplies', 'materials', 'warehouse', 'storage', 'stockroom',
-    
-    # Maritime-specific
-    'ship stores', 'vessel inventory', 'marine supplies', 'deck stores', 'engine room stores',
-    'provision stores', 'slop chest', 'bond stores', 'ship chandler', 'chandlery',
-    
-    # Operational terms
-    'reorder', 'requisition', 'shortage', 'stock level', 'stock control', 'asset tracking',
-    'store keeping', 'storekeeping', 'procurement requisition', 'stock management',
-    'remaining onboard', 'onboard inventory', 'ship inventory', 'fleet inventory',
-    
-    # Technical terms
-    'component mapping', 'spare parts management', 'consumable tracking', 'stock alerts',
-    'inventory optimization', 'stock rotation', 'expiry tracking', 'shelf life',
-    'inventory audit', 'stock count', 'cycle counting', 'stock reconciliation'
-]
-
-PAYROLL_KEYWORDS = [
-    # Primary terms
-    'payroll', 'wages', 'salary', 'cash', 'crew payment', 'master cash', 'pay', 
-    'compensation', 'finance', 'money', 'advance', 'payment',
-    
-    # Maritime-specific
-    'crew wages', 'seafarer pay', 'maritime payroll', 'ship payroll', 'vessel payroll',
-    'portage bill', 'crew account', 'seaman wages', 'mariner pay', 'sailor wages',
-    'crew compensation', 'maritime salary', 'ship crew pay',
-    
-    # Financial terms
-    'overtime', 'bonus', 'allowance', 'deduction', 'allotment', 'tax', 'contribution',
-    'salary advance', 'cash advance', 'loan', 'fine', 'penalty', 'reimbursement',
-    'petty cash', 'cash management', 'crew cash', 'onboard cash',
-    
-    # Currency & banking
-    'multi currency', 'exchange rate', 'currency conversion', 'foreign exchange',
-    'bank transfer', 'wire transfer', 'remittance', 'crew banking',
-    
-    # Compliance
-    'mla compliance', 'flag state requirements', 'crew contract', 'employment agreement'
-]
-
-CREWING_KEYWORDS = [
-    # Primary terms
-    'crew', 'crewing', 'staff', 'personnel', 'maritime crew', 'seafarer', 'seafarers',
-    'manning', 'human resources', 'hr', 'employee', 'employees', 'crew management',
-    
-    # Maritime roles
-    'captain', 'master', 'chief officer', 'engineer', 'bosun', 'seaman', 'able seaman',
-    'ordinary seaman', 'deck crew', 'engine crew', 'galley crew', 'steward', 'cook',
-    'chief engineer', 'second engineer', 'third engineer', 'oiler', 'wiper', 'fitter',
-    
-    # Crew operations
-    'crew scheduling', 'crew rotation', 'crew deployment', 'crew planning', 'shift management',
-    'watch keeping', 'duty roster', 'crew roster', 'manning schedule', 'crew assignment',
-    'embarkation', 'disembarkation', 'sign on', 'sign off', 'crew change',
-    
-    # Documentation & compliance
-    'crew documents', 'certificates', 'endorsements', 'stcw', 'mlc', 'flag state',
-    'medical certificate', 'passport', 'visa', 'seamans book', 'discharge book',
-    'coc', 'certificate of competency', 'endorsement', 'training records',
-    
-    # Performance & development
-    'crew appraisal', 'performance review', 'competency assessment', 'training',
-    'crew evaluation', 'performance management', 'skill assessment', 'crew development',
-    'crew performance', 'crew rating', 'crew feedback'
-]
-
-TMS_KEYWORDS = [
-    # Primary terms
-    'tms', 'maintenance', 'technical', 'planned maintenance', 'pms', 'repair', 'repairs',
-    'equipment', 'machinery', 'technical management', 'maintenance management',
-    
-    # Maintenance types
-    'preventive maintenance', 'corrective maintenance', 'predictive maintenance',
-    'condition based maintenance', 'routine maintenance', 'scheduled maintenance',
-    'unplanned maintenance', 'emergency repair', 'breakdown', 'overhaul',
-    
-    # Maritime equipment
-    'engine', 'main engine', 'auxiliary engine', 'generator', 'pump', 'compressor',
-    'boiler', 'heat exchanger', 'separator', 'purifier', 'winch', 'crane', 'hatch cover',
-    'steering gear', 'propeller', 'shaft', 'bearing', 'valve', 'pipe', 'tank',
-    
-    # Inspections & surveys (REMOVED "dry dock" from here)
-    'inspection', 'survey', 'class survey', 'intermediate survey',
-    'annual survey', 'special survey', 'psc', 'port state control', 'flag state inspection',
-    'vetting inspection', 'internal audit', 'safety inspection',
-    
-    # Certificates & compliance
-    'certificate', 'class certificate', 'safety certificate', 'statutory certificate',
-    'renewal', 'extension', 'endorsement', 'survey due', 'certificate expiry',
-    
-    # Work orders & documentation
-    'work order', 'job card', 'maintenance report', 'defect', 'non conformity',
-    'finding', 'observation', 'maintenance log', 'engine log', 'technical log',
-    
-    # Technical systems
-    'condition monitoring', 'vibration monitoring', 'oil analysis', 'performance monitoring',
-    'alarm system', 'automation', 'control system', 'instrumentation'
-]
-
-PROCUREMENT_KEYWORDS = [
-    # Primary terms
-    'procurement', 'purchasing', 'supplier', 'vendor', 'po', 'purchase order',
-    'buying', 'sourcing', 'rfq', 'request for quotation', 'quotation', 'quote',
-    
-    # Maritime procurement
-    'ship supply', 'vessel supply', 'marine supply', 'port supply', 'ship chandler',
-    'bunker', 'fuel', 'lubricant', 'provisions', 'fresh water', 'technical supply',
-    
-    # Procurement processes
-    'requisition', 'purchase requisition', 'approval', 'authorization', 'budget approval',
-    'vendor selection', 'supplier evaluation', 'price comparison', 'negotiation',
-    'contract', 'framework agreement', 'blanket order', 'spot purchase',
-    
-    # Supply chain
-    'delivery', 'shipment', 'logistics', 'freight', 'customs', 'port agent',
-    'local agent', 'emergency supply', 'urgent supply', 'stock replenishment',
-    
-    # Vendor management
-    'vendor management', 'supplier management', 'vendor assessment', 'supplier audit',
-    'vendor performance', 'supplier rating', 'approved vendor list', 'blacklist',
-    
-    # Integration platforms
-    'shipserv', 'marine marketplace', 'e-procurement', 'digital procurement',
-    'procurement portal', 'supplier portal', 'catalog', 'price list',
-    
-    # Financial terms
-    'invoice', 'payment', 'accounts payable', 'cost control', 'budget management',
-    'cost analysis', 'spend analysis', 'savings', 'cost reduction'
-]
-
-CUSTOM_DEVELOPMENT_KEYWORDS = [
-    # Primary terms
-    'custom', 'development', 'software', 'application', 'web app', 'webapp',
-    'bespoke', 'tailored', 'build', 'create', 'develop', 'programming',
-    
-    # Development types
-    'custom software', 'enterprise software', 'business application', 'web application',
-    'desktop application', 'cloud application', 'saas', 'software as a service',
-    'enterprise solution', 'business solution', 'digital solution',
-    
-    # Technologies
-    'react', 'angular', 'vue', 'node.js', 'python', 'java', 'dot net', '.net',
-    'javascript', 'typescript', 'php', 'ruby', 'c#', 'mysql', 'postgresql',
-    'mongodb', 'oracle', 'sql server', 'database', 'api', 'rest api', 'graphql',
-    
-    # Project types
-    'legacy modernization', 'system upgrade', 'digital transformation',
-    'business automation', 'workflow automation', 'process automation',
-    'enterprise integration', 'system integration', 'platform development',
-    
-    # Industries
-    'maritime software', 'shipping software', 'fleet management software',
-    'healthcare software', 'financial software', 'manufacturing software',
-    'logistics software', 'supply chain software', 'erp', 'crm', 'hrms'
-]
-
-MOBILE_KEYWORDS = [
-    # Primary terms
-    'mobile', 'app', 'mobile app', 'ios', 'android', 'smartphone', 'tablet',
-    'pwa', 'progressive web app', 'react native', 'flutter', 'mobile development',
-    
-    # Mobile platforms
-    'iphone', 'ipad', 'apple', 'google play', 'app store', 'play store',
-    'mobile application', 'native app', 'hybrid app', 'cross platform',
-    
-    # Mobile features
-    'offline app', 'push notification', 'gps', 'location', 'camera', 'scanner',
-    'qr code', 'barcode', 'biometric', 'fingerprint', 'face id', 'touch id',
-    'mobile payments', 'in app purchase', 'mobile commerce', 'm-commerce',
-    
-    # Business mobile apps
-    'field service app', 'sales app', 'crm app', 'inventory app', 'tracking app',
-    'delivery app', 'logistics app', 'maintenance app', 'inspection app',
-    'workforce app', 'employee app', 'customer app', 'mobile portal',
-    
-    # Mobile technologies
-    'swift', 'kotlin', 'xamarin', 'cordova', 'phonegap', 'ionic', 'unity'
-]
-
-AI_ML_KEYWORDS = [
-    # Primary terms
-    'ai', 'artificial intelligence', 'machine learning', 'ml', 'deep learning',
-    'neural', 'neural network', 'nlp', 'natural language processing',
-    'computer vision', 'automation', 'intelligent automation',
-    
-    # AI applications
-    'chatbot', 'virtual assistant', 'conversational ai', 'voice assistant',
-    'recommendation engine', 'recommendation system', 'predictive analytics',
-    'fraud detection', 'anomaly detection', 'sentiment analysis', 'text analysis',
-    
-    # ML techniques
-    'supervised learning', 'unsupervised learning', 'reinforcement learning',
-    'classification', 'regression', 'clustering', 'decision tree', 'random forest',
-    'support vector machine', 'svm', 'neural networks', 'cnn', 'rnn', 'lstm',
-    
-    # AI technologies
-    'tensorflow', 'pytorch', 'keras', 'scikit-learn', 'opencv', 'spacy', 'nltk',
-    'hugging face', 'openai', 'gpt', 'bert', 'transformer', 'generative ai',
-    
-    # Business AI
-    'business intelligence', 'predictive maintenance', 'demand forecasting',
-    'price optimization', 'customer segmentation', 'lead scoring', 'churn prediction',
-    'quality control', 'defect detection', 'process optimization', 'smart automation',
-    
-    # Industry AI
-    'ai for maritime', 'ai for shipping', 'ai for logistics', 'ai for healthcare',
-    'ai for finance', 'ai for manufacturing', 'ai for retail', 'fintech ai'
-]
-
-DATA_SERVICES_KEYWORDS = [
-    # Primary terms
-    'data', 'database', 'migration', 'analytics', 'reporting', 'etl', 'elt',
-    'warehouse', 'data warehouse', 'data lake', 'bi', 'business intelligence',
-    
-    # Data operations
-    'data migration', 'database migration', 'data transfer', 'data conversion',
-    'data transformation', 'data integration', 'data synchronization',
-    'data backup', 'data recovery', 'disaster recovery', 'data archiving',
-    
-    # Analytics & BI
-    'dashboard', 'report', 'kpi', 'metrics', 'data visualization', 'charts',
-    'graphs', 'tableau', 'power bi', 'qlik', 'looker', 'excel', 'pivot table',
-    'data analysis', 'statistical analysis', 'trend analysis', 'forecasting',
-    
-    # Database technologies
-    'sql', 'nosql', 'mysql', 'postgresql', 'oracle', 'sql server', 'mongodb',
-    'cassandra', 'redis', 'elasticsearch', 'hadoop', 'spark', 'kafka',
-    
-    # Cloud data
-    'aws', 'azure', 'google cloud', 'cloud migration', 'cloud database',
-    's3', 'redshift', 'bigquery', 'azure sql', 'cosmos db', 'dynamodb',
-    
-    # Data governance
-    'data quality', 'data cleansing', 'data validation', 'master data',
-    'data governance', 'data lineage', 'metadata', 'data catalog',
-    'gdpr', 'data privacy', 'data security', 'compliance'
-]
-
-INTEGRATION_KEYWORDS = [
-    # Primary terms
-    'integration', 'api', 'connect', 'sync', 'synchronization', 'system integration',
-    'erp', 'crm', 'middleware', 'interface', 'connector', 'bridge',
-    
-    # Integration types
-    'system integration', 'application integration', 'data integration',
-    'enterprise integration', 'cloud integration', 'hybrid integration',
-    'real time integration', 'batch integration', 'event driven integration',
-    
-    # Integration technologies
-    'rest', 'soap', 'graphql', 'webhook', 'api gateway', 'message queue',
-    'kafka', 'rabbitmq', 'azure service bus', 'aws sqs', 'mule', 'tibco',
-    'logic apps', 'azure logic apps', 'aws step functions', 'zapier',
-    
-    # Business systems
-    'erp integration', 'crm integration', 'sap', 'salesforce', 'dynamics',
-    'oracle', 'netsuite', 'quickbooks', 'sage', 'workday', 'successfactors',
-    'sharepoint', 'office 365', 'google workspace', 'slack integration',
-    
-    # E-commerce integration
-    'shopify', 'magento', 'woocommerce', 'amazon', 'ebay', 'payment gateway',
-    'stripe', 'paypal', 'square', 'shipping integration', 'fedex', 'ups', 'dhl',
-    
-    # Data sync
-    'two way sync', 'one way sync', 'real time sync', 'batch sync',
-    'data synchronization', 'master data sync', 'customer sync', 'product sync'
-]
-
-CHATBOT_KEYWORDS = [
-    # Primary terms
-    'chatbot', 'chat bot', 'virtual assistant', 'customer service', 'conversational ai',
-    'support bot', 'chat', 'assistant', 'ai assistant', 'digital assistant',
-    
-    # Customer service terms
-    'customer support', 'help desk', 'support ticket', 'live chat', 'customer care',
-    'customer experience', 'cx', 'customer engagement', 'self service', 'faq bot',
-    
-    # Communication channels
-    'website chat', 'web chat', 'whatsapp bot', 'facebook messenger', 'telegram bot',
-    'slack bot', 'discord bot', 'sms bot', 'voice bot', 'phone bot', 'ivr',
-    
-    # Chatbot features
-    'natural language', 'nlp', 'intent recognition', 'entity extraction',
-    'conversation flow', 'dialogue management', 'context awareness', 'memory',
-    'multilingual', 'sentiment analysis', 'escalation', 'handoff', 'live agent',
-    
-    # Business applications
-    'lead generation', 'lead qualification', 'appointment booking', 'scheduling',
-    'order taking', 'product recommendation', 'troubleshooting', 'onboarding',
-    'survey bot', 'feedback collection', 'hr bot', 'it support bot',
-    
-    # Chatbot platforms
-    'dialogflow', 'azure bot framework', 'amazon lex', 'rasa', 'botframework',
-    'watson assistant', 'chatfuel', 'manychat', 'drift', 'intercom', 'zendesk'
-]
-
-# =============================================================================
-# COMPREHENSIVE KEYWORD MAPPING
-# =============================================================================
-
-COMPREHENSIVE_KEYWORD_MAPPING = {
-    'inventory': INVENTORY_KEYWORDS,
-    'payroll': PAYROLL_KEYWORDS,
-    'crewing': CREWING_KEYWORDS,
-    'tms': TMS_KEYWORDS,
-    'procurement': PROCUREMENT_KEYWORDS,
-    'custom_development': CUSTOM_DEVELOPMENT_KEYWORDS,
-    'mobile': MOBILE_KEYWORDS,
-    'ai_ml': AI_ML_KEYWORDS,
-    'data_services': DATA_SERVICES_KEYWORDS,
-    'integration': INTEGRATION_KEYWORDS,
-    'chatbot': CHATBOT_KEYWORDS
-}
-
-# =============================================================================
-# ENHANCED KEYWORD MATCHING FUNCTION
-# =============================================================================
-
-def get_best_match_category(query):
-    """
-    Enhanced keyword matching that finds the best category match for a query
-    Returns tuple: (category, confidence_score, matched_keywords)
-    """
-    query_lower = query.lower().strip()
-    query_words = set(query_lower.split())
-    
-    matches = {}
-    
-    for category, keywords in COMPREHENSIVE_KEYWORD_MAPPING.items():
-        matched_keywords = []
-        score = 0
-        
-        for keyword in keywords:
-            if keyword in query_lower:
-                matched_keywords.append(keyword)
-                # Give higher score for exact phrase matches
-                if ' ' in keyword:
-                    score += 5  # Increased from 3 to 5 for multi-word phrases
-                else:
-                    score += 2  # Increased from 1 to 2 for single words
-        
-        # Additional scoring for word matches
-        keyword_words = set()
-        for keyword in keywords:
-            keyword_words.update(keyword.split())
-        
-        common_words = query_words.intersection(keyword_words)
-        score += len(common_words) * 0.5  # Partial score for individual word matches
-        
-        # BONUS: If query is very short (1-2 words) and matches a primary keyword exactly, boost score
-        if len(query_words) <= 2:
-            primary_keywords = keywords[:10]  # First 10 keywords are usually primary terms
-            for keyword in primary_keywords:
-                if keyword == query_lower:  # Exact match
-                    score += 5  # Big bonus for exact primary keyword match
-                elif keyword in query_lower and len(keyword) > 3:  # Close match for longer keywords
-                    score += 3
-        
-        if score > 0:
-            matches[category] = {
-                'score': score,
-                'matched_keywords': matched_keywords,
-                'confidence': min(score / 8, 1.0)  # Adjusted denominator from 10 to 8 for higher confidence
-            }
-    
-    if not matches:
-        return None, 0, []
-    
-    # Get the best match
-    best_category = max(matches.keys(), key=lambda k: matches[k]['score'])
-    best_match = matches[best_category]
-    
-    return best_category, best_match['confidence'], best_match['matched_keywords']
-
 # =============================================================================
 # ENHANCED PRODUCT AND SERVICE RESPONSE FUNCTIONS
 # =============================================================================
@@ -631,88 +397,16 @@ def get_product_response_enhanced(query):
     category, confidence, matched_keywords = get_best_match_category(query)
     
     # If we have a good match (confidence > 0.25) and it's a product category
-    if confidence > 0.25 and category in ['inventory', 'payroll', 'crewing', 'tms', 'procurement']:
-        
-        if category == 'inventory':
-            return """**AniSol Inventory Control** - Fleet inventory management SOFTWARE for tracking spares and consumables across vessels.
-
-**Key Features:**
-• Software for tracking spares & consumables inventory
-• Real-time ROB (Remaining Onboard) monitoring system
-• Automated reordering and shortage alert software
-• Integration with maintenance and procurement systems
-• Fleet-wide visibility and audit compliance tools
-
-*We provide inventory management SOFTWARE - not physical supplies or chandlery services.*
-
-Contact info@aniketsolutions.com for software implementation."""
-
-        elif category == 'payroll':
-            return """**AniSol Payroll & Master Cash** - Maritime crew financial management SOFTWARE with compliance features.
-
-**Key Features:**
-• Automated payroll software with overtime and allowances
-• Multi-currency support and exchange rate systems
-• Digital master's cash and petty cash management
-• Portage bill generation and audit trail software
-• Integration with accounting systems
-
-*We provide payroll management SOFTWARE - not financial services or banking.*
-
-Contact info@aniketsolutions.com for software setup consultation."""
-
-        elif category == 'crewing':
-            return """**AniSol Crewing Module** - Complete crew lifecycle management SOFTWARE for maritime operations.
-
-**Key Features:**
-• Crew scheduling and deployment planning software
-• Digital document and certification management
-• STCW and MLC compliance tracking systems
-• Performance appraisals and training record software
-• Payroll and cash management integration
-
-*We provide crew management SOFTWARE - not recruitment or manning services.*
-
-Contact info@aniketsolutions.com for software consultation."""
-
-        elif category == 'tms':
-            return """**AniSol TMS** - Technical Management SOFTWARE for maritime maintenance and compliance tracking.
-
-**Key Features:**
-• Planned and unplanned maintenance scheduling software
-• PSC inspection and class survey tracking systems
-• Digital work order management and history
-• Certificate lifecycle management software
-• Integration with inventory for spare parts tracking
-
-*We provide maintenance management SOFTWARE - not physical repair or drydocking services.*
-
-Contact info@aniketsolutions.com for software implementation."""
-
-        elif category == 'procurement':
-            return """**AniSol Procurement** - AI-powered maritime purchasing management SOFTWARE with vendor tracking.
-
-**Key Features:**
-• Multi-type requisition management software
-• Vendor database and performance tracking systems
-• Automated approval workflow software
-• ShipServ integration and quote comparison tools
-• Budget control and audit logging systems
-
-*We provide procurement management SOFTWARE - not physical supplies or chandlery services.*
-
-Contact info@aniketsolutions.com for software setup."""
-
+    if confidence > 0.25 and category in PRODUCT_CATEGORIES:
+        return get_answer_store().answer_for_category(category)
+    
+    # Otherwise try a ranked lookup over the product answers
+    ranked_answer = get_answer_store().best_answer(query, kind='product')
+    if ranked_answer:
+        return ranked_answer
+    
     # Fallback for products
-    return """**AniSol Maritime Software Suite** - Integrated fleet management solutions:
-
-• **TMS** - Technical maintenance management
-• **Procurement** - AI-powered purchasing
-• **Inventory** - Fleet-wide stock control
-• **Crewing** - Crew lifecycle management
-• **Payroll** - Maritime financial management
-
-Contact info@aniketsolutions.com for product consultation."""
+    return get_answer_store().fallback_answer('product')
 
 def get_service_response_enhanced(query):
     """Enhanced service response using comprehensive keyword matching"""
@@ -721,117 +415,29 @@ def get_service_response_enhanced(query):
     category, confidence, matched_keywords = get_best_match_category(query)
     
     # If we have a good match (confidence > 0.25) and it's a service category
-    if confidence > 0.25 and category in ['custom_development', 'mobile', 'ai_ml', 'data_services', 'integration', 'chatbot']:
-        
-        if category == 'chatbot':
-            return """**AI Chatbot & Virtual Assistant Services** - Intelligent customer service automation with 24/7 support capabilities.
-
-**Key Features:**
-• Natural language conversation management
-• Multi-channel deployment (website, WhatsApp, SMS)
-• Smart escalation to human agents
-• CRM integration and analytics
-• Custom knowledge base training
-
-Contact info@aniketsolutions.com for chatbot implementation."""
-
-        elif category == 'custom_development':
-            return """**Custom Application Development** - Tailored software solutions for specific business requirements.
-
-**Key Features:**
-• Enterprise web and desktop applications
-• Modern frameworks (React, Angular, Node.js)
-• Database design and API development
-• Legacy system modernization
-• Cloud deployment and scaling
-
-Contact info@aniketsolutions.com for development consultation."""
-
-        elif category == 'mobile':
-            return """**Mobile Application Development** - Native and cross-platform mobile solutions.
-
-**Key Features:**
-• iOS and Android native development
-• Cross-platform solutions (React Native, Flutter)
-• Offline capabilities and data sync
-• Enterprise integration and security
-• App store deployment support
-
-Contact info@aniketsolutions.com for mobile development."""
-
-        elif category == 'ai_ml':
-            return """**AI & Machine Learning Services** - Intelligent automation and predictive analytics solutions.
-
-**Key Features:**
-• Predictive analytics and forecasting
-• Natural language processing
-• Computer vision and automation
-• Custom AI model development
-• Business intelligence integration
-
-Contact info@aniketsolutions.com for AI consultation."""
-
-        elif category == 'data_services':
-            return """**Data Services & Migration** - Database solutions and business intelligence platforms.
-
-**Key Features:**
-• Database migration and optimization
-• Data warehousing and analytics
-• Business intelligence dashboards
-• ETL processes and data integration
-• Cloud data platform setup
-
-Contact info@aniketsolutions.com for data consultation."""
-
-        elif category == 'integration':
-            return """**System Integration Services** - Connecting business applications and data flow automation.
-
-**Key Features:**
-• API development and management
-• ERP and CRM integration
-• Real-time data synchronization
-• Cloud and on-premise connectivity
-• Workflow automation
-
-Contact info@aniketsolutions.com for integration planning."""
-
+    if confidence > 0.25 and category in SERVICE_CATEGORIES:
+        return get_answer_store().answer_for_category(category)
+    
+    # Otherwise try a ranked lookup over the service answers
+    ranked_answer = get_answer_store().best_answer(query, kind='service')
+    if ranked_answer:
+        return ranked_answer
+    
     # Fallback for services
-    return """**Technology Services Portfolio** - Comprehensive business technology solutions:
+    return get_answer_store().fallback_answer('service')
 
-• **Custom Development** - Tailored software solutions
-• **Mobile Apps** - iOS/Android development
-• **AI & ML** - Intelligent automation
-• **Data Services** - Migration and analytics
-• **Integration** - System connectivity
-• **Chatbots** - Customer service automation
+# Phrases that make an AI answer sound like generic chatbot filler
+PROHIBITED_PHRASES = [
+    "that's a great question", "i'd be happy to", "absolutely", "perfect choice",
+    "excellent question", "wonderful", "fantastic", "amazing", "excited to help"
+]
 
-Contact info@aniketsolutions.com for service consultation."""
+def contains_prohibited_phrase(text):
+    """Check AI output against the prohibited phrase list"""
+    text_lower = text.lower()
+    return any(phrase in text_lower for phrase in PROHIBITED_PHRASES)
 
-# Enhanced smart response function that uses the comprehensive keyword matching
-def generate_smart_response_enhanced(user_message):
-    """Enhanced smart response using comprehensive keyword matching"""
-    try:
-        # Track interaction for keep-alive system
-        if "interaction_count" in st.session_state:
-            st.session_state.interaction_count += 1
-            st.session_state.last_activity = datetime.now()
-        
-        # First, get the best category match with confidence score
-        category, confidence, matched_keywords = get_best_match_category(user_message)
-        
-        # IMPROVED LOGIC: Always respond based on what the user is asking about, 
-        # regardless of their initial selection (products vs services)
-        if confidence > 0.25:  # Lowered threshold further for better responsiveness
-            # Check if it's a product category - respond with product info
-            if category in ['inventory', 'payroll', 'crewing', 'tms', 'procurement']:
-                return get_product_response_enhanced(user_message)
-            # Check if it's a service category - respond with service info
-            elif category in ['custom_development', 'mobile', 'ai_ml', 'data_services', 'integration', 'chatbot']:
-                return get_service_response_enhanced(user_message)
-        
-        # Fallback to AI if no strong keyword match and AI is available
-        if st.session_state.get("openai_client"):
-            full_context = f"""
+ASSISTANT_SYSTEM_PROMPT = """
 You are Alex, a senior technology consultant at Aniket Solutions. Provide professional responses about our maritime software products and technology services.
 
 AVAILABLE MARITIME PRODUCTS:
@@ -857,37 +463,87 @@ IMPORTANT INSTRUCTIONS:
 - Always include contact info@aniketsolutions.com for detailed consultation
 - Respond professionally without conversational AI language
 """
-            
-            messages = [
-                {"role": "system", "content": full_context},
-                {"role": "user", "content": user_message}
-            ]
-            
-            response = st.session_state.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                temperature=0.2,
-                max_tokens=600,  # Increased for more detailed responses
-                presence_penalty=0.0,
-                frequency_penalty=0.0
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
-            
-            # Validate response quality
-            prohibited_phrases = [
-                "that's a great question", "i'd be happy to", "absolutely", "perfect choice",
-                "excellent question", "wonderful", "fantastic", "amazing", "excited to help"
-            ]
-            
-            ai_lower = ai_response.lower()
-            if not any(phrase in ai_lower for phrase in prohibited_phrases):
+
+# Enhanced smart response function that uses the comprehensive keyword matching
+def generate_smart_response_enhanced(user_message, on_token=None, llm_gateway=None, response_cache=None,
+                                     memory=None, allow_hedge=None):
+    """
+    Enhanced smart response using comprehensive keyword matching
+    If on_token is given and streaming is enabled, AI answers are streamed through it
+    llm_gateway, response_cache, memory and allow_hedge default to the session's gateway,
+    the shared cache, the session's conversation memory and its hedge budget; pass them
+    explicitly when running off the script thread
+    """
+    try:
+        if llm_gateway is None:
+            llm_gateway = session_llm_gateway()
+        if allow_hedge is None:
+            allow_hedge = session_hedge_budget()
+        if memory is None:
+            memory = st.session_state.conversation_memory
+        
+        # First, get the best category match with confidence score
+        category, confidence, matched_keywords = get_best_match_category(user_message)
+        
+        # Near-miss spellings ("procurment", "crewng") are resolved locally before falling back to AI;
+        # a generic hit elsewhere in the query ("software") must not hide the misspelled keyword, so
+        # the corrected query is scored whenever a word was corrected and wins unless it scores lower
+        corrected_message = correct_keyword_typos(user_message)
+        if corrected_message:
+            corrected_match = get_best_match_category(corrected_message)
+            if corrected_match[1] > 0.25 and corrected_match[1] >= confidence:
+                user_message = corrected_message
+                category, confidence, matched_keywords = corrected_match
+        
+        # IMPROVED LOGIC: Always respond based on what the user is asking about, 
+        # regardless of their initial selection (products vs services)
+        if confidence > 0.25:  # Lowered threshold further for better responsiveness
+            # Check if it's a product category - respond with product info
+            if category in PRODUCT_CATEGORIES:
+                return get_product_response_enhanced(user_message)
+            # Check if it's a service category - respond with service info
+            elif category in SERVICE_CATEGORIES:
+                return get_service_response_enhanced(user_message)
+        
+        # Ambiguous queries: ranked lookup over all canned answers before calling AI
+        ranked_answer = get_answer_store().best_answer(user_message)
+        if ranked_answer:
+            return ranked_answer
+        
+        # Recent turns and the rolling summary, within the prompt token budget
+        messages, history_digest = memory.build_context(ASSISTANT_SYSTEM_PROMPT, user_message, LLM_CONTEXT_TOKENS)
+        
+        # Repeated questions are answered from the response cache instead of calling AI: answers are
+        # keyed by the history in their prompt, so only answers given without history are shared
+        # across sessions and nothing a visitor said earlier reaches another conversation
+        if response_cache is None:
+            response_cache = get_response_cache()
+        cached_response = response_cache.get(user_message, context=history_digest)
+        if cached_response:
+            return cached_response
+        
+        # Fallback to AI if no strong keyword match and AI is available: the gateway tries
+        # each model within LLM_DEADLINE, then the best local canned answer
+        if llm_gateway:
+            try:
+                ai_response, tier = llm_gateway.complete(
+                    messages,
+                    on_token=on_token if LLM_STREAMING else None,
+                    validate=lambda text: not contains_prohibited_phrase(text),
+                    allow_hedge=allow_hedge
+                )
+                # Degraded-mode canned answers are not cached, so the model answers once it recovers
+                if tier != LOCAL_ANSWER_TIER:
+                    response_cache.put(user_message, ai_response, context=history_digest)
                 return ai_response
+            except LlmUnavailable as e:
+                print(f"LLM unavailable: {e}")
         
         # Final fallback
         return "For information about our maritime software products and technology services, contact our specialists at info@aniketsolutions.com for detailed consultation."
         
     except Exception as e:
+        print(f"Answer generation failed: {e}")
         return "For detailed information about our maritime products and technology services, contact our specialists at info@aniketsolutions.com"
 
 # =============================================================================
@@ -898,209 +554,58 @@ def generate_otp():
     """Generate a 6-digit OTP"""
     return ''.join(random.choices(string.digits, k=6))
 
-def send_otp_email(email, otp):
-    """Send OTP to the provided email address using AWS SES"""
-    try:
-        if not ses_client:
-            return False, "AWS SES not configured. Please configure AWS credentials in .env file."
-        
-        # Try to get sender email, with fallback options
-        sender_email = SES_FROM_EMAIL
-        
-        if not sender_email:
-            # If no SES_FROM_EMAIL specified, try to get verified identities
-            try:
-                response = ses_client.list_verified_email_addresses()
-                verified_emails = response.get('VerifiedEmailAddresses', [])
-                
-                if verified_emails:
-                    sender_email = verified_emails[0]  # Use first verified email
-                else:
-                    return False, "No verified email addresses found in AWS SES. Please verify at least one email address."
-            except Exception as e:
-                return False, f"Could not retrieve verified email addresses: {str(e)}"
-        
-        # Email subject
-        subject = "Aniket Solutions - Email Verification Code"
-        
-        # HTML email body for better formatting
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Email Verification - Aniket Solutions</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="color: white; margin: 0; font-size: 28px;">Aniket Solutions</h1>
-                <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Total Solutions Provider</p>
-            </div>
-            
-            <div style="background: #ffffff; padding: 40px; border-radius: 0 0 10px 10px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
-                <h2 style="color: #333; margin-top: 0;">Email Verification Code</h2>
-                
-                <p>Hello,</p>
-                
-                <p>Thank you for your interest in Aniket Solutions! We've been providing excellent technology solutions since 2004.</p>
-                
-                <p>To verify your email address and continue with our consultation, please use the following verification code:</p>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <div style="background: #f8f9fa; 
-                                border: 2px solid #667eea; 
-                                border-radius: 10px; 
-                                padding: 20px; 
-                                display: inline-block;">
-                        <p style="margin: 0; color: #666; font-size: 14px;">Your Verification Code</p>
-                        <h1 style="margin: 10px 0 0 0; 
-                                   color: #667eea; 
-                                   font-size: 36px; 
-                                   font-weight: bold; 
-                                   letter-spacing: 8px;
-                                   font-family: 'Courier New', monospace;">
-                            {otp}
-                        </h1>
-                    </div>
-                </div>
-                
-                <p style="background: #f8f9fa; padding: 15px; border-radius: 5px; border-left: 4px solid #667eea;">
-                    <strong>⏰ Important:</strong> This verification code will expire in 10 minutes for security purposes.
-                </p>
-                
-                <p style="background: #fff3cd; padding: 15px; border-radius: 5px; border-left: 4px solid #ffc107;">
-                    <strong>🔒 Security Note:</strong> Never share this code with anyone. Aniket Solutions will never ask for your verification code via phone or other means.
-                </p>
-                
-                <p>If you did not request this verification, please ignore this email.</p>
-                
-                <hr style="border: none; height: 1px; background: #eee; margin: 30px 0;">
-                
-                <div style="text-align: center; color: #666; font-size: 14px;">
-                    <p><strong>Aniket Solutions</strong><br>
-                    Website: <a href="https://www.aniketsolutions.com" style="color: #667eea;">www.aniketsolutions.com</a></p>
-                    
-                    <p style="font-size: 12px; color: #999;">
-                        This is an automated message. Please do not reply to this email.<br>
-                        Established 2004 • Singapore • Global Technology Solutions
-                    </p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Plain text version for email clients that don't support HTML
-        text_body = f"""
-Hello,
-
-Thank you for your interest in Aniket Solutions!
-
-To verify your email address and continue with our consultation, please use the following verification code:
-
-Verification Code: {otp}
-
-This verification code will expire in 10 minutes for security purposes.
-
-If you did not request this verification, please ignore this email.
-
-Security Note: Never share this code with anyone. Aniket Solutions will never ask for your verification code via phone or other means.
-
-Best regards,
-Aniket Solutions Team
-Website: https://www.aniketsolutions.com
-
----
-This is an automated message. Please do not reply to this email.
-        """
-        
-        # Send email using AWS SES
-        response = ses_client.send_email(
-            Source=sender_email,
-            Destination={'ToAddresses': [email]},
-            Message={
-                'Subject': {'Data': subject, 'Charset': 'UTF-8'},
-                'Body': {
-                    'Html': {'Data': html_body, 'Charset': 'UTF-8'},
-                    'Text': {'Data': text_body, 'Charset': 'UTF-8'}
-                }
-            }
-        )
-        
-        return True, f"OTP sent successfully to {email} from {sender_email}! Message ID: {response['MessageId']}"
-        
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
-        error_message = e.response['Error']['Message']
-        
-        if error_code == 'MessageRejected':
-            return False, "Email address not verified in AWS SES. Please verify the sender email address."
-        elif error_code == 'SendingPausedException':
-            return False, "AWS SES sending is paused for your account. Please contact AWS support."
-        else:
-            return False, f"AWS SES error ({error_code}): {error_message}"
-            
-    except Exception as e:
-        return False, f"Failed to send OTP email: {str(e)}"
-
 def verify_otp(entered_otp, stored_otp_data):
-    """Verify OTP and check if it's still valid (10 minutes)"""
+    """
+    Verify OTP against the shared OTP store (codes expire after 10 minutes)
+    Returns tuple: (is_valid, message, failed_attempts)
+    """
     if not stored_otp_data:
-        return False, "No OTP found. Please request a new one."
-    
-    stored_otp = stored_otp_data.get("otp")
-    timestamp = stored_otp_data.get("timestamp")
-    attempts = stored_otp_data.get("attempts", 0)
-    
-    if not stored_otp or not timestamp:
-        return False, "Invalid OTP data."
-    
-    # Check if too many attempts
-    if attempts >= 3:
-        return False, "Too many failed attempts. Please request a new OTP."
-    
-    # Check if OTP has expired (10 minutes = 600 seconds)
-    current_time = datetime.now()
-    time_diff = (current_time - timestamp).total_seconds()
-    
-    if time_diff > 600:  # 10 minutes
-        return False, "OTP has expired. Please request a new one."
-    
-    if entered_otp == stored_otp:
-        return True, "OTP verified successfully!"
-    else:
-        return False, "Invalid OTP. Please try again."
+        return False, "No OTP found. Please request a new one.", 0
+    return get_otp_store().verify(stored_otp_data["email"], entered_otp)
 
-def moderate_content(text):
-    """Check content using OpenAI Moderation API"""
+def moderate_content(text, verdict_cache=None, client=None):
+    """Check content using OpenAI Moderation API (pass verdict_cache and client when running off the script thread)"""
     try:
         # Check if OpenAI client is available
+        if client is None:
+            client = env_openai_client()
         if not client:
             return True, "Content moderation unavailable - proceeding"
         
-        # Use OpenAI Moderation API
-        response = client.moderations.create(input=text)
-        
-        moderation_result = response.results[0]
+        # Resubmissions and duplicates reuse the cached verdict instead of calling the API again
+        if verdict_cache is None:
+            verdict_cache = get_verdict_cache()
+        cache_key = ("moderation", content_hash(text))
+        verdict = verdict_cache.get(cache_key)
         
-        if moderation_result.flagged:
+        if verdict is None:
+            # Use OpenAI Moderation API
+            response = client.moderations.create(input=text)
+            
+            moderation_result = response.results[0]
+            
             # Get specific violation categories
             flagged_categories = []
-            categories = moderation_result.categories
-            
-            if categories.harassment: flagged_categories.append("harassment")
-            if categories.harassment_threatening: flagged_categories.append("threatening content")
-            if categories.hate: flagged_categories.append("hate speech")
-            if categories.hate_threatening: flagged_categories.append("threatening hate speech")
-            if categories.self_harm: flagged_categories.append("self-harm content")
-            if categories.self_harm_instructions: flagged_categories.append("self-harm instructions")
-            if categories.self_harm_intent: flagged_categories.append("self-harm intent")
-            if categories.sexual: flagged_categories.append("sexual content")
-            if categories.sexual_minors: flagged_categories.append("sexual content involving minors")
-            if categories.violence: flagged_categories.append("violent content")
-            if categories.violence_graphic: flagged_categories.append("graphic violence")
+            if moderation_result.flagged:
+                categories = moderation_result.categories
+                
+                if categories.harassment: flagged_categories.append("harassment")
+                if categories.harassment_threatening: flagged_categories.append("threatening content")
+                if categories.hate: flagged_categories.append("hate speech")
+                if categories.hate_threatening: flagged_categories.append("threatening hate speech")
+                if categories.self_harm: flagged_categories.append("self-harm content")
+                if categories.self_harm_instructions: flagged_categories.append("self-harm instructions")
+                if categories.self_harm_intent: flagged_categories.append("self-harm intent")
+                if categories.sexual: flagged_categories.append("sexual content")
+                if categories.sexual_minors: flagged_categories.append("sexual content involving minors")
+                if categories.violence: flagged_categories.append("violent content")
+                if categories.violence_graphic: flagged_categories.append("graphic violence")
             
+            verdict = (moderation_result.flagged, tuple(flagged_categories))
+            verdict_cache.set(cache_key, verdict)
+        
+        is_flagged, flagged_categories = verdict
+        if is_flagged:
             violation_text = ", ".join(flagged_categories)
             return False, f"Content flagged for: {violation_text}"
         
@@ -1110,78 +615,11 @@ def moderate_content(text):
         # Log error but don't block user - moderation failure shouldn't stop legitimate users
         return True, f"Moderation check failed, proceeding: {str(e)}"
 
-def detect_gibberish(text):
-    """Detect if text is gibberish or meaningless"""
-    
-    # Basic gibberish detection patterns
-    text_clean = text.lower().strip()
-    
-    # Check for minimum length
-    if len(text_clean) < 2:
-        return True, "Message too short"
-    
-    # Check for excessive repetition of characters
-    if len(set(text_clean)) <= 2 and len(text_clean) > 5:
-        return True, "Excessive character repetition detected"
-    
-    # Check for random character sequences
-    vowels = set('aeiou')
-    consonants = set('bcdfghjklmnpqrstvwxyz')
-    
-    # Count vowels and consonants
-    vowel_count = sum(1 for char in text_clean if char in vowels)
-    consonant_count = sum(1 for char in text_clean if char in consonants)
-    total_letters = vowel_count + consonant_count
-    
-    if total_letters > 5:
-        vowel_ratio = vowel_count / total_letters
-        # If vowel ratio is too low (< 0.1) or too high (> 0.8), likely gibberish
-        if vowel_ratio < 0.1 or vowel_ratio > 0.8:
-            return True, "Unusual character pattern detected"
-    
-    # Check for excessive consecutive consonants
-    consecutive_consonants = 0
-    max_consecutive_consonants = 0
-    
-    for char in text_clean:
-        if char in consonants:
-            consecutive_consonants += 1
-            max_consecutive_consonants = max(max_consecutive_consonants, consecutive_consonants)
-        else:
-            consecutive_consonants = 0
-    
-    if max_consecutive_consonants > 4:
-        return True, "Excessive consecutive consonants detected"
-    
-    # Check for keyboard mashing patterns
-    keyboard_rows = [
-        'qwertyuiop',
-        'asdfghjkl',
-        'zxcvbnm'
-    ]
-    
-    for row in keyboard_rows:
-        for i in range(len(row) - 3):
-            sequence = row[i:i+4]
-            if sequence in text_clean or sequence[::-1] in text_clean:
-                return True, "Keyboard sequence pattern detected"
-    
-    # Check for common gibberish patterns
-    gibberish_patterns = [
-        'aaaa', 'bbbb', 'cccc', 'dddd', 'eeee',
-        'asdf', 'qwer', 'zxcv', 'hjkl',
-        'test123', 'aaaaa', 'bbbbb'
-    ]
-    
-    for pattern in gibberish_patterns:
-        if pattern in text_clean:
-            return True, f"Common gibberish pattern detected: {pattern}"
-    
-    return False, "Text appears valid"
-
-def advanced_gibberish_check_with_openai(text):
-    """Use OpenAI to detect more sophisticated gibberish"""
+def advanced_gibberish_check_with_openai(text, verdict_cache=None, client=None):
+    """Use OpenAI to detect more sophisticated gibberish (pass verdict_cache and client when running off the script thread)"""
     try:
+        if client is None:
+            client = env_openai_client()
         if not client:
             return False, "AI gibberish check unavailable"
         
@@ -1205,14 +643,21 @@ def advanced_gibberish_check_with_openai(text):
         Response:
         """
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=10,
-            temperature=0.1
-        )
+        if verdict_cache is None:
+            verdict_cache = get_verdict_cache()
+        cache_key = ("ai_gibberish", content_hash(text))
+        result = verdict_cache.get(cache_key)
         
-        result = response.choices[0].message.content.strip().upper()
+        if result is None:
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=10,
+                temperature=0.1
+            )
+            
+            result = response.choices[0].message.content.strip().upper()
+            verdict_cache.set(cache_key, result)
         
         if result == "GIBBERISH":
             return True, "AI detected non-meaningful content"
@@ -1226,151 +671,71 @@ def advanced_gibberish_check_with_openai(text):
         # If AI check fails, fall back to basic check only
         return False, f"AI gibberish check failed: {str(e)}"
 
-def comprehensive_content_filter(text):
-    """Comprehensive content filtering combining moderation and gibberish detection"""
-    
-    # Step 1: OpenAI Moderation API
-    is_safe, moderation_message = moderate_content(text)
-    if not is_safe:
-        return False, f"🚫 Content Moderation: {moderation_message}"
+def run_content_filter_pipeline(text, speculative_fn=None):
+    """
+    Content filtering pipeline: the local gibberish checks run first, then the
+    OpenAI moderation and (for uncertain texts) AI gibberish checks run concurrently.
+    If speculative_fn is given it is started alongside the remote checks.
+    Returns tuple: (is_safe, message, speculative_future)
+    Outstanding work is cancelled as soon as any stage rejects the text.
+    """
     
-    # Step 2: Basic gibberish detection
+    # Step 1: Basic gibberish detection (local, no network)
     is_gibberish, gibberish_message = detect_gibberish(text)
     if is_gibberish:
-        return False, f"🤖 Content Quality: {gibberish_message}. Please provide a meaningful business inquiry."
+        return False, f"🤖 Content Quality: {gibberish_message}. Please provide a meaningful business inquiry.", None
     
-    # Step 3: Advanced AI-based gibberish detection for longer texts
+    # Step 2: Local language-model check for longer texts; only the uncertain band goes to OpenAI
+    needs_ai_gibberish_check = False
     if len(text.strip()) > 20:  # Only for longer messages
-        is_ai_gibberish, ai_message = advanced_gibberish_check_with_openai(text)
-        if is_ai_gibberish:
-            return False, f"🤖 Content Analysis: {ai_message}. Please provide a clear business inquiry."
-    
-    return True, "Content approved"
-
-# Email validation functions
-def validate_email_format(email):
-    """Validate email format using regex"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    return re.match(pattern, email) is not None
-
-def validate_domain(domain):
-    """Validate domain by checking DNS records"""
-    try:
-        # Check if domain has MX record (mail exchange)
-        mx_records = dns.resolver.resolve(domain, 'MX')
-        if mx_records:
-            return True, "Domain has valid MX records"
-    except dns.resolver.NXDOMAIN:
-        return False, "Domain does not exist"
-    except dns.resolver.NoAnswer:
-        try:
-            # If no MX record, check if domain exists with A record
-            a_records = dns.resolver.resolve(domain, 'A')
-            if a_records:
-                return True, "Domain exists but no MX record found"
-        except:
-            return False, "Domain validation failed"
-    except Exception as e:
-        return False, f"DNS lookup error: {str(e)}"
+        verdict, _ = classify_with_language_model(text)
+        if verdict == "GIBBERISH":
+            return False, "🤖 Content Analysis: Language model detected non-meaningful content. Please provide a clear business inquiry.", None
+        needs_ai_gibberish_check = verdict == "UNCLEAR"
+    
+    executor = get_background_executor()
+    speculative_future = executor.submit(speculative_fn) if speculative_fn else None
+    
+    # Step 3: OpenAI Moderation API and, when still unclear, AI-based gibberish detection
+    verdict_cache = get_verdict_cache()
+    client = env_openai_client()
+    checks = {executor.submit(moderate_content, text, verdict_cache, client): "moderation"}
+    if needs_ai_gibberish_check:
+        checks[executor.submit(advanced_gibberish_check_with_openai, text, verdict_cache, client)] = "ai_gibberish"
+    
+    for future in as_completed(checks):
+        rejection = None
+        if checks[future] == "moderation":
+            is_safe, moderation_message = future.result()
+            if not is_safe:
+                rejection = f"🚫 Content Moderation: {moderation_message}"
+        else:
+            is_ai_gibberish, ai_message = future.result()
+            if is_ai_gibberish:
+                rejection = f"🤖 Content Analysis: {ai_message}. Please provide a clear business inquiry."
+        
+        if rejection:
+            # Checks that already started finish in the background; their results are ignored
+            for pending in checks:
+                pending.cancel()
+            if speculative_future:
+                speculative_future.cancel()
+            return False, rejection, None
     
-    return False, "Domain validation failed"
+    return True, "Content approved", speculative_future
 
-def is_corporate_email(email):
-    """Check if email is from a corporate domain (not personal email providers)"""
-    
-    # Common personal email providers
-    personal_domains = {
-        'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com',
-        'icloud.com', 'me.com', 'mac.com', 'live.com', 'msn.com',
-        'yahoo.co.uk', 'yahoo.ca', 'yahoo.com.au', 'googlemail.com',
-        'protonmail.com', 'tutanota.com', 'zoho.com', 'yandex.com',
-        'mail.com', 'gmx.com', 'inbox.com', 'fastmail.com'
-    }
-    
-    domain = email.split('@')[1].lower()
-    
-    if domain in personal_domains:
-        return False, f"'{domain}' is a personal email provider"
-    
-    # Additional checks for corporate emails
-    corporate_indicators = [
-        # Common corporate domain patterns
-        '.edu',  # Educational institutions
-        '.gov',  # Government
-        '.org',  # Organizations (many are corporate)
-    ]
-    
-    # Check if domain ends with corporate indicators
-    for indicator in corporate_indicators:
-        if domain.endswith(indicator):
-            return True, f"Domain '{domain}' appears to be institutional/corporate"
-    
-    # If not in personal list and not obviously personal, likely corporate
-    # Additional validation: check if domain is not a known personal provider
-    if '.' in domain and len(domain.split('.')) >= 2:
-        return True, f"Domain '{domain}' appears to be corporate"
-    
-    return False, "Unable to determine if email is corporate"
-
-def comprehensive_email_validation(email):
-    """Perform comprehensive email validation"""
-    results = {
-        'email': email,
-        'is_valid': False,
-        'format_valid': False,
-        'domain_valid': False,
-        'is_corporate': False,
-        'messages': []
-    }
-    
-    # Step 1: Format validation
-    if not validate_email_format(email):
-        results['messages'].append("❌ Invalid email format")
-        return results
-    
-    results['format_valid'] = True
-    results['messages'].append("✅ Email format is valid")
-    
-    # Step 2: Extract domain and validate
-    try:
-        domain = email.split('@')[1].lower()
-    except IndexError:
-        results['messages'].append("❌ Could not extract domain")
-        return results
-    
-    # Step 3: Domain validation
-    domain_valid, domain_message = validate_domain(domain)
-    results['domain_valid'] = domain_valid
-    
-    if domain_valid:
-        results['messages'].append(f"✅ {domain_message}")
-    else:
-        results['messages'].append(f"❌ {domain_message}")
-        return results
-    
-    # Step 4: Corporate email check
-    is_corp, corp_message = is_corporate_email(email)
-    results['is_corporate'] = is_corp
-    
-    if is_corp:
-        results['messages'].append(f"✅ {corp_message}")
-    else:
-        results['messages'].append(f"❌ {corp_message}")
-    
-    # Overall validation
-    results['is_valid'] = results['format_valid'] and results['domain_valid'] and results['is_corporate']
-    
-    return results
+def comprehensive_content_filter(text):
+    """Comprehensive content filtering combining moderation and gibberish detection"""
+    is_safe, message, _ = run_content_filter_pipeline(text)
+    return is_safe, message
 
 # =============================================================================
 # ACTIVATE KEEP-ALIVE SYSTEMS
 # =============================================================================
 
-# Run all keep-alive systems
+get_health_services()
 keep_alive_system()
 add_javascript_keepalive()
-add_auto_refresh()
-add_service_worker()
 
 # Custom CSS for better styling and hide sidebar completely
 st.markdown("""
@@ -1445,15 +810,89 @@ def add_initial_greeting():
     })
 
 def add_message_to_chat(role, content, timestamp=None):
-    """Helper function to add messages to chat"""
+    """Helper function to add messages to chat (the oldest are dropped past CHAT_MESSAGE_LIMIT)"""
     if timestamp is None:
         timestamp = datetime.now().strftime("%H:%M")
     
-    st.session_state.messages.append({
+    messages = st.session_state.messages
+    messages.append({
         "role": role,
         "content": content,
         "timestamp": timestamp
     })
+    
+    overflow = len(messages) - CHAT_MESSAGE_LIMIT
+    if overflow > 0:
+        del messages[:overflow]
+        # Rendered bubbles are cached by index, so shift them along with the messages
+        st.session_state.rendered_messages = {
+            index - overflow: entry for index, entry in st.session_state.rendered_messages.items()
+            if index >= overflow
+        }
+
+def new_conversation_memory():
+    return ConversationMemory(max_turns=CONVERSATION_MEMORY_TURNS, summary_tokens=CONVERSATION_SUMMARY_TOKENS)
+
+def render_chat_message(message):
+    """Build the chat bubble HTML for a message"""
+    message_class = "user" if message["role"] == "user" else "assistant"
+    timestamp = message.get("timestamp", "")
+    
+    # Choose sender name and avatar based on role
+    if message["role"] == "user":
+        sender_name = "You"
+        avatar_url = USER_AVATAR_URL
+    else:
+        sender_name = "Alex"
+        avatar_url = st.session_state.selected_avatar
+    
+    return f"""
+        <div class="chat-message {message_class}">
+            <div style="display: flex; align-items: flex-start; gap: 12px; margin-bottom: 8px;">
+                <img src="{avatar_url}" style="width: 45px; height: 45px; border-radius: 50%; border: 2px solid #e0e0e0; flex-shrink: 0;">
+                <div style="flex: 1; min-width: 0;">
+                    <div class="sender-name" style="font-weight: bold; color: #333; font-size: 0.9rem; margin-bottom: 2px;">{sender_name}</div>
+                    <div class="message-time" style="font-size: 0.8rem; color: #666; margin-bottom: 6px;">{timestamp}</div>
+                    <div class="message-content" style="line-height: 1.5; word-wrap: break-word;">{message["content"]}</div>
+                </div>
+            </div>
+        </div>
+        """
+
+def rate_limit_client():
+    """This visitor's address (unlike the session id, it survives Reset Session and reloads), or None"""
+    try:
+        return client_address(st.context.ip_address, st.context.headers.get("X-Forwarded-For"))
+    except Exception:
+        return None
+
+def rate_limit_wait(limits):
+    """Spend one token from each limit; returns None if allowed, else the wait as text for the user"""
+    allowed, retry_after = get_rate_limiter().hit(limits)
+    return None if allowed else format_retry_after(retry_after)
+
+def cached_message_html(index, message):
+    """Bubble HTML for messages[index], rendered once and reused until the message or avatar changes"""
+    avatar = st.session_state.selected_avatar
+    entry = st.session_state.rendered_messages.get(index)
+    if entry is None or entry[0] is not message or entry[1] != avatar:
+        # Stripped like st.markdown does, so each bubble starts its own HTML block once joined
+        entry = (message, avatar, render_chat_message(message).strip())
+        st.session_state.rendered_messages[index] = entry
+    return entry[2]
+
+def render_chat_history():
+    """Show the most recent messages as one HTML block, with a button to page further back"""
+    messages = st.session_state.messages
+    start = max(0, len(messages) - st.session_state.history_window)
+    if start:
+        if st.button(f"⬆️ Show earlier messages ({start} hidden)", key="show_earlier_messages"):
+            st.session_state.history_window += CHAT_HISTORY_WINDOW
+            st.rerun()
+    st.markdown(
+        "\n\n".join(cached_message_html(index, messages[index]) for index in range(start, len(messages))),
+        unsafe_allow_html=True
+    )
 
 def handle_email_validation_flow(email, validation_result):
     """Handle the flow after email validation"""
@@ -1462,32 +901,38 @@ def handle_email_validation_flow(email, validation_result):
         validation_response = "✅ Email validated successfully."
         add_message_to_chat("assistant", validation_response)
         
-        # Generate and send OTP
-        otp = generate_otp()
-        success, message = send_otp_email(email, otp)
-        
-        if success:
-            # Store OTP data in session state
-            st.session_state.otp_data = {
-                "otp": otp,
-                "email": email,
-                "timestamp": datetime.now(),
-                "attempts": 0
-            }
-            
-            st.session_state.conversation_flow["email_validated"] = True
-            st.session_state.conversation_flow["awaiting_email"] = False
-            st.session_state.conversation_flow["awaiting_otp"] = True
-            
-            # Verification message
+        # Generate the OTP and queue its email; the code can be entered while it is delivered
+        otp_queue = get_otp_queue()
+        if otp_queue is None:
             add_message_to_chat("assistant", 
-                f"I've sent a 6-digit code to {email}. Please enter it below to continue. Code expires in 10 minutes."
-            )
-            return True
-        else:
+                "Email validation successful, but couldn't send verification code: "
+                "AWS SES not configured. Please configure AWS credentials in .env file.")
+            return False
+        
+        wait = rate_limit_wait(otp_send_limits(email, st.session_state.rate_limit_id))
+        if wait:
             add_message_to_chat("assistant", 
-                f"Email validation successful, but couldn't send verification code: {message}")
+                f"⏳ Too many verification codes have been requested for {email}. Please wait {wait} and try again.")
             return False
+        
+        otp = generate_otp()
+        
+        # Track the delivery in session state; the code itself only goes to the shared OTP store, once sent
+        st.session_state.otp_data = {
+            "email": email,
+            "timestamp": datetime.now(),
+            "delivery_id": otp_queue.submit(email, otp, on_sent=partial(get_otp_store().issue, email, otp))
+        }
+        
+        st.session_state.conversation_flow["email_validated"] = True
+        st.session_state.conversation_flow["awaiting_email"] = False
+        st.session_state.conversation_flow["awaiting_otp"] = True
+        
+        # Verification message
+        add_message_to_chat("assistant", 
+            f"I'm sending a 6-digit code to {email}. Please enter it below to continue. Code expires in 10 minutes."
+        )
+        return True
     else:
         validation_response = f"""Email validation failed:
 
@@ -1498,6 +943,61 @@ Please provide a valid corporate email address."""
         add_message_to_chat("assistant", validation_response)
         return False
 
+def sync_otp_delivery():
+    """
+    Apply finished OTP email deliveries to the session
+    A new code only replaces the current one once its email is sent; a failed (or
+    unknown, e.g. after a restart) first delivery returns the user to the email step
+    Returns True while a delivery is still queued or sending
+    """
+    otp_data = st.session_state.otp_data
+    if not otp_data:
+        return False
+    otp_queue = get_otp_queue()
+    if otp_queue is None:
+        return False
+    
+    resend = otp_data.get("pending_resend")
+    if resend:
+        state, message = otp_queue.outcome(resend["delivery_id"])
+        if state == "pending":
+            return True
+        if state == "failed":
+            otp_data.pop("pending_resend")
+            add_message_to_chat("assistant", f"❌ Failed to resend verification code: {message}")
+            return False
+        st.session_state.otp_data = {
+            "email": otp_data["email"],
+            "timestamp": resend["timestamp"],
+            "delivery_id": resend["delivery_id"],
+            "delivered": True
+        }
+        add_message_to_chat("assistant", "📧 New verification code sent to your email!")
+        return False
+    
+    if otp_data.get("delivered"):
+        return False
+    state, message = otp_queue.outcome(otp_data["delivery_id"])
+    if state == "pending":
+        return True
+    if state == "failed":
+        add_message_to_chat("assistant", 
+            f"Email validation successful, but couldn't send verification code: {message}")
+        st.session_state.otp_data = None
+        st.session_state.conversation_flow["email_validated"] = False
+        st.session_state.conversation_flow["awaiting_otp"] = False
+        st.session_state.conversation_flow["awaiting_email"] = True
+        return False
+    otp_data["delivered"] = True
+    return False
+
+@st.fragment(run_every=1)
+def watch_otp_delivery():
+    """Poll the queued OTP email and rerun the whole page once it has been sent or has failed"""
+    if not sync_otp_delivery():
+        st.rerun()
+    st.caption("📨 Sending verification code...")
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -1509,13 +1009,6 @@ if "api_key" not in st.session_state:
     else:
         st.session_state.api_key = ""
 
-# Initialize OpenAI client in session state
-if "openai_client" not in st.session_state:
-    if OPENAI_API_KEY:
-        st.session_state.openai_client = client
-    else:
-        st.session_state.openai_client = None
-
 # Initialize selected avatar in session state
 if "selected_avatar" not in st.session_state:
     st.session_state.selected_avatar = ALEX_AVATAR_URL
@@ -1534,6 +1027,20 @@ if "conversation_flow" not in st.session_state:
 if "otp_data" not in st.session_state:
     st.session_state.otp_data = None
 
+# Recent chat turns and a rolling summary, used as LLM context for follow-up questions
+if "conversation_memory" not in st.session_state:
+    st.session_state.conversation_memory = new_conversation_memory()
+
+# Rendered bubble HTML by message index, and how many recent messages are shown
+if "rendered_messages" not in st.session_state:
+    st.session_state.rendered_messages = {}
+if "history_window" not in st.session_state:
+    st.session_state.history_window = CHAT_HISTORY_WINDOW
+
+# Rate limits are keyed by this id as well as by email address, domain and client address
+if "rate_limit_id" not in st.session_state:
+    st.session_state.rate_limit_id = uuid.uuid4().hex
+
 # Add initial greeting if messages is empty
 if len(st.session_state.messages) == 0:
     add_initial_greeting()
@@ -1553,13 +1060,9 @@ with st.sidebar:
         
         if api_key:
             st.session_state.api_key = api_key
-            # Initialize OpenAI client with the new API key
-            st.session_state.openai_client = OpenAI(api_key=api_key)
     else:
         st.success("✅ API Key configured from .env file")
         st.session_state.api_key = OPENAI_API_KEY
-        if "openai_client" not in st.session_state:
-            st.session_state.openai_client = client
     
     # Session Management
     st.subheader("🔄 Session Management")
@@ -1586,6 +1089,7 @@ with st.sidebar:
                 "awaiting_specification": False
             }
             st.session_state.otp_data = None
+            st.session_state.conversation_memory = new_conversation_memory()
             add_initial_greeting()
             st.rerun()
     
@@ -1651,12 +1155,20 @@ with st.sidebar:
             st.info("ℹ️ SES_FROM_EMAIL not set - will use first verified email")
         else:
             st.success(f"📧 Sender email: {SES_FROM_EMAIL}")
-    
+        # Opt-in: the OTP queue imports boto3, which first paint does not need
+        ses_stats = get_otp_queue().transport.stats() if st.checkbox("Show SES delivery stats") else None
+        if ses_stats and ses_stats['mean_latency'] is not None:
+            st.caption(
+                f"SES: {ses_stats['api_calls']['send_email']} sends, "
+                f"{ses_stats['api_calls']['list_verified_email_addresses']} sender lookups, "
+                f"send latency avg {ses_stats['mean_latency'] * 1000:.0f} ms / p95 {ses_stats['p95_latency'] * 1000:.0f} ms"
+            )
+
     st.divider()
     
     # Content Moderation Status
     st.subheader("🛡️ Content Moderation")
-    if client:
+    if OPENAI_API_KEY:
         st.success("✅ Content moderation active")
         st.caption("OpenAI Moderation API + Gibberish Detection")
     else:
@@ -1668,38 +1180,48 @@ with st.sidebar:
     # Simple status indicator
     st.subheader("🚀 System Status")
     st.success("✅ All systems operational")
-    st.caption("Keep-alive system running in background")
+    health_server, keep_warm, probe_status = get_health_services()
+    keep_warm_stats = keep_warm.stats()
+    st.caption(
+        f"Keep-warm: {keep_warm_stats['ticks']} ticks, {keep_warm_stats['pings']} pings, "
+        f"{keep_warm_stats['failures']} failures"
+    )
+    st.caption(f"Health probes: {probe_status}")
+    cache_stats = get_response_cache().stats()
+    st.caption(
+        f"Response cache: {cache_stats['entries']} answers, "
+        f"{cache_stats['exact_hits'] + cache_stats['similar_hits']} hits / {cache_stats['misses']} misses"
+    )
+    verdict_stats = get_verdict_cache().stats()
+    st.caption(f"Moderation verdict cache: {verdict_stats['hits']} hits / {verdict_stats['misses']} misses")
+    limiter_stats = get_rate_limiter().stats()
+    st.caption(f"Rate limiter: {limiter_stats['allowed']} allowed / {limiter_stats['denied']} denied")
+    if st.session_state.api_key and st.checkbox("Show LLM gateway stats"):
+        llm_stats = session_llm_gateway().stats()
+        for tier_name, tier_stats in llm_stats['tiers'].items():
+            st.caption(
+                f"{tier_name} ({tier_stats['state']}): {tier_stats['answers']} answers, "
+                f"{tier_stats['failures']} failures, {tier_stats['retries']} retries, {tier_stats['skipped']} skipped"
+            )
+        if llm_stats['p95_latency'] is not None:
+            st.caption(f"LLM latency avg {llm_stats['mean_latency']:.1f} s / p95 {llm_stats['p95_latency']:.1f} s")
+        hedge_stats = llm_stats['hedges']
+        if hedge_stats:
+            st.caption(
+                f"Hedges: {hedge_stats['fired']} fired in {hedge_stats['races']} requests, {hedge_stats['won']} won; "
+                f"denied {hedge_stats['denied_ratio']} by ratio, {hedge_stats['denied_budget']} by session budget"
+            )
 
 # Main chat interface
 
+# Pick up OTP emails sent (or failed) since the last run before anything is drawn
+otp_delivery_pending = sync_otp_delivery() if st.session_state.conversation_flow["awaiting_otp"] else False
+
 # Display chat messages
 chat_container = st.container()
 
 with chat_container:
-    for message in st.session_state.messages:
-        message_class = "user" if message["role"] == "user" else "assistant"
-        timestamp = message.get("timestamp", "")
-        
-        # Choose sender name and avatar based on role
-        if message["role"] == "user":
-            sender_name = "You"
-            avatar_url = USER_AVATAR_URL
-        else:
-            sender_name = "Alex"
-            avatar_url = st.session_state.selected_avatar
-        
-        st.markdown(f"""
-        <div class="chat-message {message_class}">
-            <div style="display: flex; align-items: flex-start; gap: 12px; margin-bottom: 8px;">
-                <img src="{avatar_url}" style="width: 45px; height: 45px; border-radius: 50%; border: 2px solid #e0e0e0; flex-shrink: 0;">
-                <div style="flex: 1; min-width: 0;">
-                    <div class="sender-name" style="font-weight: bold; color: #333; font-size: 0.9rem; margin-bottom: 2px;">{sender_name}</div>
-                    <div class="message-time" style="font-size: 0.8rem; color: #666; margin-bottom: 6px;">{timestamp}</div>
-                    <div class="message-content" style="line-height: 1.5; word-wrap: break-word;">{message["content"]}</div>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    render_chat_history()
 
 # Handle conversation flow with interactive buttons
 if st.session_state.conversation_flow["awaiting_email"]:
@@ -1718,9 +1240,16 @@ if st.session_state.conversation_flow["awaiting_email"]:
             if email_input.strip():
                 add_message_to_chat("user", email_input)
                 
+                wait = rate_limit_wait(email_check_limits(st.session_state.rate_limit_id, rate_limit_client()))
+                if wait:
+                    add_message_to_chat("assistant", 
+                        f"⏳ Too many email checks from this session. Please wait {wait} and try again.")
+                    st.rerun()
+                
                 # Validate email
                 with st.spinner("Validating email..."):
-                    validation_result = comprehensive_email_validation(email_input.strip())
+                    from email_validation import validate_email_within_budget  # dnspython, first use only
+                    validation_result = validate_email_within_budget(email_input.strip())
                     
                     if handle_email_validation_flow(email_input.strip(), validation_result):
                         st.rerun()
@@ -1734,6 +1263,8 @@ elif st.session_state.conversation_flow["awaiting_otp"]:
     st.markdown("**📧 Verification Code Sent**")
     
     otp_data = st.session_state.otp_data
+    if otp_delivery_pending:
+        watch_otp_delivery()
     if otp_data:
         st.info(f"""
         We've sent a 6-digit verification code to **{otp_data['email']}**
@@ -1764,7 +1295,7 @@ elif st.session_state.conversation_flow["awaiting_otp"]:
                     add_message_to_chat("user", f"Entered verification code: {otp_input}")
                     
                     # Verify OTP
-                    is_valid, message = verify_otp(otp_input.strip(), st.session_state.otp_data)
+                    is_valid, message, failed_attempts = verify_otp(otp_input.strip(), st.session_state.otp_data)
                     
                     if is_valid:
                         # Success - move to product/service selection
@@ -1776,15 +1307,15 @@ elif st.session_state.conversation_flow["awaiting_otp"]:
                         
                         st.rerun()
                     else:
-                        # Failed verification
-                        st.session_state.otp_data["attempts"] = st.session_state.otp_data.get("attempts", 0) + 1
+                        # Failed verification (attempts are counted in the OTP store)
                         add_message_to_chat("assistant", f"❌ {message}")
                         
                         # Check if too many attempts
-                        if st.session_state.otp_data["attempts"] >= 3:
+                        if failed_attempts >= OTP_MAX_ATTEMPTS:
                             add_message_to_chat("assistant", 
                                 "Too many failed attempts. Please request a new verification code.")
                             # Reset OTP but keep email validated
+                            get_otp_store().discard(st.session_state.otp_data["email"])
                             st.session_state.otp_data = None
                             st.session_state.conversation_flow["awaiting_otp"] = False
                             st.session_state.conversation_flow["awaiting_email"] = True
@@ -1796,24 +1327,22 @@ elif st.session_state.conversation_flow["awaiting_otp"]:
         with col3:
             if st.button("📧 Resend Code", key="resend_otp", use_container_width=True):
                 otp_data = st.session_state.otp_data
-                if otp_data:
-                    # Generate new OTP
+                otp_queue = get_otp_queue()
+                wait = otp_data and rate_limit_wait(otp_send_limits(otp_data["email"], st.session_state.rate_limit_id))
+                if wait:
+                    add_message_to_chat("assistant", 
+                        f"⏳ Too many verification codes have been requested. Please wait {wait} before resending.")
+                    st.rerun()
+                if otp_data and otp_queue is not None:
+                    # Generate new OTP; it replaces the current one once its email is sent
                     new_otp = generate_otp()
-                    success, message = send_otp_email(otp_data["email"], new_otp)
-                    
-                    if success:
-                        # Update OTP data
-                        st.session_state.otp_data = {
-                            "otp": new_otp,
-                            "email": otp_data["email"],
-                            "timestamp": datetime.now(),
-                            "attempts": 0
-                        }
-                        add_message_to_chat("assistant", "📧 New verification code sent to your email!")
-                        st.success("New verification code sent!")
-                    else:
-                        add_message_to_chat("assistant", f"❌ Failed to resend verification code: {message}")
-                        st.error(f"Failed to resend: {message}")
+                    otp_data["pending_resend"] = {
+                        "timestamp": datetime.now(),
+                        "delivery_id": otp_queue.submit(
+                            otp_data["email"], new_otp,
+                            on_sent=partial(get_otp_store().issue, otp_data["email"], new_otp)
+                        )
+                    }
                     st.rerun()
 
 # Product/Service Selection Flow
@@ -1921,8 +1450,33 @@ if (not st.session_state.conversation_flow["awaiting_email"] and
         if not st.session_state.api_key:
             st.error("Please configure your OpenAI API key to start chatting.")
         else:
+            # Track interaction for keep-alive system
+            if "interaction_count" in st.session_state:
+                st.session_state.interaction_count += 1
+                st.session_state.last_activity = datetime.now()
+            
+            wait = rate_limit_wait(chat_limits(st.session_state.rate_limit_id, rate_limit_client()))
+            if wait:
+                add_message_to_chat("user", user_input)
+                add_message_to_chat("assistant", 
+                    f"⏳ You're sending messages faster than I can answer them. Please wait {wait} and try again.")
+                st.rerun()
+            
+            speculative_fn = None
+            if SPECULATIVE_ANSWERS:
+                llm_gateway = session_llm_gateway()
+                response_cache = get_response_cache()
+                memory = st.session_state.conversation_memory
+                allow_hedge = session_hedge_budget()
+                speculative_fn = lambda: generate_smart_response_enhanced(
+                    user_input, llm_gateway=llm_gateway, response_cache=response_cache, memory=memory,
+                    allow_hedge=allow_hedge
+                )
+            
             # Content moderation and gibberish detection
-            content_is_safe, filter_message = comprehensive_content_filter(user_input)
+            content_is_safe, filter_message, speculative_answer = run_content_filter_pipeline(
+                user_input, speculative_fn=speculative_fn
+            )
             
             if not content_is_safe:
                 # Add user message first
@@ -1937,11 +1491,28 @@ if (not st.session_state.conversation_flow["awaiting_email"] and
                 # Add user message (after passing content filter)
                 add_message_to_chat("user", user_input)
                 
+                # Show the new message and a bubble that AI tokens stream into
+                with chat_container:
+                    st.markdown(render_chat_message(st.session_state.messages[-1]), unsafe_allow_html=True)
+                    stream_placeholder = st.empty()
+                stream_timestamp = datetime.now().strftime("%H:%M")
+                
+                def render_stream(partial_text):
+                    stream_placeholder.markdown(render_chat_message({
+                        "role": "assistant",
+                        "content": partial_text + " ▌",
+                        "timestamp": stream_timestamp
+                    }), unsafe_allow_html=True)
+                
                 # Generate enhanced smart response
                 with st.spinner("Thinking..."):
                     try:
-                        ai_response = generate_smart_response_enhanced(user_input)
-                        add_message_to_chat("assistant", ai_response)
+                        if speculative_answer:
+                            ai_response = speculative_answer.result()
+                        else:
+                            ai_response = generate_smart_response_enhanced(user_input, on_token=render_stream)
+                        add_message_to_chat("assistant", ai_response, stream_timestamp)
+                        st.session_state.conversation_memory.add_turn(user_input, ai_response)
                         st.rerun()
                         
                     except Exception as e:
@@ -1958,3 +1529,6 @@ st.markdown(
     "</div>",
     unsafe_allow_html=True
 )
+
+# Everything above is on screen; build the chat indexes and import openai while the user types
+warm_up_chat_resources()
@@ -0,0 +1,133 @@
+"""Bounded per-session conversation memory and token-budgeted LLM context assembly (no Streamlit dependency)
+
+Recent turns (one user message and the answer to it) are kept in a fixed-size
+ring; turns pushed out of the ring are folded into a short rolling summary.
+Token counts are estimated locally, without a tokenizer download or network call;
+the estimate errs high so the assembled context stays under the budget.
+"""
+
+import hashlib
+import math
+import re
+from collections import deque
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separators around each chat message
+REPLY_PRIMING_TOKENS = 3     # Tokens the API adds to prime the assistant reply
+
+# ASCII words, then any other non-space character on its own: CJK and other non-Latin
+# scripts tokenize to about one token per character, which a \w+ run would hide
+_TOKEN_PIECES = re.compile(r"[A-Za-z0-9_]+|\S")
+
+def _piece_tokens(piece):
+    return math.ceil(len(piece) / 4)
+
+def estimate_tokens(text):
+    """Conservative token count: ASCII words one per four characters, any other character one each"""
+    return sum(map(_piece_tokens, _TOKEN_PIECES.findall(text)))
+
+def truncate_to_tokens(text, max_tokens):
+    """Longest prefix of text whose estimate fits max_tokens (cut at a piece boundary)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    end = 0
+    for match in _TOKEN_PIECES.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            break
+        end = match.end()
+    return text[:end]
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+def _first_sentence(text, max_tokens):
+    """First non-empty line's first sentence, without markdown decoration, cut to max_tokens"""
+    for line in text.splitlines():
+        line = line.strip(" #*>-_`")
+        if line:
+            return truncate_to_tokens(re.split(r"(?<=[.!?])\s", line, maxsplit=1)[0], max_tokens)
+    return ""
+
+class ConversationMemory:
+    """
+    Last max_turns exchanges verbatim, plus a rolling summary of older ones
+    capped at summary_tokens; memory per session is bounded whatever its length
+    """
+
+    def __init__(self, max_turns=6, summary_tokens=200, summary_line_tokens=30):
+        self.turns = deque(maxlen=max_turns)  # (user_message, assistant_message)
+        self.summary_lines = deque()
+        self.summary_tokens = summary_tokens
+        self.summary_line_tokens = summary_line_tokens
+        self._summary_size = 0
+
+    def add_turn(self, user_message, assistant_message):
+        if len(self.turns) == self.turns.maxlen:
+            self._summarize(*self.turns[0])
+        self.turns.append((user_message, assistant_message))
+
+    def _summarize(self, user_message, assistant_message):
+        """Fold an evicted turn into the summary, dropping the oldest lines past summary_tokens"""
+        line = f"- Asked: {_first_sentence(user_message, self.summary_line_tokens)}"
+        answer = _first_sentence(assistant_message, self.summary_line_tokens)
+        if answer:
+            line += f" / Answered: {answer}"
+        self.summary_lines.append((line, estimate_tokens(line)))
+        self._summary_size += self.summary_lines[-1][1]
+        while self._summary_size > self.summary_tokens and self.summary_lines:
+            self._summary_size -= self.summary_lines.popleft()[1]
+
+    @property
+    def summary(self):
+        return "\n".join(line for line, size in self.summary_lines)
+
+    def clear(self):
+        self.turns.clear()
+        self.summary_lines.clear()
+        self._summary_size = 0
+
+    def __len__(self):
+        return len(self.turns)
+
+    def build_context(self, system_prompt, user_message, budget_tokens):
+        """
+        Chat messages for the API within budget_tokens, and a digest of the history they include
+        The system prompt (never cut, so keep it well under the budget) and the user message,
+        truncated if needed, always go in; then the summary, then as many recent turns as
+        fit, newest first. The digest is "" when no history is included, so answers to the
+        same standalone question share a cache key
+        """
+        system = {"role": "system", "content": system_prompt}
+        remaining = budget_tokens - REPLY_PRIMING_TOKENS - message_tokens(system) - MESSAGE_OVERHEAD_TOKENS
+        user_message = truncate_to_tokens(user_message, max(remaining, 0))
+        remaining -= estimate_tokens(user_message)
+
+        history = []
+        summary = self.summary
+        if summary:
+            summary_message = {"role": "system", "content": f"Earlier in this conversation:\n{summary}"}
+            if message_tokens(summary_message) <= remaining:
+                history.append(summary_message)
+                remaining -= message_tokens(summary_message)
+
+        recent = []
+        for user_turn, assistant_turn in reversed(self.turns):
+            pair = [{"role": "user", "content": user_turn}, {"role": "assistant", "content": assistant_turn}]
+            cost = sum(map(message_tokens, pair))
+            if cost > remaining:
+                break
+            recent[:0] = pair
+            remaining -= cost
+        history += recent
+
+        digest = ""
+        if history:
+            digest = hashlib.sha256(
+                "\x00".join(f"{message['role']}:{message['content']}" for message in history).encode("utf-8")
+            ).hexdigest()
+        return [system, *history, {"role": "user", "content": user_message}], digest
+
+def context_tokens(messages):
+    """Estimated prompt size of assembled messages (what build_context keeps under budget)"""
+    return sum(map(message_tokens, messages)) + REPLY_PRIMING_TOKENS
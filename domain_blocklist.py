@@ -0,0 +1,223 @@
+"""Compact personal/disposable email domain lists with suffix matching and hot reload
+
+Each list is one sorted bytes blob plus an array of 32-bit offsets and a
+first-two-byte bucket table, searched with bisect. Measured with
+benchmarks/bench_domain_blocklist.py on 500k synthetic domains: ~9 MB against
+~48 MB for a Python set of str, and ~4 us per exact lookup (~13 us for a
+suffix match over a three-label subdomain) against ~0.1 us for the set.
+Rerun the benchmark for numbers on the deployment machine.
+
+List files hold one domain per line; blank lines and '#' comments are ignored.
+"""
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PERSONAL_DOMAINS_PATH = os.path.join(DATA_DIR, "personal_domains.txt")
+DISPOSABLE_DOMAINS_PATH = os.path.join(DATA_DIR, "disposable_domains.txt")
+
+# =============================================================================
+# SORTED DOMAIN SET
+# =============================================================================
+
+def _encode_domain(domain):
+    """Normalised ASCII bytes for a domain (IDNA for internationalised names), or None if invalid"""
+    domain = domain.strip().lower().rstrip('.')
+    if not domain:
+        return None
+    try:
+        return domain.encode('ascii')
+    except UnicodeEncodeError:
+        pass
+    try:
+        return domain.encode('idna')
+    except UnicodeError:
+        return None
+
+BUCKET_COUNT = 1 << 16
+
+def _bucket(key):
+    """Bucket of an encoded domain: its first two bytes (sorted order is preserved)"""
+    return (key[0] << 8) | (key[1] if len(key) > 1 else 0)
+
+class SortedDomainSet:
+    """Immutable set of domains stored as one sorted bytes blob; membership by binary search"""
+
+    def __init__(self, domains=()):
+        encoded = sorted({key for key in map(_encode_domain, domains) if key})
+        self._blob = b"".join(encoded)
+        self._offsets = array('I', [0])
+        for item in encoded:
+            self._offsets.append(self._offsets[-1] + len(item))
+        # First-two-byte bucket table: narrows each binary search to a handful of probes
+        self._buckets = array('I', [0]) * (BUCKET_COUNT + 1)
+        for item in encoded:
+            self._buckets[_bucket(item) + 1] += 1
+        for index in range(BUCKET_COUNT):
+            self._buckets[index + 1] += self._buckets[index]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._blob[self._offsets[index]:self._offsets[index + 1]]
+
+    def __contains__(self, domain):
+        key = _encode_domain(domain)
+        if key is None:
+            return False
+        bucket = _bucket(key)
+        index = bisect_left(self, key, self._buckets[bucket], self._buckets[bucket + 1])
+        return index < len(self) and self[index] == key
+
+    def match_suffix(self, domain):
+        """Return the listed domain that equals domain or one of its parent domains, or None"""
+        labels = domain.lower().rstrip('.').split('.')
+        # Most specific first, stopping before the bare TLD
+        for start in range(len(labels) - 1):
+            candidate = '.'.join(labels[start:])
+            if candidate in self:
+                return candidate
+        return None
+
+    def memory_bytes(self):
+        return (len(self._blob) + self._offsets.itemsize * len(self._offsets)
+                + self._buckets.itemsize * len(self._buckets))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as domain_file:
+            return cls(line.split('#', 1)[0] for line in domain_file)
+
+# =============================================================================
+# RELOADABLE BLOCKLIST
+# =============================================================================
+
+# A reloaded list this much smaller than the one loaded before it is taken for a truncated file
+MIN_RELOAD_RATIO = 0.5
+
+class DomainBlocklist:
+    """
+    SortedDomainSet backed by a local file, rebuilt when the file's mtime changes
+    The file is stat()ed at most once per check_interval seconds; a missing, unreadable
+    or undecodable file keeps the last good list (or the built-in defaults), and so does
+    one that is empty or less than min_reload_ratio of the size of the last file loaded
+    """
+
+    def __init__(self, path, defaults=(), check_interval=30, min_reload_ratio=MIN_RELOAD_RATIO,
+                 clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self.min_reload_ratio = min_reload_ratio
+        self.clock = clock
+        self._domains = SortedDomainSet(defaults)
+        self._mtime = None
+        self._loaded = False  # True once the list comes from the file rather than the defaults
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.last_error = None  # Why the latest version of the file was not loaded
+        self.reload()
+
+    def reload(self, force=False):
+        """
+        Rebuild from path if it changed since the last load; returns True when reloaded
+        force also reloads an unchanged file and accepts a much smaller list (a deliberate cut)
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except (OSError, TypeError):
+            return False
+        if mtime == self._mtime and not force:
+            return False
+        # A rejected version is not parsed again every check_interval; the next write is
+        self._mtime = mtime
+        try:
+            domains = SortedDomainSet.from_file(self.path)
+        except (OSError, UnicodeDecodeError) as e:
+            self.last_error = f"unreadable: {e}"
+            return False
+        if not domains:
+            self.last_error = "empty list"
+            return False
+        if not force and self._loaded and len(domains) < self.min_reload_ratio * len(self._domains):
+            self.last_error = f"{len(domains)} domains, down from {len(self._domains)}"
+            return False
+        # Swap in one assignment so concurrent lookups see the old or the new list, never a mix
+        self._domains = domains
+        self._loaded = True
+        self.last_error = None
+        return True
+
+    def _maybe_reload(self):
+        now = self.clock()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            self.reload()
+
+    def match(self, domain):
+        """Listed domain covering domain (exact or parent), or None"""
+        self._maybe_reload()
+        return self._domains.match_suffix(domain)
+
+    def __len__(self):
+        return len(self._domains)
+
+    def stats(self):
+        return {'path': self.path, 'domains': len(self._domains), 'bytes': self._domains.memory_bytes(),
+                'last_error': self.last_error}
+
+# =============================================================================
+# SHARED LISTS
+# =============================================================================
+
+# Used when the list files are missing, so the check never silently passes everything
+DEFAULT_PERSONAL_DOMAINS = (
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com',
+    'icloud.com', 'me.com', 'mac.com', 'live.com', 'msn.com',
+    'yahoo.co.uk', 'yahoo.ca', 'yahoo.com.au', 'googlemail.com',
+    'protonmail.com', 'tutanota.com', 'zoho.com', 'yandex.com',
+    'mail.com', 'gmx.com', 'inbox.com', 'fastmail.com'
+)
+
+DEFAULT_DISPOSABLE_DOMAINS = (
+    'mailinator.com', 'guerrillamail.com', '10minutemail.com', 'temp-mail.org',
+    'yopmail.com', 'trashmail.com', 'sharklasers.com', 'getnada.com',
+    'dispostable.com', 'maildrop.cc', 'throwawaymail.com', 'fakeinbox.com'
+)
+
+@lru_cache(maxsize=1)
+def get_personal_domains():
+    """Shared personal-provider list from PERSONAL_DOMAINS_FILE (default data/personal_domains.txt)"""
+    return DomainBlocklist(
+        os.getenv("PERSONAL_DOMAINS_FILE", PERSONAL_DOMAINS_PATH),
+        defaults=DEFAULT_PERSONAL_DOMAINS,
+        check_interval=int(os.getenv("DOMAIN_LIST_CHECK_INTERVAL", "30"))
+    )
+
+@lru_cache(maxsize=1)
+def get_disposable_domains():
+    """Shared disposable-provider list from DISPOSABLE_DOMAINS_FILE (default data/disposable_domains.txt)"""
+    return DomainBlocklist(
+        os.getenv("DISPOSABLE_DOMAINS_FILE", DISPOSABLE_DOMAINS_PATH),
+        defaults=DEFAULT_DISPOSABLE_DOMAINS,
+        check_interval=int(os.getenv("DOMAIN_LIST_CHECK_INTERVAL", "30"))
+    )
+
+def classify_email_domain(domain):
+    """Return ('disposable' | 'personal' | None, matched listed domain)"""
+    matched = get_disposable_domains().match(domain)
+    if matched:
+        return 'disposable', matched
+    matched = get_personal_domains().match(domain)
+    if matched:
+        return 'personal', matched
+    return None, None
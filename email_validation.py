@@ -0,0 +1,512 @@
+"""Corporate email validation: format, DNS and personal-provider checks (no Streamlit dependency)
+
+Run `python email_validation.py leads.txt -o results.csv` to validate a list of
+addresses (one per line) with the same rules; see --help for options.
+"""
+
+import argparse
+import asyncio
+import atexit
+import csv
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+from domain_blocklist import classify_email_domain
+
+# =============================================================================
+# DNS RESULT CACHE
+# =============================================================================
+
+class DnsResultCache:
+    """
+    Process-wide cache of DNS answers keyed by (domain, record type)
+    Positive answers live for the record's own TTL; NXDOMAIN and NoAnswer are
+    cached for negative_ttl seconds. Optionally persisted to a JSON file so a
+    restarted process starts warm.
+    """
+
+    def __init__(self, negative_ttl=300, max_entries=10000, persist_path=None,
+                 persist_interval=30, resolver=None, clock=time.time):
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.persist_interval = persist_interval
+        self.resolver = resolver or dns.resolver.resolve
+        self.clock = clock  # Wall clock, so persisted expiry times survive restarts
+        self._entries = OrderedDict()  # (domain, rdtype) -> (expires_at, status, records)
+        self._lock = threading.Lock()
+        self._last_persist = 0.0
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if persist_path:
+            self.load()
+
+    def resolve(self, domain, rdtype):
+        """
+        Return the record texts for domain/rdtype, from cache when still fresh
+        Raises dns.resolver.NXDOMAIN / NoAnswer for (cached) negative answers;
+        other resolver errors propagate and are not cached
+        """
+        entry = self.cached_entry(domain, rdtype)
+        if entry is None:
+            try:
+                answer = self.resolver(self._key(domain, rdtype)[0], rdtype)
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as error:
+                entry = self.store_negative(domain, rdtype, error)
+            else:
+                entry = self.store_answer(domain, rdtype, answer)
+        return self._unpack(entry)
+
+    @staticmethod
+    def _key(domain, rdtype):
+        return (domain.lower().rstrip('.'), rdtype)
+
+    def cached_entry(self, domain, rdtype):
+        """Return the fresh (expires_at, status, records) entry, or None on a miss"""
+        key = self._key(domain, rdtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def store_answer(self, domain, rdtype, answer):
+        """Cache a resolver answer for its record TTL and return the entry"""
+        entry = (self.clock() + answer.rrset.ttl, 'ok', [record.to_text() for record in answer])
+        self._store(self._key(domain, rdtype), entry)
+        return entry
+
+    def store_negative(self, domain, rdtype, error):
+        """Cache an NXDOMAIN or NoAnswer error for negative_ttl and return the entry"""
+        status = 'nxdomain' if isinstance(error, dns.resolver.NXDOMAIN) else 'noanswer'
+        entry = (self.clock() + self.negative_ttl, status, [])
+        self._store(self._key(domain, rdtype), entry)
+        return entry
+
+    @staticmethod
+    def _unpack(entry):
+        expires_at, status, records = entry
+        if status == 'nxdomain':
+            raise dns.resolver.NXDOMAIN()
+        if status == 'noanswer':
+            raise dns.resolver.NoAnswer()
+        return records
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        if self.persist_path and self.clock() - self._last_persist >= self.persist_interval:
+            self.save()
+
+    def load(self):
+        """Read unexpired entries from persist_path, ignoring a missing or corrupt file"""
+        try:
+            with open(self.persist_path, encoding="utf-8") as cache_file:
+                rows = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        now = self.clock()
+        with self._lock:
+            for domain, rdtype, expires_at, status, records in rows:
+                if expires_at > now:
+                    self._entries[(domain, rdtype)] = (expires_at, status, records)
+
+    def save(self):
+        """Atomically write unexpired entries to persist_path"""
+        if not self.persist_path:
+            return
+        now = self.clock()
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = [[domain, rdtype, expires_at, status, records]
+                    for (domain, rdtype), (expires_at, status, records) in self._entries.items()
+                    if expires_at > now]
+            self._dirty = False
+            self._last_persist = now
+        directory = os.path.dirname(os.path.abspath(self.persist_path))
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, encoding="utf-8") as tmp_file:
+                json.dump(rows, tmp_file)
+            os.replace(tmp_file.name, self.persist_path)
+        except OSError:
+            pass  # Persistence is best effort; the in-memory cache keeps working
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+@lru_cache(maxsize=1)
+def get_dns_cache():
+    """Shared DNS cache, configured from DNS_NEGATIVE_TTL, DNS_CACHE_SIZE and DNS_CACHE_FILE"""
+    dns_cache = DnsResultCache(
+        negative_ttl=int(os.getenv("DNS_NEGATIVE_TTL", "300")),
+        max_entries=int(os.getenv("DNS_CACHE_SIZE", "10000")),
+        persist_path=os.getenv("DNS_CACHE_FILE") or None
+    )
+    atexit.register(dns_cache.save)
+    return dns_cache
+
+# =============================================================================
+# ASYNC DNS VALIDATION WITH A LATENCY BUDGET
+# =============================================================================
+
+EMAIL_DNS_BUDGET = float(os.getenv("EMAIL_DNS_BUDGET", "2.0"))  # Seconds for all lookups of one domain
+
+def make_async_resolver(nameservers=None, port=53):
+    """Async resolver using the system configuration, or explicit nameservers (e.g. a local stub server)"""
+    if not nameservers:
+        return dns.asyncresolver.Resolver()
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = list(nameservers)
+    resolver.port = port
+    return resolver
+
+@lru_cache(maxsize=1)
+def get_async_resolver():
+    """Shared async resolver; DNS_NAMESERVERS (comma separated) overrides the system resolvers"""
+    nameservers = [server.strip() for server in os.getenv("DNS_NAMESERVERS", "").split(",") if server.strip()]
+    return make_async_resolver(nameservers, int(os.getenv("DNS_PORT", "53")))
+
+async def _lookup_async(domain, rdtype, resolver, dns_cache, lifetime):
+    """Cached-or-resolved (expires_at, status, records) entry for one record type"""
+    entry = dns_cache.cached_entry(domain, rdtype)
+    if entry is not None:
+        return entry
+    try:
+        answer = await resolver.resolve(domain, rdtype, lifetime=lifetime)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as error:
+        return dns_cache.store_negative(domain, rdtype, error)
+    return dns_cache.store_answer(domain, rdtype, answer)
+
+async def validate_domain_async(domain, budget_seconds=None, resolver=None, dns_cache=None,
+                                accept_on_timeout=True):
+    """
+    Validate domain with concurrent MX and A lookups under a total time budget
+    Returns tuple: (is_valid, message, degraded)
+    degraded is True when the budget ran out before DNS gave a definite answer; the
+    domain is then accepted (accept_on_timeout) since the OTP step still proves the mailbox
+    """
+    budget_seconds = EMAIL_DNS_BUDGET if budget_seconds is None else budget_seconds
+    resolver = resolver or get_async_resolver()
+    dns_cache = dns_cache or get_dns_cache()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget_seconds
+    
+    # The A lookup starts straight away so a missing MX record costs no extra round trip
+    mx_task = asyncio.ensure_future(_lookup_async(domain, 'MX', resolver, dns_cache, budget_seconds))
+    a_task = asyncio.ensure_future(_lookup_async(domain, 'A', resolver, dns_cache, budget_seconds))
+    
+    try:
+        try:
+            mx_status = (await asyncio.wait_for(asyncio.shield(mx_task), max(deadline - loop.time(), 0)))[1]
+        except (asyncio.TimeoutError, dns.exception.Timeout):
+            return _timed_out_domain_result(a_task, accept_on_timeout)
+        except Exception as e:
+            return False, f"DNS lookup error: {str(e)}", False
+        
+        if mx_status == 'ok':
+            return True, "Domain has valid MX records", False
+        if mx_status == 'nxdomain':
+            return False, "Domain does not exist", False
+        
+        # If no MX record, check if domain exists with A record
+        try:
+            a_status = (await asyncio.wait_for(asyncio.shield(a_task), max(deadline - loop.time(), 0)))[1]
+        except (asyncio.TimeoutError, dns.exception.Timeout):
+            return _timed_out_domain_result(a_task, accept_on_timeout)
+        except Exception:
+            return False, "Domain validation failed", False
+        if a_status == 'ok':
+            return True, "Domain exists but no MX record found", False
+        return False, "Domain validation failed", False
+    finally:
+        for task in (mx_task, a_task):
+            task.cancel()
+
+def _timed_out_domain_result(a_task, accept_on_timeout):
+    """Best definite answer once the budget is spent, using the A lookup if it already finished"""
+    if a_task.done() and not a_task.cancelled() and a_task.exception() is None:
+        a_status = a_task.result()[1]
+        if a_status == 'ok':
+            return True, "Domain exists (MX lookup exceeded the time budget)", True
+        if a_status == 'nxdomain':
+            return False, "Domain does not exist", False
+    if accept_on_timeout:
+        return True, "Domain check timed out - accepted pending code verification", True
+    return False, "Domain check timed out", True
+
+# =============================================================================
+# EMAIL VALIDATION FUNCTIONS
+# =============================================================================
+
+def validate_email_format(email):
+    """Validate email format using regex"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    return re.match(pattern, email) is not None
+
+def validate_domain(domain, dns_cache=None):
+    """Validate domain by checking DNS records (answers come from the shared DNS cache)"""
+    if dns_cache is None:
+        dns_cache = get_dns_cache()
+    try:
+        # Check if domain has MX record (mail exchange)
+        mx_records = dns_cache.resolve(domain, 'MX')
+        if mx_records:
+            return True, "Domain has valid MX records"
+    except dns.resolver.NXDOMAIN:
+        return False, "Domain does not exist"
+    except dns.resolver.NoAnswer:
+        try:
+            # If no MX record, check if domain exists with A record
+            a_records = dns_cache.resolve(domain, 'A')
+            if a_records:
+                return True, "Domain exists but no MX record found"
+        except:
+            return False, "Domain validation failed"
+    except Exception as e:
+        return False, f"DNS lookup error: {str(e)}"
+    
+    return False, "Domain validation failed"
+
+def blocked_provider_message(domain):
+    """Rejection message if domain is a disposable or personal provider, else None (no DNS needed)"""
+    # Disposable and personal providers come from the reloadable blocklists (subdomains included)
+    provider_kind, matched = classify_email_domain(domain)
+    if provider_kind == 'disposable':
+        return f"'{domain}' is a disposable email provider"
+    if provider_kind == 'personal':
+        return f"'{domain}' is a personal email provider"
+    return None
+
+def is_corporate_email(email):
+    """Check if email is from a corporate domain (not personal or disposable email providers)"""
+    
+    domain = email.split('@')[1].lower()
+    
+    blocked_message = blocked_provider_message(domain)
+    if blocked_message:
+        return False, blocked_message
+    
+    # Additional checks for corporate emails
+    corporate_indicators = [
+        # Common corporate domain patterns
+        '.edu',  # Educational institutions
+        '.gov',  # Government
+        '.org',  # Organizations (many are corporate)
+    ]
+    
+    # Check if domain ends with corporate indicators
+    for indicator in corporate_indicators:
+        if domain.endswith(indicator):
+            return True, f"Domain '{domain}' appears to be institutional/corporate"
+    
+    # If not in personal list and not obviously personal, likely corporate
+    # Additional validation: check if domain is not a known personal provider
+    if '.' in domain and len(domain.split('.')) >= 2:
+        return True, f"Domain '{domain}' appears to be corporate"
+    
+    return False, "Unable to determine if email is corporate"
+
+def _start_email_validation(email):
+    """Format check, domain extraction and provider blocklist; returns (results, domain or None to stop)"""
+    results = {
+        'email': email,
+        'is_valid': False,
+        'format_valid': False,
+        'domain_valid': False,
+        'is_corporate': False,
+        'degraded': False,
+        'messages': []
+    }
+    
+    # Step 1: Format validation
+    if not validate_email_format(email):
+        results['messages'].append("❌ Invalid email format")
+        return results, None
+    
+    results['format_valid'] = True
+    results['messages'].append("✅ Email format is valid")
+    
+    # Step 2: Extract domain and validate
+    try:
+        domain = email.split('@')[1].lower()
+    except IndexError:
+        results['messages'].append("❌ Could not extract domain")
+        return results, None
+    
+    # Personal and disposable providers are rejected before any DNS lookup is spent on them
+    blocked_message = blocked_provider_message(domain)
+    if blocked_message:
+        results['messages'].append(f"❌ {blocked_message}")
+        return results, None
+    
+    return results, domain
+
+def _finish_email_validation(results, email, domain_valid, domain_message, degraded=False):
+    """Record the domain verdict, then run the corporate email check"""
+    # Step 3: Domain validation
+    results['domain_valid'] = domain_valid
+    results['degraded'] = degraded
+    
+    if domain_valid:
+        results['messages'].append(f"{'⚠️' if degraded else '✅'} {domain_message}")
+    else:
+        results['messages'].append(f"❌ {domain_message}")
+        return results
+    
+    # Step 4: Corporate email check
+    is_corp, corp_message = is_corporate_email(email)
+    results['is_corporate'] = is_corp
+    
+    if is_corp:
+        results['messages'].append(f"✅ {corp_message}")
+    else:
+        results['messages'].append(f"❌ {corp_message}")
+    
+    # Overall validation
+    results['is_valid'] = results['format_valid'] and results['domain_valid'] and results['is_corporate']
+    
+    return results
+
+def comprehensive_email_validation(email):
+    """Perform comprehensive email validation"""
+    results, domain = _start_email_validation(email)
+    if domain is None:
+        return results
+    
+    domain_valid, domain_message = validate_domain(domain)
+    return _finish_email_validation(results, email, domain_valid, domain_message)
+
+async def comprehensive_email_validation_async(email, budget_seconds=None, resolver=None, dns_cache=None):
+    """Comprehensive email validation with async DNS lookups under a time budget ('degraded' in results)"""
+    results, domain = _start_email_validation(email)
+    if domain is None:
+        return results
+    
+    domain_valid, domain_message, degraded = await validate_domain_async(
+        domain, budget_seconds=budget_seconds, resolver=resolver, dns_cache=dns_cache
+    )
+    return _finish_email_validation(results, email, domain_valid, domain_message, degraded)
+
+def validate_email_within_budget(email, budget_seconds=None):
+    """Blocking entry point for the UI: runs the async validation on a private event loop"""
+    return asyncio.run(comprehensive_email_validation_async(email, budget_seconds=budget_seconds))
+
+# =============================================================================
+# BATCH VALIDATION
+# =============================================================================
+
+BATCH_DNS_BUDGET = 5.0  # Per-domain budget for offline lists; no user is waiting on a spinner
+RESULT_FIELDS = ['email', 'is_valid', 'format_valid', 'domain_valid', 'is_corporate', 'degraded', 'messages']
+
+async def validate_emails_async(emails, concurrency=50, budget_seconds=BATCH_DNS_BUDGET,
+                                accept_on_timeout=False, resolver=None, dns_cache=None):
+    """
+    Async generator of validation results for many addresses, in completion order
+    Addresses are grouped by domain so each unique domain is resolved once, with at
+    most `concurrency` domains in flight; malformed and blocklisted addresses are yielded first
+    A domain whose lookup times out is invalid unless accept_on_timeout: offline lists
+    have no OTP step that would later prove the mailbox
+    """
+    by_domain = {}
+    for email in emails:
+        results, domain = _start_email_validation(email)
+        if domain is None:
+            yield results
+        else:
+            by_domain.setdefault(domain, []).append((email, results))
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def check_domain(domain):
+        async with semaphore:
+            return domain, await validate_domain_async(domain, budget_seconds=budget_seconds, resolver=resolver,
+                                                       dns_cache=dns_cache, accept_on_timeout=accept_on_timeout)
+    
+    for finished in asyncio.as_completed([check_domain(domain) for domain in by_domain]):
+        domain, (domain_valid, domain_message, degraded) = await finished
+        for email, results in by_domain[domain]:
+            yield _finish_email_validation(results, email, domain_valid, domain_message, degraded)
+
+def iter_validated_emails(emails, **options):
+    """Blocking iterator over validate_emails_async (same options), for scripts and notebooks"""
+    loop = asyncio.new_event_loop()
+    results = validate_emails_async(emails, **options)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
+
+def write_results(results, output, output_format="csv"):
+    """Stream results to a text file as CSV or JSON lines; returns the number written"""
+    written = 0
+    if output_format == "csv":
+        writer = csv.writer(output)
+        writer.writerow(RESULT_FIELDS)
+    for result in results:
+        if output_format == "csv":
+            writer.writerow([result[field] for field in RESULT_FIELDS[:-1]] + ["; ".join(result['messages'])])
+        else:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        written += 1
+    return written
+
+def read_addresses(lines):
+    """Addresses from a one-per-line file, skipping blanks, comments and an 'email' header"""
+    for line in lines:
+        address = line.split(',', 1)[0].strip()
+        if address and not address.startswith('#') and address.lower() != 'email':
+            yield address
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a list of email addresses (one per line)")
+    parser.add_argument("input", help="address file, or - for stdin (first CSV column is used)")
+    parser.add_argument("-o", "--output", default="-", help="result file, or - for stdout")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--concurrency", type=int, default=50, help="domains resolved at once")
+    parser.add_argument("--budget", type=float, default=BATCH_DNS_BUDGET, help="seconds per domain lookup")
+    parser.add_argument("--accept-on-timeout", action="store_true",
+                        help="mark domains whose lookup times out valid (degraded) instead of invalid")
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    with input_file, output_file:
+        addresses = list(read_addresses(input_file))
+        domain_count = len({address.rsplit('@', 1)[-1].lower() for address in addresses if '@' in address})
+        started = time.perf_counter()
+        count = write_results(
+            iter_validated_emails(addresses, concurrency=args.concurrency, budget_seconds=args.budget,
+                                  accept_on_timeout=args.accept_on_timeout),
+            output_file, args.format
+        )
+        elapsed = time.perf_counter() - started
+    print(f"Validated {count} addresses ({domain_count} domains) in {elapsed:.2f}s: "
+          f"{count / elapsed if elapsed else 0:.0f} addresses/s", file=sys.stderr)
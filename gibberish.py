@@ -0,0 +1,314 @@
+"""Local gibberish detection: rule-based heuristics plus a character n-gram language model
+
+Run `python gibberish.py evaluate` to compare the model against the heuristics
+on the bundled evaluation and held-out sets, or `python gibberish.py calibrate`
+to suggest new thresholds after changing the training corpus.
+"""
+
+import argparse
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CORPUS_PATH = os.path.join(DATA_DIR, "business_corpus.txt")
+EVAL_PATH = os.path.join(DATA_DIR, "gibberish_eval.tsv")
+# Acronym-heavy, non-English and code-like queries the corpus does not resemble
+HOLDOUT_PATH = os.path.join(DATA_DIR, "gibberish_holdout.tsv")
+
+# =============================================================================
+# RULE-BASED GIBBERISH HEURISTICS
+# =============================================================================
+
+VOWELS = 'aeiou'
+CONSONANTS = 'bcdfghjklmnpqrstvwxyz'
+KEYBOARD_ROWS = ['qwertyuiop', 'asdfghjkl', 'zxcvbnm']
+
+# Common gibberish patterns, reported in this order
+GIBBERISH_PATTERNS = [
+    'aaaa', 'bbbb', 'cccc', 'dddd', 'eeee',
+    'asdf', 'qwer', 'zxcv', 'hjkl',
+    'test123', 'aaaaa', 'bbbbb'
+]
+
+# Every 4-key run along a keyboard row, forwards and backwards
+KEYBOARD_SEQUENCES = frozenset(
+    sequence
+    for row in KEYBOARD_ROWS
+    for i in range(len(row) - 3)
+    for sequence in (row[i:i + 4], row[i:i + 4][::-1])
+)
+
+# Lookup table: vowels become 'V', consonants 'C', everything else is left as is
+# (text is lowercased first, so a literal 'V' or 'C' can never clash)
+_LETTER_CLASSES = str.maketrans({**dict.fromkeys(VOWELS, 'V'), **dict.fromkeys(CONSONANTS, 'C')})
+
+def _trie_regex(words):
+    """Regex source for a character trie of words, so each position tries at most one branch per character"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+_ALL_PATTERNS = sorted(KEYBOARD_SEQUENCES) + GIBBERISH_PATTERNS
+_PATTERN_SEARCH = re.compile(_trie_regex(_ALL_PATTERNS))
+# Lookahead variant reports the longest pattern starting at every position, overlaps included
+_PATTERN_SCAN = re.compile('(?=(' + _trie_regex(_ALL_PATTERNS) + '))')
+
+def _pattern_verdicts():
+    """For each pattern: (keyboard run hit?, lowest GIBBERISH_PATTERNS index hit) over it and its prefixes,
+    since the scan only reports the longest of several patterns starting at one position"""
+    verdicts = {}
+    for pattern in _ALL_PATTERNS:
+        prefixes = [other for other in _ALL_PATTERNS if pattern.startswith(other)]
+        spam_indexes = [GIBBERISH_PATTERNS.index(other) for other in prefixes if other in GIBBERISH_PATTERNS]
+        verdicts[pattern] = (
+            any(other in KEYBOARD_SEQUENCES for other in prefixes),
+            min(spam_indexes) if spam_indexes else None
+        )
+    return verdicts
+
+_PATTERN_VERDICTS = _pattern_verdicts()
+
+def detect_gibberish(text):
+    """Detect if text is gibberish or meaningless"""
+    
+    # Basic gibberish detection patterns
+    text_clean = text.lower().strip()
+    
+    # Check for minimum length
+    if len(text_clean) < 2:
+        return True, "Message too short"
+    
+    # Check for excessive repetition of characters
+    if len(text_clean) > 5 and len(set(text_clean)) <= 2:
+        return True, "Excessive character repetition detected"
+    
+    # One table-driven pass classifies every character; the counts below run in C
+    letter_classes = text_clean.translate(_LETTER_CLASSES)
+    vowel_count = letter_classes.count('V')
+    consonant_count = letter_classes.count('C')
+    total_letters = vowel_count + consonant_count
+    
+    if total_letters > 5:
+        vowel_ratio = vowel_count / total_letters
+        # If vowel ratio is too low (< 0.1) or too high (> 0.8), likely gibberish
+        if vowel_ratio < 0.1 or vowel_ratio > 0.8:
+            return True, "Unusual character pattern detected"
+    
+    # Check for excessive consecutive consonants (more than 4 in a row)
+    if 'CCCCC' in letter_classes:
+        return True, "Excessive consecutive consonants detected"
+    
+    # Keyboard mashing and common gibberish patterns share one compiled trie;
+    # most valid text has no hit at all and is settled by a single search
+    if not _PATTERN_SEARCH.search(text_clean):
+        return False, "Text appears valid"
+    
+    lowest_spam_index = None
+    for match in _PATTERN_SCAN.finditer(text_clean):
+        is_keyboard, spam_index = _PATTERN_VERDICTS[match.group(1)]
+        if is_keyboard:
+            return True, "Keyboard sequence pattern detected"
+        if spam_index is not None and (lowest_spam_index is None or spam_index < lowest_spam_index):
+            lowest_spam_index = spam_index
+    
+    if lowest_spam_index is not None:
+        return True, f"Common gibberish pattern detected: {GIBBERISH_PATTERNS[lowest_spam_index]}"
+    
+    return False, "Text appears valid"
+
+# =============================================================================
+# CHARACTER N-GRAM LANGUAGE MODEL
+# =============================================================================
+
+ALPHABET = " abcdefghijklmnopqrstuvwxyz"
+
+# Byte -> alphabet index; everything that is not a letter becomes a space
+_CHAR_CODES = np.zeros(256, dtype=np.intp)
+for _index, _char in enumerate(ALPHABET):
+    _CHAR_CODES[ord(_char)] = _index
+
+# Calibrated on both bundled sets (see `python gibberish.py calibrate`); scores are average
+# log2 probability per character of the plain words. Non-English queries still score close
+# to gibberish, so those between the thresholds go to the remote check
+GIBBERISH_THRESHOLD = -6.0   # At or below: gibberish without asking the remote model
+VALID_THRESHOLD = -4.0       # At or above: valid without asking the remote model
+MIN_MODEL_CHARACTERS = 12    # Shorter texts are too noisy to score
+MIN_TERM_TOKENS = 2          # Unscorable texts with this many acronyms or identifiers are valid
+
+# Only plain words ("vessel", "Crewing") are scored. Acronyms ("CRM", "ECDIS"), mixed case
+# ("PowerBI", "gRPC") and tokens with digits or inner punctuation ("S/4HANA", "PO.created",
+# "9321483") are technical terms the English character model would score as gibberish
+_PLAIN_WORD = re.compile(r"[A-Za-z][a-z]*(?:['’-][a-z]+)*")
+_EDGE_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+class CharNgramModel:
+    """Character-level Markov model over lowercase letters and space, with add-k smoothing"""
+
+    def __init__(self, order=3, smoothing=0.1):
+        self.order = order
+        self.smoothing = smoothing
+        self.size = len(ALPHABET)
+        self.log_probs = None
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(re.sub(r"[^a-z]+", " ", text.lower()).split())
+
+    def _codes(self, normalized):
+        padded = " " * (self.order - 1) + normalized + " "
+        return _CHAR_CODES[np.frombuffer(padded.encode("ascii"), dtype=np.uint8)]
+
+    def _ngram_ids(self, codes):
+        ids = np.zeros(len(codes) - self.order + 1, dtype=np.intp)
+        for offset in range(self.order):
+            ids = ids * self.size + codes[offset:len(codes) - self.order + 1 + offset]
+        return ids
+
+    def train(self, lines):
+        counts = np.zeros((self.size ** (self.order - 1), self.size))
+        for line in lines:
+            normalized = self.normalize(line)
+            if normalized:
+                ids = self._ngram_ids(self._codes(normalized))
+                np.add.at(counts, (ids // self.size, ids % self.size), 1)
+        counts += self.smoothing
+        self.log_probs = np.log2(counts / counts.sum(axis=1, keepdims=True)).ravel()
+        return self
+
+    def score(self, text):
+        """Average log2 probability per character (higher is more language-like), or None if too short"""
+        normalized = self.normalize(text)
+        if len(normalized) < MIN_MODEL_CHARACTERS:
+            return None
+        return float(self.log_probs[self._ngram_ids(self._codes(normalized))].mean())
+
+
+def split_plain_words(text):
+    """Return (plain words joined by spaces, number of other tokens such as acronyms and identifiers)"""
+    words = []
+    terms = 0
+    for token in text.split():
+        token = _EDGE_PUNCTUATION.sub("", token)
+        if not token:
+            continue
+        if _PLAIN_WORD.fullmatch(token):
+            words.append(token)
+        else:
+            terms += 1
+    return " ".join(words), terms
+
+@lru_cache(maxsize=1)
+def get_language_model():
+    """Train the model once per process from the bundled business English corpus"""
+    with open(CORPUS_PATH, encoding="utf-8") as corpus:
+        return CharNgramModel().train(corpus)
+
+def classify_with_language_model(text):
+    """
+    Classify text locally with the n-gram model (run detect_gibberish first: acronym-like
+    tokens are not scored, so keyboard and consonant runs in capitals must be caught there)
+    Returns tuple: (verdict, score) where verdict is "VALID", "GIBBERISH" or "UNCLEAR"
+    """
+    words, terms = split_plain_words(text)
+    score = get_language_model().score(words)
+    if score is None:
+        # Mostly acronyms and identifiers ("ERP, CRM & WMS via SFTP/EDI"): a technical query
+        return ("VALID" if terms >= MIN_TERM_TOKENS else "UNCLEAR"), None
+    if score <= GIBBERISH_THRESHOLD:
+        return "GIBBERISH", score
+    if score >= VALID_THRESHOLD:
+        return "VALID", score
+    return "UNCLEAR", score
+
+# =============================================================================
+# TRAINING AND EVALUATION SCRIPT
+# =============================================================================
+
+def load_eval_set(path=EVAL_PATH):
+    """Read (is_gibberish, text) pairs from a LABEL<tab>text file"""
+    samples = []
+    with open(path, encoding="utf-8") as eval_file:
+        for line in eval_file:
+            label, _, text = line.rstrip("\n").partition("\t")
+            if text:
+                samples.append((label == "GIBBERISH", text))
+    return samples
+
+def precision_recall(samples, predict):
+    true_positive = false_positive = false_negative = 0
+    for is_gibberish, text in samples:
+        predicted = predict(text)
+        if predicted and is_gibberish:
+            true_positive += 1
+        elif predicted:
+            false_positive += 1
+        elif is_gibberish:
+            false_negative += 1
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    return precision, recall
+
+def evaluate(samples):
+    detectors = [
+        ("heuristics (detect_gibberish)", lambda text: detect_gibberish(text)[0]),
+        ("n-gram model", lambda text: classify_with_language_model(text)[0] == "GIBBERISH"),
+        ("heuristics + n-gram model", lambda text: detect_gibberish(text)[0]
+            or classify_with_language_model(text)[0] == "GIBBERISH"),
+    ]
+    print(f"{len(samples)} samples ({sum(label for label, _ in samples)} gibberish)")
+    for name, predict in detectors:
+        precision, recall = precision_recall(samples, predict)
+        print(f"{name:32} precision {precision:.2f}  recall {recall:.2f}")
+    # The app asks the remote model only about texts the heuristics pass and the n-gram model finds UNCLEAR
+    passed = [text for _, text in samples if not detect_gibberish(text)[0]]
+    remote = sum(1 for text in passed if classify_with_language_model(text)[0] == "UNCLEAR")
+    rate = remote / len(passed) if passed else 0.0
+    print(f"{'remote check rate':32} {remote}/{len(passed)} texts passing the heuristics ({rate:.0%})")
+
+def calibrate(samples):
+    """Print score ranges per label and the bounds that keep valid text out of the gibberish band"""
+    model = get_language_model()
+    scores = {True: [], False: []}
+    for is_gibberish, text in samples:
+        score = model.score(split_plain_words(text)[0])
+        if score is not None:
+            scores[is_gibberish].append(score)
+    for is_gibberish, label in ((False, "VALID"), (True, "GIBBERISH")):
+        values = sorted(scores[is_gibberish])
+        print(f"{label:10} n={len(values):3} min {values[0]:.2f}  median {values[len(values) // 2]:.2f}  max {values[-1]:.2f}")
+    # Any threshold inside these bounds classifies the samples without errors; keep a wide
+    # margin below the lowest VALID score, real traffic is more varied than any sample set
+    print(f"GIBBERISH_THRESHOLD must stay below {min(scores[False]):.2f} (lowest VALID score)")
+    print(f"VALID_THRESHOLD must stay above {max(scores[True]):.2f} (highest GIBBERISH score)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the local gibberish detectors")
+    parser.add_argument("command", choices=["evaluate", "calibrate"])
+    parser.add_argument("--eval-set", action="append",
+                        help="LABEL<tab>text file (VALID or GIBBERISH); repeatable. Default: both bundled sets")
+    args = parser.parse_args()
+
+    paths = args.eval_set or [EVAL_PATH, HOLDOUT_PATH]
+    if args.command == "evaluate":
+        for path in paths:
+            print(os.path.basename(path))
+            evaluate(load_eval_set(path))
+    else:
+        calibrate([sample for path in paths for sample in load_eval_set(path)])
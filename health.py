@@ -0,0 +1,167 @@
+"""Process-level liveness/readiness probe and keep-warm task (no Streamlit dependency)
+
+One small HTTP server and one background thread per app process, however many
+browser tabs are open:
+- GET/HEAD /healthz: 200 while the process is serving (liveness)
+- GET/HEAD /readyz: 200 once every readiness check passes, 503 otherwise, with a
+  JSON body naming each check (readiness)
+- KeepWarm runs housekeeping every interval seconds and, when given a URL, pings
+  it so the hosting platform sees traffic without any open tab
+"""
+
+import json
+import threading
+import time
+
+# =============================================================================
+# READINESS CHECKS
+# =============================================================================
+
+class HealthRegistry:
+    """Named readiness checks; a check returns truthy when ready or raises"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started_at = clock()
+        self._checks = {}
+
+    def register(self, name, check):
+        self._checks[name] = check
+
+    def report(self):
+        """(ready, {name: "ok" | "pending" | error text}, uptime seconds)"""
+        results = {}
+        for name, check in self._checks.items():
+            try:
+                results[name] = "ok" if check() else "pending"
+            except Exception as e:
+                results[name] = f"error: {e}"
+        ready = all(result == "ok" for result in results.values())
+        return ready, results, self.clock() - self.started_at
+
+# =============================================================================
+# PROBE SERVER
+# =============================================================================
+
+# http.server and urllib are imported on first use, keeping them off the app's cold start
+
+def _make_handler(registry):
+    from http.server import BaseHTTPRequestHandler
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def _respond(self, include_body):
+            if self.path.split("?", 1)[0] == "/healthz":
+                status, body = 200, {"status": "alive"}
+            elif self.path.split("?", 1)[0] == "/readyz":
+                ready, checks, uptime = registry.report()
+                status = 200 if ready else 503
+                body = {"status": "ready" if ready else "not ready", "checks": checks, "uptime": round(uptime)}
+            else:
+                status, body = 404, {"status": "not found"}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            if include_body:
+                self.wfile.write(payload)
+
+        def do_GET(self):
+            self._respond(include_body=True)
+
+        def do_HEAD(self):
+            self._respond(include_body=False)
+
+        def log_message(self, format, *args):
+            pass  # Probes hit this every few seconds; keep them out of the app log
+
+    return HealthHandler
+
+def parse_ports(spec):
+    """Ports to try from "8502" or a range such as "8502-8509" (one per app process on the host)"""
+    first, _, last = str(spec).partition("-")
+    return range(int(first), int(last or first) + 1)
+
+def start_health_server(registry, host="127.0.0.1", port=8502):
+    """
+    Serve /healthz and /readyz from a daemon thread; returns the server (port=0 picks a free port)
+    port may be a range of ports: the first free one is used, so several app processes
+    on one host each get their own; raises OSError when none can be bound
+    """
+    from http.server import ThreadingHTTPServer
+    ports = [port] if isinstance(port, int) else list(port)
+    error = None
+    for candidate in ports:
+        try:
+            server = ThreadingHTTPServer((host, candidate), _make_handler(registry))
+            break
+        except OSError as e:
+            error = e
+    else:
+        tried = f"{ports[0]}-{ports[-1]}" if len(ports) > 1 else ports[0]
+        raise OSError(f"cannot bind {host}:{tried}: {error}")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
+
+# =============================================================================
+# KEEP-WARM TASK
+# =============================================================================
+
+def head_request(url, timeout=10):
+    import urllib.request
+    request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "keep-warm"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+class KeepWarm:
+    """
+    Daemon thread that every interval seconds runs the housekeeping tasks and pings url
+    A failing task or ping is counted and logged, never raised; stop() ends the thread
+    """
+
+    def __init__(self, interval=240, url=None, tasks=(), ping=head_request, clock=time.time):
+        self.interval = interval
+        self.url = url
+        self.tasks = list(tasks)
+        self.ping = ping
+        self.clock = clock
+        self.ticks = 0
+        self.pings = 0
+        self.failures = 0
+        self.last_ping_at = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="keep-warm", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def tick(self):
+        self.ticks += 1
+        for task in self.tasks:
+            try:
+                task()
+            except Exception as e:
+                self.failures += 1
+                print(f"Keep-warm task {getattr(task, '__name__', task)} failed: {e}")
+        if self.url:
+            try:
+                self.ping(self.url)
+                self.pings += 1
+                self.last_ping_at = self.clock()
+            except Exception as e:
+                self.failures += 1
+                print(f"Keep-warm ping to {self.url} failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def stats(self):
+        return {'ticks': self.ticks, 'pings': self.pings, 'failures': self.failures,
+                'last_ping_at': self.last_ping_at}
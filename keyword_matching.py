@@ -0,0 +1,667 @@
+"""Keyword lists and category matching for the Aniket Solutions assistant"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# =============================================================================
+# COMPREHENSIVE KEYWORD MAPPING FOR PRODUCTS AND SERVICES
+# =============================================================================
+
+INVENTORY_KEYWORDS = [
+    # Primary terms
+    'inventory', 'stock', 'spare', 'spares', 'consumable', 'consumables', 'stores', 'rob',
+    'parts', 'supplies', 'materials', 'warehouse', 'storage', 'stockroom',
+    
+    # Maritime-specific
+    'ship stores', 'vessel inventory', 'marine supplies', 'deck stores', 'engine room stores',
+    'provision stores', 'slop chest', 'bond stores', 'ship chandler', 'chandlery',
+    
+    # Operational terms
+    'reorder', 'requisition', 'shortage', 'stock level', 'stock control', 'asset tracking',
+    'store keeping', 'storekeeping', 'procurement requisition', 'stock management',
+    'remaining onboard', 'onboard inventory', 'ship inventory', 'fleet inventory',
+    
+    # Technical terms
+    'component mapping', 'spare parts management', 'consumable tracking', 'stock alerts',
+    'inventory optimization', 'stock rotation', 'expiry tracking', 'shelf life',
+    'inventory audit', 'stock count', 'cycle counting', 'stock reconciliation'
+]
+
+PAYROLL_KEYWORDS = [
+    # Primary terms
+    'payroll', 'wages', 'salary', 'cash', 'crew payment', 'master cash', 'pay', 
+    'compensation', 'finance', 'money', 'advance', 'payment',
+    
+    # Maritime-specific
+    'crew wages', 'seafarer pay', 'maritime payroll', 'ship payroll', 'vessel payroll',
+    'portage bill', 'crew account', 'seaman wages', 'mariner pay', 'sailor wages',
+    'crew compensation', 'maritime salary', 'ship crew pay',
+    
+    # Financial terms
+    'overtime', 'bonus', 'allowance', 'deduction', 'allotment', 'tax', 'contribution',
+    'salary advance', 'cash advance', 'loan', 'fine', 'penalty', 'reimbursement',
+    'petty cash', 'cash management', 'crew cash', 'onboard cash',
+    
+    # Currency & banking
+    'multi currency', 'exchange rate', 'currency conversion', 'foreign exchange',
+    'bank transfer', 'wire transfer', 'remittance', 'crew banking',
+    
+    # Compliance
+    'mla compliance', 'flag state requirements', 'crew contract', 'employment agreement'
+]
+
+CREWING_KEYWORDS = [
+    # Primary terms
+    'crew', 'crewing', 'staff', 'personnel', 'maritime crew', 'seafarer', 'seafarers',
+    'manning', 'human resources', 'hr', 'employee', 'employees', 'crew management',
+    
+    # Maritime roles
+    'captain', 'master', 'chief officer', 'engineer', 'bosun', 'seaman', 'able seaman',
+    'ordinary seaman', 'deck crew', 'engine crew', 'galley crew', 'steward', 'cook',
+    'chief engineer', 'second engineer', 'third engineer', 'oiler', 'wiper', 'fitter',
+    
+    # Crew operations
+    'crew scheduling', 'crew rotation', 'crew deployment', 'crew planning', 'shift management',
+    'watch keeping', 'duty roster', 'crew roster', 'manning schedule', 'crew assignment',
+    'embarkation', 'disembarkation', 'sign on', 'sign off', 'crew change',
+    
+    # Documentation & compliance
+    'crew documents', 'certificates', 'endorsements', 'stcw', 'mlc', 'flag state',
+    'medical certificate', 'passport', 'visa', 'seamans book', 'discharge book',
+    'coc', 'certificate of competency', 'endorsement', 'training records',
+    
+    # Performance & development
+    'crew appraisal', 'performance review', 'competency assessment', 'training',
+    'crew evaluation', 'performance management', 'skill assessment', 'crew development',
+    'crew performance', 'crew rating', 'crew feedback'
+]
+
+TMS_KEYWORDS = [
+    # Primary terms
+    'tms', 'maintenance', 'technical', 'planned maintenance', 'pms', 'repair', 'repairs',
+    'equipment', 'machinery', 'technical management', 'maintenance management',
+    
+    # Maintenance types
+    'preventive maintenance', 'corrective maintenance', 'predictive maintenance',
+    'condition based maintenance', 'routine maintenance', 'scheduled maintenance',
+    'unplanned maintenance', 'emergency repair', 'breakdown', 'overhaul',
+    
+    # Maritime equipment
+    'engine', 'main engine', 'auxiliary engine', 'generator', 'pump', 'compressor',
+    'boiler', 'heat exchanger', 'separator', 'purifier', 'winch', 'crane', 'hatch cover',
+    'steering gear', 'propeller', 'shaft', 'bearing', 'valve', 'pipe', 'tank',
+    
+    # Inspections & surveys (REMOVED "dry dock" from here)
+    'inspection', 'survey', 'class survey', 'intermediate survey',
+    'annual survey', 'special survey', 'psc', 'port state control', 'flag state inspection',
+    'vetting inspection', 'internal audit', 'safety inspection',
+    
+    # Certificates & compliance
+    'certificate', 'class certificate', 'safety certificate', 'statutory certificate',
+    'renewal', 'extension', 'endorsement', 'survey due', 'certificate expiry',
+    
+    # Work orders & documentation
+    'work order', 'job card', 'maintenance report', 'defect', 'non conformity',
+    'finding', 'observation', 'maintenance log', 'engine log', 'technical log',
+    
+    # Technical systems
+    'condition monitoring', 'vibration monitoring', 'oil analysis', 'performance monitoring',
+    'alarm system', 'automation', 'control system', 'instrumentation'
+]
+
+PROCUREMENT_KEYWORDS = [
+    # Primary terms
+    'procurement', 'purchasing', 'supplier', 'vendor', 'po', 'purchase order',
+    'buying', 'sourcing', 'rfq', 'request for quotation', 'quotation', 'quote',
+    
+    # Maritime procurement
+    'ship supply', 'vessel supply', 'marine supply', 'port supply', 'ship chandler',
+    'bunker', 'fuel', 'lubricant', 'provisions', 'fresh water', 'technical supply',
+    
+    # Procurement processes
+    'requisition', 'purchase requisition', 'approval', 'authorization', 'budget approval',
+    'vendor selection', 'supplier evaluation', 'price comparison', 'negotiation',
+    'contract', 'framework agreement', 'blanket order', 'spot purchase',
+    
+    # Supply chain
+    'delivery', 'shipment', 'logistics', 'freight', 'customs', 'port agent',
+    'local agent', 'emergency supply', 'urgent supply', 'stock replenishment',
+    
+    # Vendor management
+    'vendor management', 'supplier management', 'vendor assessment', 'supplier audit',
+    'vendor performance', 'supplier rating', 'approved vendor list', 'blacklist',
+    
+    # Integration platforms
+    'shipserv', 'marine marketplace', 'e-procurement', 'digital procurement',
+    'procurement portal', 'supplier portal', 'catalog', 'price list',
+    
+    # Financial terms
+    'invoice', 'payment', 'accounts payable', 'cost control', 'budget management',
+    'cost analysis', 'spend analysis', 'savings', 'cost reduction'
+]
+
+CUSTOM_DEVELOPMENT_KEYWORDS = [
+    # Primary terms
+    'custom', 'development', 'software', 'application', 'web app', 'webapp',
+    'bespoke', 'tailored', 'build', 'create', 'develop', 'programming',
+    
+    # Development types
+    'custom software', 'enterprise software', 'business application', 'web application',
+    'desktop application', 'cloud application', 'saas', 'software as a service',
+    'enterprise solution', 'business solution', 'digital solution',
+    
+    # Technologies
+    'react', 'angular', 'vue', 'node.js', 'python', 'java', 'dot net', '.net',
+    'javascript', 'typescript', 'php', 'ruby', 'c#', 'mysql', 'postgresql',
+    'mongodb', 'oracle', 'sql server', 'database', 'api', 'rest api', 'graphql',
+    
+    # Project types
+    'legacy modernization', 'system upgrade', 'digital transformation',
+    'business automation', 'workflow automation', 'process automation',
+    'enterprise integration', 'system integration', 'platform development',
+    
+    # Industries
+    'maritime software', 'shipping software', 'fleet management software',
+    'healthcare software', 'financial software', 'manufacturing software',
+    'logistics software', 'supply chain software', 'erp', 'crm', 'hrms'
+]
+
+MOBILE_KEYWORDS = [
+    # Primary terms
+    'mobile', 'app', 'mobile app', 'ios', 'android', 'smartphone', 'tablet',
+    'pwa', 'progressive web app', 'react native', 'flutter', 'mobile development',
+    
+    # Mobile platforms
+    'iphone', 'ipad', 'apple', 'google play', 'app store', 'play store',
+    'mobile application', 'native app', 'hybrid app', 'cross platform',
+    
+    # Mobile features
+    'offline app', 'push notification', 'gps', 'location', 'camera', 'scanner',
+    'qr code', 'barcode', 'biometric', 'fingerprint', 'face id', 'touch id',
+    'mobile payments', 'in app purchase', 'mobile commerce', 'm-commerce',
+    
+    # Business mobile apps
+    'field service app', 'sales app', 'crm app', 'inventory app', 'tracking app',
+    'delivery app', 'logistics app', 'maintenance app', 'inspection app',
+    'workforce app', 'employee app', 'customer app', 'mobile portal',
+    
+    # Mobile technologies
+    'swift', 'kotlin', 'xamarin', 'cordova', 'phonegap', 'ionic', 'unity'
+]
+
+AI_ML_KEYWORDS = [
+    # Primary terms
+    'ai', 'artificial intelligence', 'machine learning', 'ml', 'deep learning',
+    'neural', 'neural network', 'nlp', 'natural language processing',
+    'computer vision', 'automation', 'intelligent automation',
+    
+    # AI applications
+    'chatbot', 'virtual assistant', 'conversational ai', 'voice assistant',
+    'recommendation engine', 'recommendation system', 'predictive analytics',
+    'fraud detection', 'anomaly detection', 'sentiment analysis', 'text analysis',
+    
+    # ML techniques
+    'supervised learning', 'unsupervised learning', 'reinforcement learning',
+    'classification', 'regression', 'clustering', 'decision tree', 'random forest',
+    'support vector machine', 'svm', 'neural networks', 'cnn', 'rnn', 'lstm',
+    
+    # AI technologies
+    'tensorflow', 'pytorch', 'keras', 'scikit-learn', 'opencv', 'spacy', 'nltk',
+    'hugging face', 'openai', 'gpt', 'bert', 'transformer', 'generative ai',
+    
+    # Business AI
+    'business intelligence', 'predictive maintenance', 'demand forecasting',
+    'price optimization', 'customer segmentation', 'lead scoring', 'churn prediction',
+    'quality control', 'defect detection', 'process optimization', 'smart automation',
+    
+    # Industry AI
+    'ai for maritime', 'ai for shipping', 'ai for logistics', 'ai for healthcare',
+    'ai for finance', 'ai for manufacturing', 'ai for retail', 'fintech ai'
+]
+
+DATA_SERVICES_KEYWORDS = [
+    # Primary terms
+    'data', 'database', 'migration', 'analytics', 'reporting', 'etl', 'elt',
+    'warehouse', 'data warehouse', 'data lake', 'bi', 'business intelligence',
+    
+    # Data operations
+    'data migration', 'database migration', 'data transfer', 'data conversion',
+    'data transformation', 'data integration', 'data synchronization',
+    'data backup', 'data recovery', 'disaster recovery', 'data archiving',
+    
+    # Analytics & BI
+    'dashboard', 'report', 'kpi', 'metrics', 'data visualization', 'charts',
+    'graphs', 'tableau', 'power bi', 'qlik', 'looker', 'excel', 'pivot table',
+    'data analysis', 'statistical analysis', 'trend analysis', 'forecasting',
+    
+    # Database technologies
+    'sql', 'nosql', 'mysql', 'postgresql', 'oracle', 'sql server', 'mongodb',
+    'cassandra', 'redis', 'elasticsearch', 'hadoop', 'spark', 'kafka',
+    
+    # Cloud data
+    'aws', 'azure', 'google cloud', 'cloud migration', 'cloud database',
+    's3', 'redshift', 'bigquery', 'azure sql', 'cosmos db', 'dynamodb',
+    
+    # Data governance
+    'data quality', 'data cleansing', 'data validation', 'master data',
+    'data governance', 'data lineage', 'metadata', 'data catalog',
+    'gdpr', 'data privacy', 'data security', 'compliance'
+]
+
+INTEGRATION_KEYWORDS = [
+    # Primary terms
+    'integration', 'api', 'connect', 'sync', 'synchronization', 'system integration',
+    'erp', 'crm', 'middleware', 'interface', 'connector', 'bridge',
+    
+    # Integration types
+    'system integration', 'application integration', 'data integration',
+    'enterprise integration', 'cloud integration', 'hybrid integration',
+    'real time integration', 'batch integration', 'event driven integration',
+    
+    # Integration technologies
+    'rest', 'soap', 'graphql', 'webhook', 'api gateway', 'message queue',
+    'kafka', 'rabbitmq', 'azure service bus', 'aws sqs', 'mule', 'tibco',
+    'logic apps', 'azure logic apps', 'aws step functions', 'zapier',
+    
+    # Business systems
+    'erp integration', 'crm integration', 'sap', 'salesforce', 'dynamics',
+    'oracle', 'netsuite', 'quickbooks', 'sage', 'workday', 'successfactors',
+    'sharepoint', 'office 365', 'google workspace', 'slack integration',
+    
+    # E-commerce integration
+    'shopify', 'magento', 'woocommerce', 'amazon', 'ebay', 'payment gateway',
+    'stripe', 'paypal', 'square', 'shipping integration', 'fedex', 'ups', 'dhl',
+    
+    # Data sync
+    'two way sync', 'one way sync', 'real time sync', 'batch sync',
+    'data synchronization', 'master data sync', 'customer sync', 'product sync'
+]
+
+CHATBOT_KEYWORDS = [
+    # Primary terms
+    'chatbot', 'chat bot', 'virtual assistant', 'customer service', 'conversational ai',
+    'support bot', 'chat', 'assistant', 'ai assistant', 'digital assistant',
+    
+    # Customer service terms
+    'customer support', 'help desk', 'support ticket', 'live chat', 'customer care',
+    'customer experience', 'cx', 'customer engagement', 'self service', 'faq bot',
+    
+    # Communication channels
+    'website chat', 'web chat', 'whatsapp bot', 'facebook messenger', 'telegram bot',
+    'slack bot', 'discord bot', 'sms bot', 'voice bot', 'phone bot', 'ivr',
+    
+    # Chatbot features
+    'natural language', 'nlp', 'intent recognition', 'entity extraction',
+    'conversation flow', 'dialogue management', 'context awareness', 'memory',
+    'multilingual', 'sentiment analysis', 'escalation', 'handoff', 'live agent',
+    
+    # Business applications
+    'lead generation', 'lead qualification', 'appointment booking', 'scheduling',
+    'order taking', 'product recommendation', 'troubleshooting', 'onboarding',
+    'survey bot', 'feedback collection', 'hr bot', 'it support bot',
+    
+    # Chatbot platforms
+    'dialogflow', 'azure bot framework', 'amazon lex', 'rasa', 'botframework',
+    'watson assistant', 'chatfuel', 'manychat', 'drift', 'intercom', 'zendesk'
+]
+
+# =============================================================================
+# COMPREHENSIVE KEYWORD MAPPING
+# =============================================================================
+
+COMPREHENSIVE_KEYWORD_MAPPING = {
+    'inventory': INVENTORY_KEYWORDS,
+    'payroll': PAYROLL_KEYWORDS,
+    'crewing': CREWING_KEYWORDS,
+    'tms': TMS_KEYWORDS,
+    'procurement': PROCUREMENT_KEYWORDS,
+    'custom_development': CUSTOM_DEVELOPMENT_KEYWORDS,
+    'mobile': MOBILE_KEYWORDS,
+    'ai_ml': AI_ML_KEYWORDS,
+    'data_services': DATA_SERVICES_KEYWORDS,
+    'integration': INTEGRATION_KEYWORDS,
+    'chatbot': CHATBOT_KEYWORDS
+}
+
+
+# =============================================================================
+# COMPILED KEYWORD AUTOMATON
+# =============================================================================
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over all keywords, each tagged with its category.
+
+    Built once at import; finding every keyword hit in a query is a single
+    pass over the query, independent of how many keywords are registered.
+    """
+
+    def __init__(self, keyword_mapping):
+        self.patterns = []   # pattern id -> keyword text
+        self.entries = []    # pattern id -> [(category, position in category list)]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        pattern_ids = {}
+        for category, keywords in keyword_mapping.items():
+            for position, keyword in enumerate(keywords):
+                if keyword not in pattern_ids:
+                    pattern_ids[keyword] = len(self.patterns)
+                    self.patterns.append(keyword)
+                    self.entries.append([])
+                    self._add_pattern(keyword, pattern_ids[keyword])
+                # Duplicates within a list are kept so they score like the original loop did
+                self.entries[pattern_ids[keyword]].append((category, position))
+
+        self._build_failure_links()
+
+    def _add_pattern(self, keyword, pattern_id):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (pattern_id,)
+
+    def _build_failure_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Merge outputs along the failure chain so lookups never walk it
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return the set of pattern ids occurring anywhere in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+# =============================================================================
+# PRECOMPUTED CATEGORY INDEX
+# =============================================================================
+
+PRIMARY_KEYWORD_COUNT = 10  # First 10 keywords of each list are usually primary terms
+
+class CategoryIndex:
+    """Precomputed scoring index over the keyword mapping.
+
+    Every scoring rule of the original loops is folded into weight matrices at
+    build time, so a query (or a whole batch of queries) is scored against all
+    categories at once:
+      - phrase_weights[pattern, category]: 5 per multi-word hit, 2 per single word
+      - token_weights[token, category]: 0.5 when any keyword of the category contains the word
+      - primary_weights[pattern, category]: 3 for primary keywords longer than 3 characters
+      - primary_exact_delta[pattern, category]: extra weight when the query *is* the primary keyword
+    """
+
+    def __init__(self, keyword_mapping):
+        self.keyword_mapping = keyword_mapping
+        self.categories = list(keyword_mapping)
+        self.automaton = KeywordAutomaton(keyword_mapping)
+        self.pattern_ids = {keyword: pattern_id for pattern_id, keyword in enumerate(self.automaton.patterns)}
+
+        category_ids = {category: column for column, category in enumerate(self.categories)}
+        pattern_count = len(self.automaton.patterns)
+        category_count = len(self.categories)
+
+        self.phrase_weights = np.zeros((pattern_count, category_count))
+        self.primary_weights = np.zeros((pattern_count, category_count))
+        self.primary_exact_delta = np.zeros((pattern_count, category_count))
+
+        # Per-category primary-keyword sets and phrase lists, kept for inspection and tooling
+        self.primary_keywords = {category: frozenset(keywords[:PRIMARY_KEYWORD_COUNT])
+                                 for category, keywords in keyword_mapping.items()}
+        self.phrases = {category: [keyword for keyword in keywords if ' ' in keyword]
+                        for category, keywords in keyword_mapping.items()}
+
+        for pattern_id, keyword in enumerate(self.automaton.patterns):
+            for category, position in self.automaton.entries[pattern_id]:
+                column = category_ids[category]
+                self.phrase_weights[pattern_id, column] += 5 if ' ' in keyword else 2
+                if position < PRIMARY_KEYWORD_COUNT:
+                    long_bonus = 3 if len(keyword) > 3 else 0
+                    self.primary_weights[pattern_id, column] += long_bonus
+                    self.primary_exact_delta[pattern_id, column] += 5 - long_bonus
+
+        self.token_ids = {}
+        token_rows = []
+        for category, keywords in keyword_mapping.items():
+            for keyword in keywords:
+                for word in keyword.split():
+                    if word not in self.token_ids:
+                        self.token_ids[word] = len(token_rows)
+                        token_rows.append(set())
+                    token_rows[self.token_ids[word]].add(category_ids[category])
+
+        self.token_weights = np.zeros((len(token_rows), category_count))
+        for token_id, columns in enumerate(token_rows):
+            self.token_weights[token_id, list(columns)] = 0.5
+
+    def _query_features(self, query):
+        """Return (query_lower, pattern ids, token ids, is_short_query, exact pattern id)"""
+        query_lower = query.lower().strip()
+        query_words = set(query_lower.split())
+        pattern_ids = list(self.automaton.find(query_lower))
+        token_ids = [self.token_ids[word] for word in query_words if word in self.token_ids]
+        return query_lower, pattern_ids, token_ids, len(query_words) <= 2, self.pattern_ids.get(query_lower)
+
+    def _matched_keywords(self, category, pattern_ids):
+        """Hit keywords of one category, in keyword-list order"""
+        positions = sorted(position
+                           for pattern_id in pattern_ids
+                           for hit_category, position in self.automaton.entries[pattern_id]
+                           if hit_category == category)
+        keywords = self.keyword_mapping[category]
+        return [keywords[position] for position in positions]
+
+    def _best_match(self, scores, pattern_ids):
+        best_column = int(np.argmax(scores))
+        best_score = float(scores[best_column])
+        if best_score <= 0:
+            return None, 0, []
+        category = self.categories[best_column]
+        return category, min(best_score / 8, 1.0), self._matched_keywords(category, pattern_ids)
+
+    def classify(self, query):
+        """Score one query against every category; returns (category, confidence, matched_keywords)"""
+        query_lower, pattern_ids, token_ids, is_short_query, exact_id = self._query_features(query)
+
+        scores = self.phrase_weights[pattern_ids].sum(axis=0) + self.token_weights[token_ids].sum(axis=0)
+        if is_short_query:
+            scores += self.primary_weights[pattern_ids].sum(axis=0)
+            if exact_id is not None:
+                scores += self.primary_exact_delta[exact_id]
+
+        return self._best_match(scores, pattern_ids)
+
+    def classify_batch(self, queries):
+        """Score many queries in one sparse pass; returns a list of classify() tuples"""
+        queries = list(queries)
+        pattern_rows, pattern_cols = [], []
+        token_rows, token_cols = [], []
+        primary_rows, primary_cols = [], []
+        exact_rows, exact_cols = [], []
+        per_query_patterns = []
+
+        for row, query in enumerate(queries):
+            query_lower, pattern_ids, token_ids, is_short_query, exact_id = self._query_features(query)
+            per_query_patterns.append(pattern_ids)
+            pattern_rows.extend([row] * len(pattern_ids))
+            pattern_cols.extend(pattern_ids)
+            token_rows.extend([row] * len(token_ids))
+            token_cols.extend(token_ids)
+            if is_short_query:
+                primary_rows.extend([row] * len(pattern_ids))
+                primary_cols.extend(pattern_ids)
+                if exact_id is not None:
+                    exact_rows.append(row)
+                    exact_cols.append(exact_id)
+
+        scores = np.zeros((len(queries), len(self.categories)))
+        np.add.at(scores, pattern_rows, self.phrase_weights[pattern_cols])
+        np.add.at(scores, token_rows, self.token_weights[token_cols])
+        np.add.at(scores, primary_rows, self.primary_weights[primary_cols])
+        np.add.at(scores, exact_rows, self.primary_exact_delta[exact_cols])
+
+        return [self._best_match(scores[row], per_query_patterns[row]) for row in range(len(queries))]
+
+
+@lru_cache(maxsize=1)
+def get_category_index():
+    """Shared CategoryIndex, built on first use so importing this module stays cheap"""
+    return CategoryIndex(COMPREHENSIVE_KEYWORD_MAPPING)
+
+# =============================================================================
+# TYPO-TOLERANT KEYWORD LOOKUP
+# =============================================================================
+
+def bounded_edit_distance(source, target, max_distance):
+    """Optimal string alignment distance (adjacent transpositions count once).
+
+    Returns max_distance + 1 as soon as the distance is known to exceed the bound.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_row = None
+    row = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current_row = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current_row[j] = min(row[j] + 1, current_row[j - 1] + 1, row[j - 1] + cost)
+            if (i > 1 and j > 1 and source[i - 1] == target[j - 2]
+                    and source[i - 2] == target[j - 1]):
+                current_row[j] = min(current_row[j], previous_row[j - 2] + 1)
+        if min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row, row = row, current_row
+    return row[-1]
+
+
+class FuzzyTermIndex:
+    """Character-trigram inverted index with bounded edit-distance verification.
+
+    Candidates are the terms sharing trigrams with the lookup word, so only a
+    handful of edit-distance checks run per word regardless of vocabulary size.
+    """
+
+    def __init__(self, terms, min_length=5):
+        self.min_length = min_length
+        # Terms one edit shorter than the lookup minimum can still be suggested
+        self.terms = sorted(set(term for term in terms if len(term) >= min_length - 1))
+        self.term_set = frozenset(self.terms)
+        self.postings = {}
+        for term_id, term in enumerate(self.terms):
+            for trigram in set(self._trigrams(term)):
+                self.postings.setdefault(trigram, []).append(term_id)
+
+    @staticmethod
+    def _trigrams(word):
+        padded = f"  {word} "
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    @staticmethod
+    def max_distance_for(word):
+        """Allow one edit for short words and two for words of 10+ characters"""
+        return 2 if len(word) >= 10 else 1
+
+    def lookup(self, word):
+        """Return the closest known term within the edit bound, or None"""
+        if word in self.term_set or len(word) < self.min_length:
+            return None
+
+        shared = {}
+        for trigram in set(self._trigrams(word)):
+            for term_id in self.postings.get(trigram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        max_distance = self.max_distance_for(word)
+        # Each edit disturbs at most four padded trigrams, which bounds the overlap
+        min_shared = len(word) + 1 - 4 * max_distance
+        best = None
+        # Most shared trigrams first, so the cheapest candidates are verified early
+        for term_id in sorted(shared, key=lambda t: (-shared[t], t)):
+            if shared[term_id] < min_shared:
+                break
+            term = self.terms[term_id]
+            if abs(len(term) - len(word)) > max_distance:
+                continue
+            distance = bounded_edit_distance(word, term, max_distance)
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, term)
+                if distance == 1:
+                    break
+        return best[1] if best else None
+
+
+@lru_cache(maxsize=1)
+def get_keyword_term_index():
+    """Shared typo index over the keyword words, built on first use"""
+    return FuzzyTermIndex(get_category_index().token_ids)
+
+# Everyday words that sit one edit away from a keyword word ("contact" -> "contract")
+COMMON_WORDS = frozenset([
+    'about', 'after', 'again', 'being', 'could', 'every', 'hello', 'looking', 'might',
+    'other', 'still', 'thank', 'thanks', 'there', 'these', 'thing', 'things', 'think',
+    'those', 'where', 'which', 'while', 'would', 'contact', 'contacts', 'please',
+    'provide', 'details', 'learn', 'share', 'phone', 'check', 'start', 'cheap'
+])
+
+def correct_keyword_typos(query):
+    """
+    Replace near-miss spellings of keyword words ("procurment", "crewng") with the keyword word
+    Returns the corrected lowercase query, or None if nothing was corrected
+    """
+    corrected = False
+    term_index = get_keyword_term_index()
+
+    def replace(match):
+        nonlocal corrected
+        word = match.group(0)
+        suggestion = None if word in COMMON_WORDS else term_index.lookup(word)
+        if suggestion is None:
+            return word
+        corrected = True
+        return suggestion
+
+    corrected_query = re.sub(r"[a-z]+", replace, query.lower().strip())
+    return corrected_query if corrected else None
+
+# =============================================================================
+# ENHANCED KEYWORD MATCHING FUNCTION
+# =============================================================================
+
+def get_best_match_category(query):
+    """
+    Enhanced keyword matching that finds the best category match for a query
+    Returns tuple: (category, confidence_score, matched_keywords)
+    """
+    return get_category_index().classify(query)
+
+def classify_batch(queries):
+    """Classify many queries (e.g. logged traffic) with the same weights the live bot uses"""
+    return get_category_index().classify_batch(queries)
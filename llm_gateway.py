@@ -0,0 +1,461 @@
+"""LLM gateway: deadlines, jittered retries, a model fallback ladder and circuit breakers (no Streamlit dependency)
+
+complete() walks the tiers in order (e.g. GPT-4, a cheaper model, then a local
+canned answer) until one returns an accepted answer. One deadline covers the
+whole call; each attempt's timeout is capped by what is left of it. Remote
+tiers retry 429/5xx/timeouts with full-jitter backoff, except that a timed-out
+tier is left for the next remote tier rather than retried, so one hung model
+cannot spend the whole deadline. Each remote tier has a circuit breaker: after consecutive failed calls it is skipped outright for a
+while, so a provider incident costs one timeout instead of one per message.
+With a HedgePolicy, a remote request that has produced no output after a recent
+latency percentile is raced against a second one; the first to finish wins.
+
+Works with any OpenAI-compatible endpoint (the openai SDK honours OPENAI_BASE_URL),
+e.g. benchmarks/fake_openai_server.py.
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class LlmUnavailable(Exception):
+    """No tier produced an answer before the deadline"""
+
+def is_retryable(error):
+    """True for timeouts, connection errors, 408/409/429 and 5xx responses"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    if isinstance(error, openai.APIConnectionError):  # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def is_timeout(error):
+    """True for a request that timed out (as opposed to one the server answered with an error)"""
+    if isinstance(error, TimeoutError):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.APITimeoutError)
+
+def retry_after_seconds(error):
+    """Server-requested wait from a Retry-After header, or None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=4.0):
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout seconds
+    Then it is half-open: allow() lets one trial call through and fails the others fast until
+    that call's outcome closes or reopens it. A caller that got through must report its outcome,
+    or release() when it never made the call; a trial unreported for reset_timeout is presumed lost
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None  # Set while the half-open trial call is in flight
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() >= self.opened_at + self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state != "half_open":
+                return state == "closed"
+            now = self.clock()
+            if self.trial_started_at is not None and now < self.trial_started_at + self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def release(self):
+        """Give up the trial call without an outcome (the caller never made it)"""
+        with self._lock:
+            self.trial_started_at = None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.trial_started_at = None
+
+# =============================================================================
+# TIERS
+# =============================================================================
+
+class OpenAITier:
+    """
+    One chat model behind an OpenAI-compatible client
+    complete() returns the answer, or None when validate(text) rejects it (a stream is
+    abandoned as soon as the accumulated text is rejected)
+    """
+
+    remote = True
+
+    def __init__(self, name, client, model, max_attempts=2, breaker=None, clock=time.monotonic, **params):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.clock = clock
+        self.params = params  # temperature, max_tokens, ...
+
+    def complete(self, messages, timeout, deadline, on_token=None, validate=None):
+        client = self.client.with_options(timeout=timeout, max_retries=0)  # The gateway owns retrying
+        if on_token is None:
+            response = client.chat.completions.create(model=self.model, messages=messages, **self.params)
+            answer = (response.choices[0].message.content or "").strip()
+            return answer if validate is None or validate(answer) else None
+
+        stream = client.chat.completions.create(model=self.model, messages=messages, stream=True, **self.params)
+        accumulated = ""
+        try:
+            for chunk in stream:
+                # The client timeout bounds each read; this bounds a stream that keeps trickling
+                if self.clock() > deadline:
+                    raise TimeoutError(f"{self.name} stream passed the deadline")
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                accumulated += token
+                # Checked on the accumulated text so phrases split across chunks are still caught
+                if validate is not None and not validate(accumulated):
+                    return None
+                on_token(accumulated)
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        return accumulated.strip()
+
+class LocalTier:
+    """Last-resort answers computed in process (e.g. BM25 over canned answers): answer_fn(messages) -> text or None"""
+
+    remote = False
+    max_attempts = 1
+    breaker = None
+
+    def __init__(self, name, answer_fn):
+        self.name = name
+        self.answer_fn = answer_fn
+
+    def complete(self, messages, timeout, deadline, on_token=None, validate=None):
+        return self.answer_fn(messages)
+
+# =============================================================================
+# HEDGING
+# =============================================================================
+
+class HedgeCancelled(Exception):
+    """Raised inside the losing request's stream so it is abandoned"""
+
+class HedgePolicy:
+    """
+    When to send a second request for a slow one, and how many to allow
+    The hedge goes out once a request has produced no output (first token, or the whole
+    answer when not streaming) for the `percentile` of that tier's recent time to first
+    output, or initial_delay until min_samples have been seen. It goes to hedge_tier
+    (None: the same tier again), and only while hedges stay under max_ratio of recent
+    calls; the caller can add a per-session budget through allow_hedge
+    """
+
+    def __init__(self, percentile=0.95, initial_delay=3.0, min_delay=0.5, min_samples=20,
+                 max_ratio=0.1, window=200, hedge_tier=None):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.hedge_tier = hedge_tier
+        self._first_output = {}  # tier name -> recent seconds to first output
+        self._window = window
+        self._recent_calls = deque(maxlen=window)  # True for calls that sent a hedge
+        self._lock = threading.Lock()
+        self.counts = {'races': 0, 'considered': 0, 'fired': 0, 'won': 0,
+                       'denied_ratio': 0, 'denied_budget': 0, 'denied_breaker': 0}
+
+    def record_first_output(self, tier_name, seconds):
+        with self._lock:
+            self._first_output.setdefault(tier_name, deque(maxlen=self._window)).append(seconds)
+
+    def delay(self, tier_name):
+        """Seconds without output after which a request to tier_name is hedged"""
+        with self._lock:
+            latencies = sorted(self._first_output.get(tier_name, ()))
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, latencies[int(self.percentile * (len(latencies) - 1))])
+
+    def _count(self, field):
+        with self._lock:
+            self.counts[field] += 1
+
+    def acquire(self, hedge_tier, allow_hedge=None):
+        """Whether a hedge may be sent now (counts the decision either way)"""
+        self._count('considered')
+        with self._lock:
+            recent = len(self._recent_calls)
+            ratio = sum(self._recent_calls) / recent if recent else 0.0
+        if ratio >= self.max_ratio:
+            self._count('denied_ratio')
+            return False
+        # Only to a healthy tier: while half-open, its single trial call is not spent on a hedge
+        if hedge_tier.breaker and hedge_tier.breaker.state != "closed":
+            self._count('denied_breaker')
+            return False
+        if allow_hedge is not None and not allow_hedge():
+            self._count('denied_budget')
+            return False
+        self._count('fired')
+        return True
+
+    def finish_race(self, hedged, hedge_won):
+        with self._lock:
+            self._recent_calls.append(hedged)
+            self.counts['races'] += 1
+            if hedge_won:
+                self.counts['won'] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts['fire_rate'] = counts['fired'] / counts['races'] if counts['races'] else 0.0
+        counts['win_rate'] = counts['won'] / counts['fired'] if counts['fired'] else 0.0
+        return counts
+
+# =============================================================================
+# GATEWAY
+# =============================================================================
+
+TIER_COUNTERS = ('answers', 'rejected', 'failures', 'retries', 'skipped')
+
+class LlmGateway:
+    """Fallback ladder over tiers with one overall deadline per call; thread-safe"""
+
+    def __init__(self, tiers, deadline=20.0, attempt_timeout=10.0, base_delay=0.5, max_delay=4.0,
+                 hedge=None, max_workers=32, sleep=time.sleep, clock=time.monotonic):
+        self.tiers = list(tiers)
+        self.hedge = hedge
+        # Hedged requests run on these threads; the caller's thread relays their tokens
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm") if hedge else None
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {tier.name: dict.fromkeys(TIER_COUNTERS, 0) for tier in self.tiers}
+        self._latencies = deque(maxlen=500)  # Seconds per complete() call
+
+    def _count(self, tier, field):
+        with self._lock:
+            # A hedge tier may not be on the ladder itself
+            self._stats.setdefault(tier.name, dict.fromkeys(TIER_COUNTERS, 0))[field] += 1
+
+    def complete(self, messages, on_token=None, validate=None, allow_hedge=None):
+        """
+        (answer, tier name) from the first tier that answers; raises LlmUnavailable otherwise
+        allow_hedge() is asked before each hedge (e.g. a per-session budget)
+        """
+        started = self.clock()
+        deadline = started + self.deadline
+        errors = []
+        try:
+            for position, tier in enumerate(self.tiers):
+                if tier.breaker and not tier.breaker.allow():
+                    self._count(tier, 'skipped')
+                    errors.append(f"{tier.name}: circuit open")
+                    continue
+                # Whether a timed-out request is better followed by the next remote tier than retried
+                fallback = any(later.remote and (later.breaker is None or later.breaker.state != "open")
+                               for later in self.tiers[position + 1:])
+                answer, answered_by = self._try_tier(tier, messages, deadline, on_token, validate, allow_hedge,
+                                                     errors, fallback)
+                if answer:
+                    self._count(answered_by, 'answers')
+                    return answer, answered_by.name
+            raise LlmUnavailable("; ".join(errors) or "no tiers configured")
+        finally:
+            with self._lock:
+                self._latencies.append(self.clock() - started)
+
+    def _try_tier(self, tier, messages, deadline, on_token, validate, allow_hedge, errors, fallback=False):
+        """
+        (answer, tier that gave it) from one tier within the deadline, retrying retryable errors
+        (timeouts only when there is no remote fallback tier to try instead)
+        The answer is None if the tier gives none; a hedge may answer for it
+        """
+        for attempt in range(tier.max_attempts):
+            remaining = deadline - self.clock()
+            if remaining <= 0 and tier.remote:  # Local tiers are instant, so they still run
+                errors.append(f"{tier.name}: deadline passed")
+                if tier.breaker:
+                    # Out of time while retrying counts as a failure; never having called the tier does not
+                    if attempt:
+                        self._count(tier, 'failures')
+                        tier.breaker.record_failure()
+                    else:
+                        tier.breaker.release()
+                return None, tier
+            try:
+                if self.hedge and tier.remote:
+                    answer, answered_by = self._race(tier, messages, deadline, on_token, validate, allow_hedge)
+                else:
+                    answer = tier.complete(messages, timeout=min(self.attempt_timeout, remaining),
+                                           deadline=deadline, on_token=on_token, validate=validate)
+                    answered_by = tier
+            except Exception as e:
+                errors.append(f"{tier.name}: {e}")
+                last_attempt = attempt + 1 >= tier.max_attempts
+                if not tier.remote or last_attempt or not is_retryable(e) or (fallback and is_timeout(e)):
+                    self._count(tier, 'failures')
+                    if tier.breaker:
+                        tier.breaker.record_failure()
+                    return None, tier
+                self._count(tier, 'retries')
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                self.sleep(max(0.0, min(delay, deadline - self.clock())))
+                continue
+            if answered_by.breaker:
+                answered_by.breaker.record_success()
+            if answered_by is not tier and tier.breaker:
+                tier.breaker.release()  # The hedge answered first; the tier's own request has no outcome
+            if not answer:
+                self._count(answered_by, 'rejected')
+                errors.append(f"{answered_by.name}: no acceptable answer")
+            return answer, answered_by
+        return None, tier
+
+    def _race(self, tier, messages, deadline, on_token, validate, allow_hedge):
+        """
+        One request to tier, plus a hedge if it is still silent after the hedge delay
+        Returns (answer, tier that finished first with an answer); raises the first error
+        when every request failed. Streamed tokens are passed to on_token on this thread,
+        from whichever request started streaming first
+        """
+        events = queue.Queue()
+        finished = threading.Event()
+        racers = [tier]
+        started = [self.clock()]
+
+        def run(index, racer):
+            def relay(text):
+                if finished.is_set():
+                    raise HedgeCancelled()
+                events.put(("token", index, text))
+            try:
+                answer = racer.complete(messages, timeout=min(self.attempt_timeout, deadline - self.clock()),
+                                        deadline=deadline, on_token=relay if on_token else None, validate=validate)
+                events.put(("done", index, answer))
+            except Exception as e:
+                events.put(("error", index, e))
+
+        self._executor.submit(run, 0, tier)
+        hedge_at = started[0] + self.hedge.delay(tier.name)
+        hedge_decided = False
+        stream_owner = None
+        heard_from = set()
+        running = 1
+        first_error = None
+        hedge_won = False
+        try:
+            while True:
+                wait_until = deadline if hedge_decided or 0 in heard_from else hedge_at
+                try:
+                    kind, index, value = events.get(timeout=max(0.0, wait_until - self.clock()))
+                except queue.Empty:
+                    if hedge_decided or 0 in heard_from:
+                        raise TimeoutError(f"{tier.name} passed the deadline")
+                    hedge_decided = True
+                    hedge_tier = self.hedge.hedge_tier or tier
+                    if self.hedge.acquire(hedge_tier, allow_hedge):
+                        racers.append(hedge_tier)
+                        started.append(self.clock())
+                        running += 1
+                        self._executor.submit(run, 1, hedge_tier)
+                    continue
+
+                if index not in heard_from:
+                    heard_from.add(index)
+                    if kind != "error":
+                        self.hedge.record_first_output(racers[index].name, self.clock() - started[index])
+                if kind == "token":
+                    if stream_owner is None:
+                        stream_owner = index
+                    if index == stream_owner:
+                        on_token(value)
+                    continue
+                running -= 1
+                if kind == "done" and value:
+                    hedge_won = index == 1
+                    if on_token and index != stream_owner:
+                        on_token(value)
+                    return value, racers[index]
+                if kind == "error" and first_error is None:
+                    first_error = value
+                if not running:
+                    if first_error is not None:
+                        raise first_error
+                    return None, racers[index]
+        finally:
+            finished.set()  # The loser's stream is abandoned at its next token
+            self.hedge.finish_race(len(racers) > 1, hedge_won)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            tiers = {name: dict(counts) for name, counts in self._stats.items()}
+        hedge_tiers = [self.hedge.hedge_tier] if self.hedge and self.hedge.hedge_tier else []
+        for tier in self.tiers + hedge_tiers:
+            if tier.name in tiers:
+                tiers[tier.name]['state'] = tier.breaker.state if tier.breaker else "local"
+        return {
+            'tiers': tiers,
+            'mean_latency': sum(latencies) / len(latencies) if latencies else None,
+            'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            'hedges': self.hedge.stats() if self.hedge else None,
+        }
@@ -0,0 +1,434 @@
+"""OTP email delivery: message building, SES/fake transports and a background send queue (no Streamlit dependency)"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from response_cache import TTLCache
+
+# =============================================================================
+# OTP EMAIL CONTENT
+# =============================================================================
+
+OTP_SUBJECT = "Aniket Solutions - Email Verification Code"
+OTP_SLOT = "{otp}"
+
+# HTML email body for better formatting
+OTP_HTML_TEMPLATE = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Email Verification - Aniket Solutions</title>
+        </head>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
+                <h1 style="color: white; margin: 0; font-size: 28px;">Aniket Solutions</h1>
+                <p style="color: #f0f0f0; margin: 10px 0 0 0; font-size: 16px;">Total Solutions Provider</p>
+            </div>
+            
+            <div style="background: #ffffff; padding: 40px; border-radius: 0 0 10px 10px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+                <h2 style="color: #333; margin-top: 0;">Email Verification Code</h2>
+                
+                <p>Hello,</p>
+                
+                <p>Thank you for your interest in Aniket Solutions! We've been providing excellent technology solutions since 2004.</p>
+                
+                <p>To verify your email address and continue with our consultation, please use the following verification code:</p>
+                
+                <div style="text-align: center; margin: 30px 0;">
+                    <div style="background: #f8f9fa; 
+                                border: 2px solid #667eea; 
+                                border-radius: 10px; 
+                                padding: 20px; 
+                                display: inline-block;">
+                        <p style="margin: 0; color: #666; font-size: 14px;">Your Verification Code</p>
+                        <h1 style="margin: 10px 0 0 0; 
+                                   color: #667eea; 
+                                   font-size: 36px; 
+                                   font-weight: bold; 
+                                   letter-spacing: 8px;
+                                   font-family: 'Courier New', monospace;">
+                            {otp}
+                        </h1>
+                    </div>
+                </div>
+                
+                <p style="background: #f8f9fa; padding: 15px; border-radius: 5px; border-left: 4px solid #667eea;">
+                    <strong>⏰ Important:</strong> This verification code will expire in 10 minutes for security purposes.
+                </p>
+                
+                <p style="background: #fff3cd; padding: 15px; border-radius: 5px; border-left: 4px solid #ffc107;">
+                    <strong>🔒 Security Note:</strong> Never share this code with anyone. Aniket Solutions will never ask for your verification code via phone or other means.
+                </p>
+                
+                <p>If you did not request this verification, please ignore this email.</p>
+                
+                <hr style="border: none; height: 1px; background: #eee; margin: 30px 0;">
+                
+                <div style="text-align: center; color: #666; font-size: 14px;">
+                    <p><strong>Aniket Solutions</strong><br>
+                    Website: <a href="https://www.aniketsolutions.com" style="color: #667eea;">www.aniketsolutions.com</a></p>
+                    
+                    <p style="font-size: 12px; color: #999;">
+                        This is an automated message. Please do not reply to this email.<br>
+                        Established 2004 • Singapore • Global Technology Solutions
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+# Plain text version for email clients that don't support HTML
+OTP_TEXT_TEMPLATE = """
+Hello,
+
+Thank you for your interest in Aniket Solutions!
+
+To verify your email address and continue with our consultation, please use the following verification code:
+
+Verification Code: {otp}
+
+This verification code will expire in 10 minutes for security purposes.
+
+If you did not request this verification, please ignore this email.
+
+Security Note: Never share this code with anyone. Aniket Solutions will never ask for your verification code via phone or other means.
+
+Best regards,
+Aniket Solutions Team
+Website: https://www.aniketsolutions.com
+
+---
+This is an automated message. Please do not reply to this email.
+        """
+
+class CompiledTemplate:
+    """Template split once around its single {otp} slot, so rendering is two concatenations"""
+
+    def __init__(self, template, slot=OTP_SLOT):
+        self.prefix, self.suffix = template.split(slot)
+
+    def render(self, otp):
+        return self.prefix + otp + self.suffix
+
+    def as_ses_template(self, variable="otp"):
+        """Same text with an SES (Handlebars) placeholder in the slot"""
+        return self.prefix + "{{" + variable + "}}" + self.suffix
+
+OTP_HTML = CompiledTemplate(OTP_HTML_TEMPLATE)
+OTP_TEXT = CompiledTemplate(OTP_TEXT_TEMPLATE)
+OTP_SUBJECT_CONTENT = {'Data': OTP_SUBJECT, 'Charset': 'UTF-8'}
+
+def build_otp_email(otp):
+    """Return (subject, html_body, text_body) for an OTP email"""
+    return OTP_SUBJECT, OTP_HTML.render(otp), OTP_TEXT.render(otp)
+
+def ensure_ses_template(ses_client, template_name):
+    """
+    Create the stored SES template for OTP emails, or update it if its content differs from this code's
+    Returns "created", "updated" or "unchanged"
+    """
+    from botocore.exceptions import ClientError  # Loaded with the SES client already
+    template = {
+        'TemplateName': template_name,
+        'SubjectPart': OTP_SUBJECT,
+        'HtmlPart': OTP_HTML.as_ses_template(),
+        'TextPart': OTP_TEXT.as_ses_template()
+    }
+    try:
+        stored = ses_client.get_template(TemplateName=template_name)['Template']
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TemplateDoesNotExist':
+            raise
+        ses_client.create_template(Template=template)
+        return "created"
+    if all(stored.get(part) == template[part] for part in ('SubjectPart', 'HtmlPart', 'TextPart')):
+        return "unchanged"
+    ses_client.update_template(Template=template)
+    return "updated"
+
+# =============================================================================
+# TRANSPORTS
+# =============================================================================
+
+class OtpDeliveryError(Exception):
+    """Delivery failure with a message that can be shown to the user as-is"""
+
+def make_ses_client(aws_access_key_id, aws_secret_access_key, region_name, max_pool_connections=10):
+    """
+    SES client meant to be shared by every session: a sized, keep-alive connection pool,
+    and no botocore retries because send_otp_email owns retrying (connection errors included)
+    boto3 is imported here rather than at module level: it is the slowest import in the app
+    and only needed once the first OTP is sent
+    """
+    import boto3
+    from botocore.config import Config
+    return boto3.client(
+        'ses',
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        region_name=region_name,
+        config=Config(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+            connect_timeout=5,
+            read_timeout=10,
+            retries={'total_max_attempts': 1}
+        )
+    )
+
+class SesTransport:
+    """
+    Sends OTP emails through an AWS SES client; send() returns (sender_email, message_id)
+    An auto-detected sender is cached for sender_refresh_interval seconds (and dropped
+    if SES rejects it), so a normal send is a single SES API call. With template_name
+    the stored SES template is used and only the code travels with each send
+    """
+
+    def __init__(self, ses_client, sender_email=None, sender_refresh_interval=3600,
+                 clock=time.monotonic, latency_window=200, template_name=None):
+        self.ses_client = ses_client
+        self.sender_email = sender_email
+        self.template_name = template_name
+        self.sender_refresh_interval = sender_refresh_interval
+        self.clock = clock
+        self._detected_sender = None
+        self._sender_expires_at = 0.0
+        self._lock = threading.Lock()
+        self.api_calls = {'send_email': 0, 'list_verified_email_addresses': 0}  # send_email counts templated sends too
+        self._latencies = deque(maxlen=latency_window)  # Seconds per send_email call
+
+    def resolve_sender(self):
+        """Configured sender, or the first verified SES identity (cached)"""
+        if self.sender_email:
+            return self.sender_email
+        with self._lock:
+            if self._detected_sender and self.clock() < self._sender_expires_at:
+                return self._detected_sender
+            # If no SES_FROM_EMAIL specified, try to get verified identities
+            self.api_calls['list_verified_email_addresses'] += 1
+            try:
+                response = self.ses_client.list_verified_email_addresses()
+            except Exception as e:
+                raise OtpDeliveryError(f"Could not retrieve verified email addresses: {str(e)}")
+            verified_emails = response.get('VerifiedEmailAddresses', [])
+            if not verified_emails:
+                raise OtpDeliveryError(
+                    "No verified email addresses found in AWS SES. Please verify at least one email address."
+                )
+            self._detected_sender = verified_emails[0]  # Use first verified email
+            self._sender_expires_at = self.clock() + self.sender_refresh_interval
+            return self._detected_sender
+
+    def send(self, email, otp):
+        from botocore.exceptions import ClientError  # Loaded with the SES client already
+        sender_email = self.resolve_sender()
+
+        # Send email using AWS SES
+        started = time.perf_counter()
+        with self._lock:
+            self.api_calls['send_email'] += 1
+        try:
+            if self.template_name:
+                response = self.ses_client.send_templated_email(
+                    Source=sender_email,
+                    Destination={'ToAddresses': [email]},
+                    Template=self.template_name,
+                    TemplateData=json.dumps({'otp': otp})
+                )
+            else:
+                response = self.ses_client.send_email(
+                    Source=sender_email,
+                    Destination={'ToAddresses': [email]},
+                    Message={
+                        'Subject': OTP_SUBJECT_CONTENT,
+                        'Body': {
+                            'Html': {'Data': OTP_HTML.render(otp), 'Charset': 'UTF-8'},
+                            'Text': {'Data': OTP_TEXT.render(otp), 'Charset': 'UTF-8'}
+                        }
+                    }
+                )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'MessageRejected':
+                with self._lock:
+                    self._sender_expires_at = 0.0  # The identity may have been unverified
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+        return sender_email, response['MessageId']
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            'api_calls': dict(self.api_calls),
+            'sender': self.sender_email or self._detected_sender,
+            'mean_latency': sum(latencies) / len(latencies) if latencies else None,
+            'p95_latency': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        }
+
+
+class FakeTransport:
+    """
+    In-memory stand-in for SesTransport for local runs and tests
+    Records every delivered (email, otp); `failures` is a list of exceptions
+    raised by the next sends in order, and `latency` simulates the SES round trip
+    """
+
+    def __init__(self, sender_email="noreply@example.com", latency=0.0, failures=()):
+        self.sender_email = sender_email
+        self.latency = latency
+        self.failures = list(failures)
+        self.sent = []
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def send(self, email, otp):
+        time.sleep(self.latency)
+        with self._lock:
+            self.attempts += 1
+            if self.failures:
+                raise self.failures.pop(0)
+            self.sent.append((email, otp))
+            return self.sender_email, f"fake-{len(self.sent)}"
+
+    def stats(self):
+        return {
+            'api_calls': {'send_email': self.attempts, 'list_verified_email_addresses': 0},
+            'sender': self.sender_email,
+            'mean_latency': self.latency if self.attempts else None,
+            'p95_latency': self.latency if self.attempts else None,
+        }
+
+def throttling_error(code='Throttling', message='Maximum sending rate exceeded.'):
+    """ClientError shaped like an SES throttling response, for use with FakeTransport"""
+    from botocore.exceptions import ClientError
+    return ClientError({'Error': {'Code': code, 'Message': message}}, 'SendEmail')
+
+# =============================================================================
+# SENDING WITH RETRIES
+# =============================================================================
+
+# SES error codes worth retrying: rate limits and transient service faults
+RETRYABLE_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'TooManyRequestsException',
+    'ServiceUnavailable', 'InternalFailure', 'RequestTimeout'
+}
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=8.0):
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+def send_otp_email(transport, email, otp, max_attempts=4, base_delay=0.5, sleep=time.sleep):
+    """
+    Send an OTP through transport, retrying throttling, transient errors and dropped
+    connections (e.g. a stale pooled keep-alive connection) with backoff
+    Returns tuple: (success, message, attempts)
+    """
+    if transport is None:
+        return False, "AWS SES not configured. Please configure AWS credentials in .env file.", 0
+    # botocore is imported on first send (on a queue worker), not when the app starts
+    from botocore.exceptions import ClientError, ConnectionError as EndpointUnreachable, HTTPClientError
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            sender_email, message_id = transport.send(email, otp)
+            return True, f"OTP sent successfully to {email} from {sender_email}! Message ID: {message_id}", attempt
+
+        except OtpDeliveryError as e:
+            return False, str(e), attempt
+
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            error_message = e.response['Error']['Message']
+
+            if error_code in RETRYABLE_ERROR_CODES and attempt < max_attempts:
+                sleep(backoff_delay(attempt, base_delay))
+                continue
+            if error_code == 'MessageRejected':
+                return False, "Email address not verified in AWS SES. Please verify the sender email address.", attempt
+            elif error_code == 'SendingPausedException':
+                return False, "AWS SES sending is paused for your account. Please contact AWS support.", attempt
+            else:
+                return False, f"AWS SES error ({error_code}): {error_message}", attempt
+
+        # Connect failures and timeouts, resets and read timeouts on an open connection
+        except (EndpointUnreachable, HTTPClientError) as e:
+            if attempt < max_attempts:
+                sleep(backoff_delay(attempt, base_delay))
+                continue
+            return False, f"Could not reach AWS SES: {str(e)}", attempt
+
+        except Exception as e:
+            return False, f"Failed to send OTP email: {str(e)}", attempt
+
+# =============================================================================
+# BACKGROUND SEND QUEUE
+# =============================================================================
+
+class OtpSendQueue:
+    """
+    Hands OTP emails to a thread pool so the UI never waits on SES
+    submit() returns a delivery id at once; status(delivery_id) reports
+    {'state': 'queued' | 'sending' | 'sent' | 'failed', 'message', 'attempts', 'latency'}
+    """
+
+    def __init__(self, transport, max_workers=4, max_attempts=4, base_delay=0.5,
+                 status_ttl=3600, sleep=time.sleep):
+        self.transport = transport
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.sleep = sleep
+        self._statuses = TTLCache(max_entries=10000, ttl_seconds=status_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="otp-sender")
+
+    def submit(self, email, otp, on_sent=None):
+        """Queue an OTP email and return its delivery id; on_sent() runs on the worker once it is sent"""
+        delivery_id = uuid.uuid4().hex
+        self._statuses.set(delivery_id, {'state': 'queued', 'message': "", 'attempts': 0, 'latency': None})
+        self._executor.submit(self._deliver, delivery_id, email, otp, on_sent)
+        return delivery_id
+
+    def _deliver(self, delivery_id, email, otp, on_sent):
+        started = time.perf_counter()
+        self._statuses.set(delivery_id, {'state': 'sending', 'message': "", 'attempts': 0, 'latency': None})
+        success, message, attempts = send_otp_email(
+            self.transport, email, otp,
+            max_attempts=self.max_attempts, base_delay=self.base_delay, sleep=self.sleep
+        )
+        if success and on_sent is not None:
+            try:
+                on_sent()
+            except Exception as e:
+                success, message = False, f"Could not store verification code: {str(e)}"
+        self._statuses.set(delivery_id, {
+            'state': 'sent' if success else 'failed',
+            'message': message,
+            'attempts': attempts,
+            'latency': time.perf_counter() - started
+        })
+
+    def status(self, delivery_id):
+        """Latest status dict for delivery_id, or None if unknown or expired"""
+        return self._statuses.get(delivery_id)
+
+    def outcome(self, delivery_id):
+        """
+        ('pending' | 'sent' | 'failed', message) for delivery_id
+        An unknown or expired status (e.g. after a restart) is a failure: the email may never have been sent
+        """
+        delivery = self.status(delivery_id)
+        if delivery is None:
+            return 'failed', "Delivery status is no longer available. Please request a new code."
+        if delivery['state'] in ('queued', 'sending'):
+            return 'pending', ""
+        return delivery['state'], delivery['message']
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,169 @@
+"""Shared OTP storage: hashed codes with expiry and attempt counters, in memory or in SQLite (WAL)
+
+Codes are never stored in clear: each row keeps a random salt and an HMAC of the
+code (keyed with OTP_HASH_SECRET when set). The SQLite backend lets several app
+processes, or a restarted one, verify codes issued elsewhere.
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from functools import lru_cache
+
+from sqlite_wal import thread_local_connection
+
+OTP_TTL_SECONDS = 600  # 10 minutes
+OTP_MAX_ATTEMPTS = 3
+
+def hash_code(code, salt, secret=b""):
+    return hmac.new(secret, salt.encode() + b":" + code.encode(), hashlib.sha256).hexdigest()
+
+class OtpStore:
+    """
+    Base class: issue() replaces the code for an email, verify() checks it atomically
+    verify() returns (is_valid, message, failed_attempts); a valid code is consumed
+    """
+
+    def __init__(self, secret=b"", max_attempts=OTP_MAX_ATTEMPTS, sweep_interval=300, clock=time.time):
+        self.secret = secret
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.clock = clock  # Wall clock, so expiry times mean the same in every process
+        self._next_sweep = 0.0
+
+    @staticmethod
+    def _key(email):
+        return email.strip().lower()
+
+    def _new_record(self, code, ttl_seconds):
+        salt = secrets.token_hex(16)
+        return hash_code(code, salt, self.secret), salt, self.clock() + ttl_seconds
+
+    def _check(self, record, code, now):
+        """Outcome for a stored (code_hash, salt, expires_at, attempts) row: missing, locked, expired, ok or wrong"""
+        if record is None:
+            return 'missing', "No OTP found. Please request a new one."
+        code_hash, salt, expires_at, attempts = record
+        if attempts >= self.max_attempts:
+            return 'locked', "Too many failed attempts. Please request a new OTP."
+        if expires_at <= now:
+            return 'expired', "OTP has expired. Please request a new one."
+        if hmac.compare_digest(code_hash, hash_code(code, salt, self.secret)):
+            return 'ok', "OTP verified successfully!"
+        return 'wrong', "Invalid OTP. Please try again."
+
+    def _maybe_sweep(self):
+        now = self.clock()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep()
+
+
+class MemoryOtpStore(OtpStore):
+    """Process-local backend; codes are lost on restart and invisible to other processes"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._records = {}  # email -> [code_hash, salt, expires_at, attempts]
+        self._lock = threading.Lock()
+
+    def issue(self, email, code, ttl_seconds=OTP_TTL_SECONDS):
+        self._maybe_sweep()
+        with self._lock:
+            self._records[self._key(email)] = [*self._new_record(code, ttl_seconds), 0]
+
+    def verify(self, email, code):
+        self._maybe_sweep()
+        key = self._key(email)
+        with self._lock:
+            record = self._records.get(key)
+            outcome, message = self._check(record, code, self.clock())
+            if outcome == 'ok':
+                del self._records[key]
+            elif outcome == 'wrong':
+                record[3] += 1
+            return outcome == 'ok', message, record[3] if record else 0
+
+    def discard(self, email):
+        with self._lock:
+            self._records.pop(self._key(email), None)
+
+    def sweep(self):
+        """Drop codes that expired over sweep_interval ago; returns how many were removed"""
+        now = self.clock() - self.sweep_interval
+        with self._lock:
+            expired = [key for key, record in self._records.items() if record[2] <= now]
+            for key in expired:
+                del self._records[key]
+        return len(expired)
+
+
+class SqliteOtpStore(OtpStore):
+    """SQLite backend in WAL mode, safe for several processes sharing one database file"""
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = path
+        self._connection = thread_local_connection(path)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS otp_codes ("
+                "email TEXT PRIMARY KEY, code_hash TEXT NOT NULL, salt TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS otp_codes_expires_at ON otp_codes (expires_at)")
+
+    def issue(self, email, code, ttl_seconds=OTP_TTL_SECONDS):
+        self._maybe_sweep()
+        code_hash, salt, expires_at = self._new_record(code, ttl_seconds)
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO otp_codes (email, code_hash, salt, expires_at, attempts) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (self._key(email), code_hash, salt, expires_at)
+            )
+
+    def verify(self, email, code):
+        self._maybe_sweep()
+        key = self._key(email)
+        connection = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so check-and-increment is atomic across processes
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            record = connection.execute(
+                "SELECT code_hash, salt, expires_at, attempts FROM otp_codes WHERE email = ?", (key,)
+            ).fetchone()
+            outcome, message = self._check(record, code, self.clock())
+            attempts = record[3] if record else 0
+            if outcome == 'ok':
+                connection.execute("DELETE FROM otp_codes WHERE email = ?", (key,))
+            elif outcome == 'wrong':
+                attempts += 1
+                connection.execute("UPDATE otp_codes SET attempts = attempts + 1 WHERE email = ?", (key,))
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        return outcome == 'ok', message, attempts
+
+    def discard(self, email):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM otp_codes WHERE email = ?", (self._key(email),))
+
+    def sweep(self):
+        """Drop codes that expired over sweep_interval ago; returns how many were removed"""
+        with self._connection() as connection:
+            return connection.execute(
+                "DELETE FROM otp_codes WHERE expires_at <= ?", (self.clock() - self.sweep_interval,)
+            ).rowcount
+
+
+@lru_cache(maxsize=1)
+def get_otp_store():
+    """Shared OTP store: SQLite at OTP_STORE_PATH when set, otherwise in memory"""
+    options = {'secret': os.getenv("OTP_HASH_SECRET", "").encode()}
+    path = os.getenv("OTP_STORE_PATH")
+    return SqliteOtpStore(path, **options) if path else MemoryOtpStore(**options)
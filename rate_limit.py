@@ -0,0 +1,196 @@
+"""Token-bucket rate limiting keyed by email, domain, session or client address, in memory or in SQLite (no Streamlit dependency)
+
+A limit is written "capacity/period_seconds": the bucket holds up to `capacity`
+tokens and refills at capacity / period tokens per second, so "3/600" allows a
+burst of three and then one more every 200 seconds.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from sqlite_wal import thread_local_connection
+
+RateLimit = namedtuple("RateLimit", ["capacity", "period"])
+
+def parse_rate_limit(spec):
+    """RateLimit from "capacity/period_seconds", e.g. "3/600\""""
+    capacity, period = spec.split("/")
+    return RateLimit(float(capacity), float(period))
+
+def _refill(tokens, updated_at, limit, now):
+    return min(limit.capacity, tokens + (now - updated_at) * limit.capacity / limit.period)
+
+def _retry_after(tokens, limit, cost):
+    return (cost - tokens) * limit.period / limit.capacity
+
+def format_retry_after(seconds):
+    """Human wait time for user-facing messages"""
+    seconds = max(1, math.ceil(seconds))
+    if seconds < 90:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    minutes = math.ceil(seconds / 60)
+    return f"{minutes} minutes"
+
+class RateLimiter:
+    """
+    Base class: hit() spends `cost` tokens from every bucket in `limits` or from none
+    limits is a list of (key, RateLimit); returns (allowed, retry_after_seconds)
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock  # Wall clock, so bucket times mean the same in every process
+        self.allowed = 0
+        self.denied = 0
+
+    def _decide(self, buckets, limits, cost, now):
+        """Refilled token counts and the longest wait among buckets that cannot pay"""
+        refilled = [_refill(tokens, updated_at, limit, now)
+                    for (tokens, updated_at), (key, limit) in zip(buckets, limits)]
+        retry_after = max((_retry_after(tokens, limit, cost)
+                           for tokens, (key, limit) in zip(refilled, limits) if tokens < cost), default=0.0)
+        if retry_after:
+            self.denied += 1
+        else:
+            self.allowed += 1
+        return refilled, retry_after
+
+    def stats(self):
+        return {'allowed': self.allowed, 'denied': self.denied}
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Process-local buckets (bounded; least recently used keys are forgotten, i.e. refilled)"""
+
+    def __init__(self, max_keys=100000, **options):
+        super().__init__(**options)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def hit(self, limits, cost=1):
+        with self._lock:
+            now = self.clock()
+            buckets = [self._buckets.get(key, (limit.capacity, now)) for key, limit in limits]
+            refilled, retry_after = self._decide(buckets, limits, cost, now)
+            for tokens, (key, limit) in zip(refilled, limits):
+                self._buckets[key] = (tokens if retry_after else tokens - cost, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return not retry_after, retry_after
+
+
+class SqliteRateLimiter(RateLimiter):
+    """Buckets in a SQLite table (WAL), shared by every process using the same file"""
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = path
+        self._connection = thread_local_connection(path)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def hit(self, limits, cost=1):
+        connection = self._connection()
+        # One write transaction, so concurrent processes cannot both spend the last token
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = self.clock()
+            buckets = []
+            for key, limit in limits:
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                buckets.append(row or (limit.capacity, now))
+            refilled, retry_after = self._decide(buckets, limits, cost, now)
+            connection.executemany(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                [(key, tokens if retry_after else tokens - cost, now)
+                 for tokens, (key, limit) in zip(refilled, limits)]
+            )
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        return not retry_after, retry_after
+
+    def sweep(self, max_age=86400):
+        """Drop buckets untouched for max_age seconds (they would be full again anyway)"""
+        with self._connection() as connection:
+            return connection.execute(
+                "DELETE FROM rate_limit_buckets WHERE updated_at <= ?", (self.clock() - max_age,)
+            ).rowcount
+
+# =============================================================================
+# APPLICATION LIMITS
+# =============================================================================
+
+# Session ids are new after "Reset Session" or a reload, so cost limits are also kept per client
+# address, with room for several visitors behind one office NAT. Behind reverse proxies, set
+# RATE_LIMIT_TRUSTED_PROXIES to how many of them append to X-Forwarded-For
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "0"))
+
+RATE_LIMITS = {
+    # OTP emails (Submit and Resend): per address, per email domain and per browser session
+    'otp_email': parse_rate_limit(os.getenv("RATE_LIMIT_OTP_EMAIL", "3/600")),
+    'otp_domain': parse_rate_limit(os.getenv("RATE_LIMIT_OTP_DOMAIN", "30/600")),
+    'otp_session': parse_rate_limit(os.getenv("RATE_LIMIT_OTP_SESSION", "5/600")),
+    # Email Submit clicks (each one is a round of DNS lookups)
+    'email_check_session': parse_rate_limit(os.getenv("RATE_LIMIT_EMAIL_CHECK_SESSION", "10/300")),
+    'email_check_client': parse_rate_limit(os.getenv("RATE_LIMIT_EMAIL_CHECK_CLIENT", "30/300")),
+    # Chat messages (each one can cost up to three OpenAI calls)
+    'chat_session': parse_rate_limit(os.getenv("RATE_LIMIT_CHAT_SESSION", "8/60")),
+    'chat_client': parse_rate_limit(os.getenv("RATE_LIMIT_CHAT_CLIENT", "24/60")),
+    # Hedged LLM requests (each one is a second paid completion for the same answer)
+    'llm_hedge_session': parse_rate_limit(os.getenv("RATE_LIMIT_LLM_HEDGE_SESSION", "5/3600")),
+    'llm_hedge_client': parse_rate_limit(os.getenv("RATE_LIMIT_LLM_HEDGE_CLIENT", "15/3600")),
+}
+
+def client_address(peer, forwarded_for=None, trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES):
+    """
+    Visitor address to key per-client limits on, or None if unknown
+    With trusted_proxies in front of the app, the X-Forwarded-For entry appended by the
+    outermost of them (entries left of it are client-supplied and can be forged)
+    """
+    if trusted_proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if hops:
+            return hops[max(len(hops) - trusted_proxies, 0)]
+    return peer or None
+
+def _with_client(limits, name, client):
+    if client:
+        limits.append((f"{name}:{client}", RATE_LIMITS[name]))
+    return limits
+
+def otp_send_limits(email, session_id):
+    email = email.strip().lower()
+    return [
+        (f"otp_email:{email}", RATE_LIMITS['otp_email']),
+        (f"otp_domain:{email.rsplit('@', 1)[-1]}", RATE_LIMITS['otp_domain']),
+        (f"otp_session:{session_id}", RATE_LIMITS['otp_session']),
+    ]
+
+def email_check_limits(session_id, client=None):
+    return _with_client([(f"email_check_session:{session_id}", RATE_LIMITS['email_check_session'])],
+                        'email_check_client', client)
+
+def chat_limits(session_id, client=None):
+    return _with_client([(f"chat_session:{session_id}", RATE_LIMITS['chat_session'])], 'chat_client', client)
+
+def llm_hedge_limits(session_id, client=None):
+    return _with_client([(f"llm_hedge_session:{session_id}", RATE_LIMITS['llm_hedge_session'])],
+                        'llm_hedge_client', client)
+
+@lru_cache(maxsize=1)
+def get_rate_limiter():
+    """Shared limiter: SQLite at RATE_LIMIT_STORE_PATH when set, otherwise in memory"""
+    path = os.getenv("RATE_LIMIT_STORE_PATH")
+    return SqliteRateLimiter(path) if path else MemoryRateLimiter()
@@ -0,0 +1,224 @@
+"""In-process caches for LLM answers: exact and similarity tiers with TTL and LRU eviction"""
+
+import hashlib
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+def normalize_query(text):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key"""
+    return " ".join(re.findall(r"[a-z0-9@#+.]+", text.lower())).strip(" .")
+
+def content_hash(text):
+    """Stable digest of text with case and whitespace differences removed"""
+    return hashlib.sha256(" ".join(text.casefold().split()).encode("utf-8")).hexdigest()
+
+# =============================================================================
+# TTL + LRU CACHE
+# =============================================================================
+
+class TTLCache:
+    """Thread-safe bounded mapping with per-entry expiry and least-recently-used eviction"""
+
+    def __init__(self, max_entries=1000, ttl_seconds=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+# =============================================================================
+# SEMANTIC RESPONSE CACHE
+# =============================================================================
+
+def hashed_ngram_vector(text, dimensions=1024, ngram=3):
+    """L2-normalised bag of hashed word unigrams and character n-grams (no network needed)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in text.split():
+        vector[zlib.crc32(word.encode()) % dimensions] += 1.0
+        padded = f" {word} "
+        for i in range(len(padded) - ngram + 1):
+            vector[zlib.crc32(padded[i:i + ngram].encode()) % dimensions] += 0.5
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# A changed number ("10 vessels" vs "50 vessels") or an added "not" barely moves the
+# n-gram vector but changes the answer. "t" is what normalize_query leaves of "n't".
+NEGATION_WORDS = frozenset({"not", "no", "without", "never", "t"})
+
+def meaning_guard(normalized):
+    """Numbers and negation words of a normalised query; a similarity hit needs them to match exactly"""
+    return tuple(sorted(word for word in normalized.split()
+                        if word in NEGATION_WORDS or any(char.isdigit() for char in word)))
+
+class SemanticResponseCache:
+    """Response cache with an exact tier (normalised query) and a cosine-similarity tier.
+
+    Both tiers share one bounded TTL/LRU store; the similarity tier keeps a
+    fixed-size matrix of query vectors, one row per cached entry. A similar
+    entry is only served when its numbers and negation words match the query's.
+    An answer given with conversation history is stored under that context
+    (e.g. a digest of the history) and only returned for the same context.
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=86400, similarity_threshold=0.92,
+                 dimensions=1024, clock=time.monotonic):
+        self.similarity_threshold = similarity_threshold
+        self.dimensions = dimensions
+        self.clock = clock
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (context, normalised query) -> (expires_at, slot, response)
+        self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+        self._slot_expiry = np.full(max_entries, -np.inf)
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._slot_keys = [None] * max_entries
+        self._slot_guards = [None] * max_entries
+        self._slot_contexts = np.zeros(max_entries, dtype=np.int64)  # Context id per slot, 0 = none
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _release(self, key):
+        expires_at, slot, response = self._entries.pop(key)
+        self._slot_expiry[slot] = -np.inf
+        self._slot_keys[slot] = None
+        self._slot_guards[slot] = None
+        self._free_slots.append(slot)
+
+    @staticmethod
+    def _context_id(context):
+        if not context:
+            return 0
+        return int.from_bytes(hashlib.sha256(context.encode("utf-8")).digest()[:8], "big", signed=True) or 1
+
+    def get(self, query, context=""):
+        """Return a cached response for query in context (exact, then similar), or None"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return None
+        key = (context, normalized)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[2]
+                self._release(key)
+
+            if self._entries:
+                similarities = self._vectors @ hashed_ngram_vector(normalized, self.dimensions)
+                similarities[(self._slot_expiry <= now) | (self._slot_contexts != self._context_id(context))] = -1.0
+                candidates = np.flatnonzero(similarities >= self.similarity_threshold)
+                guard = meaning_guard(normalized)
+                for slot in candidates[np.argsort(-similarities[candidates])]:
+                    if self._slot_guards[slot] == guard:
+                        similar_key = self._slot_keys[slot]
+                        self._entries.move_to_end(similar_key)
+                        self.similar_hits += 1
+                        return self._entries[similar_key][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, query, response, context=""):
+        """Cache response under the normalised query and context, evicting the least recently used entry if full"""
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        key = (context, normalized)
+        with self._lock:
+            if key in self._entries:
+                self._release(key)
+            if not self._free_slots:
+                now = self.clock()
+                for stale_key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+                    self._release(stale_key)
+            if not self._free_slots:
+                self._release(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free_slots.pop()
+            expires_at = self.clock() + self.ttl_seconds
+            self._vectors[slot] = hashed_ngram_vector(normalized, self.dimensions)
+            self._slot_expiry[slot] = expires_at
+            self._slot_keys[slot] = key
+            self._slot_guards[slot] = meaning_guard(normalized)
+            self._slot_contexts[slot] = self._context_id(context)
+            self._entries[key] = (expires_at, slot, response)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._release(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'exact_hits': self.exact_hits,
+            'similar_hits': self.similar_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,23 @@
+"""SQLite connections for stores shared by several app processes (no Streamlit dependency)"""
+
+import sqlite3
+import threading
+
+def thread_local_connection(path, timeout=10):
+    """
+    Function returning the calling thread's connection to the database at path
+    Each thread opens its own connection on first use (sqlite3 connections are not
+    shared across threads), in WAL mode so readers never block the single writer
+    """
+    local = threading.local()
+
+    def connection():
+        connection = getattr(local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(path, timeout=timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection = connection
+        return connection
+
+    return connection
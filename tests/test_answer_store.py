@@ -0,0 +1,31 @@
+import pytest
+
+from answer_store import get_answer_store
+
+# Generic questions whose only overlap with a canned answer is one word; they go to the LLM
+GENERIC_QUESTIONS = [
+    "How much does it cost?",
+    "Can it run offline on the ship?",
+    "What's the price?",
+    "Is there a free trial?",
+]
+
+@pytest.mark.parametrize("question", GENERIC_QUESTIONS)
+def test_generic_questions_fall_through_to_the_llm(question):
+    assert get_answer_store().best_answer(question) is None
+
+@pytest.mark.parametrize("question, heading", [
+    ("Do you track vendor performance and quote comparison?", "**AniSol Procurement**"),
+    ("software for spares and consumables onboard", "**AniSol Inventory Control**"),
+    ("STCW certificate tracking for seafarers", "**AniSol Crewing Module**"),
+    ("offline sync for mobile app", "**Mobile Application Development**"),
+])
+def test_specific_questions_get_their_canned_answer(question, heading):
+    assert get_answer_store().best_answer(question).startswith(heading)
+
+def test_single_term_matches_are_allowed_when_requested():
+    answer = get_answer_store().best_answer("Can it run offline on the ship?", min_score=1.0, min_terms=1)
+    assert answer.startswith("**Mobile Application Development**")
+
+def test_kind_filter_limits_the_search():
+    assert get_answer_store().best_answer("offline sync for mobile app", kind='product') is None
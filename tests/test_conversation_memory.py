@@ -0,0 +1,55 @@
+import pytest
+
+from conversation_memory import ConversationMemory, estimate_tokens
+from response_cache import SemanticResponseCache
+
+SYSTEM_PROMPT = "You are a maritime software assistant."
+
+# Questions that depend on what the visitor said earlier without any pronoun or follow-up marker
+DEPENDENT_QUESTIONS = [
+    "What would the pricing look like for our fleet size?",
+    "How long would implementation take for us?",
+    "Does the module you described support offline mode?",
+]
+
+def ask(cache, memory, question, answer_with_llm):
+    """The app's cache flow: answers are looked up and stored under the digest of the prompt's history"""
+    messages, history_digest = memory.build_context(SYSTEM_PROMPT, question, 1000)
+    cached = cache.get(question, context=history_digest)
+    if cached:
+        return cached
+    answer = answer_with_llm(messages)
+    cache.put(question, answer, context=history_digest)
+    return answer
+
+@pytest.mark.parametrize("question", DEPENDENT_QUESTIONS)
+def test_answers_given_with_history_stay_in_their_conversation(question):
+    cache = SemanticResponseCache(max_entries=10)
+    first = ConversationMemory()
+    first.add_turn("We are Oceanic Tankers with 42 vessels", "Thanks, noted.")
+    assert ask(cache, first, question, lambda messages: "For Oceanic Tankers' 42 vessels...") \
+        == "For Oceanic Tankers' 42 vessels..."
+
+    fresh = ConversationMemory()
+    assert ask(cache, fresh, question, lambda messages: "generic answer") == "generic answer"
+    other = ConversationMemory()
+    other.add_turn("We run 3 bulk carriers", "Thanks, noted.")
+    assert ask(cache, other, question, lambda messages: "for 3 bulk carriers") == "for 3 bulk carriers"
+
+def test_answers_given_without_history_are_shared():
+    question = "What does the AniSol crewing module do?"
+    cache = SemanticResponseCache(max_entries=10)
+    assert ask(cache, ConversationMemory(), question, lambda messages: "crewing overview") == "crewing overview"
+    calls = []
+    assert ask(cache, ConversationMemory(), question, calls.append) == "crewing overview"
+    assert calls == []
+
+def test_history_digest_is_empty_only_without_history():
+    memory = ConversationMemory()
+    assert memory.build_context(SYSTEM_PROMPT, "Hello", 1000)[1] == ""
+    memory.add_turn("Hello", "Hi, how can I help?")
+    assert memory.build_context(SYSTEM_PROMPT, "Hello", 1000)[1] != ""
+
+def test_cjk_characters_count_one_token_each():
+    assert estimate_tokens("船舶管理系统") == 6
+    assert estimate_tokens("fleet") == 2
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from domain_blocklist import DomainBlocklist
+
+DOMAINS = ["mailinator.com", "yopmail.com", "guerrillamail.com", "trashmail.com"]
+
+@pytest.fixture
+def list_file(tmp_path):
+    path = tmp_path / "disposable.txt"
+    versions = iter(range(1, 1000))
+
+    def write(content):
+        if isinstance(content, str):
+            path.write_text(content, encoding="utf-8")
+        else:
+            path.write_bytes(content)
+        # Distinct mtimes, however fast the test writes
+        mtime_ns = next(versions) * 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        return str(path)
+
+    return write
+
+def test_subdomains_of_listed_domains_match(list_file):
+    blocklist = DomainBlocklist(list_file("\n".join(DOMAINS) + "\n# comment\n"))
+    assert blocklist.match("eu.mailinator.com") == "mailinator.com"
+    assert blocklist.match("acme.com") is None
+
+def test_changed_file_is_reloaded(list_file):
+    blocklist = DomainBlocklist(list_file("\n".join(DOMAINS)))
+    list_file("\n".join(DOMAINS + ["maildrop.cc"]))
+    assert blocklist.reload()
+    assert blocklist.match("maildrop.cc") == "maildrop.cc"
+
+def test_undecodable_file_keeps_the_previous_list(list_file):
+    blocklist = DomainBlocklist(list_file("\n".join(DOMAINS)))
+    list_file(b"mailinator.com\n\xff\xfe\x00broken")
+    assert not blocklist.reload()
+    assert len(blocklist) == len(DOMAINS) and blocklist.match("yopmail.com")
+    assert blocklist.stats()['last_error'].startswith("unreadable")
+
+def test_empty_file_keeps_the_previous_list(list_file):
+    blocklist = DomainBlocklist(list_file("\n".join(DOMAINS)))
+    list_file("")
+    assert not blocklist.reload()
+    assert len(blocklist) == len(DOMAINS)
+
+def test_empty_file_keeps_the_defaults(list_file):
+    blocklist = DomainBlocklist(list_file("# nothing yet\n"), defaults=["gmail.com"])
+    assert blocklist.match("gmail.com") == "gmail.com"
+
+def test_truncated_file_keeps_the_previous_list(list_file):
+    blocklist = DomainBlocklist(list_file("\n".join(DOMAINS)))
+    list_file("mailinator.com\n")
+    assert not blocklist.reload()
+    assert blocklist.match("trashmail.com") == "trashmail.com"
+    assert blocklist.stats()['last_error'] == "1 domains, down from 4"
+    # A deliberate cut is applied with force
+    assert blocklist.reload(force=True)
+    assert len(blocklist) == 1
+
+def test_smaller_file_than_the_defaults_is_loaded(list_file):
+    blocklist = DomainBlocklist(list_file("example-disposable.test\n"), defaults=DOMAINS)
+    assert len(blocklist) == 1
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from email_validation import DnsResultCache, make_async_resolver, validate_domain_async
+from fake_dns_server import FakeDnsServer
+
+@pytest.fixture
+def stub_dns():
+    servers = []
+
+    def start(delays=None):
+        server = FakeDnsServer(delays=delays)
+        host, port = server.start()
+        servers.append(server)
+        return server, make_async_resolver([host], port)
+
+    yield start
+    for server in servers:
+        server.stop()
+
+def validate(domain, resolver, budget_seconds=1.0, dns_cache=None, **options):
+    return asyncio.run(validate_domain_async(domain, budget_seconds, resolver=resolver,
+                                             dns_cache=dns_cache or DnsResultCache(), **options))
+
+def test_mx_record_is_valid(stub_dns):
+    server, resolver = stub_dns()
+    assert validate("acme.test", resolver) == (True, "Domain has valid MX records", False)
+
+def test_nxdomain_is_rejected(stub_dns):
+    server, resolver = stub_dns()
+    assert validate("no-such-domain.test", resolver) == (False, "Domain does not exist", False)
+
+def test_missing_mx_falls_back_to_the_a_record(stub_dns):
+    server, resolver = stub_dns()
+    assert validate("web-only.test", resolver) == (True, "Domain exists but no MX record found", False)
+    assert sorted(server.queries) == [("web-only.test", "A"), ("web-only.test", "MX")]
+
+def test_domain_without_mx_or_a_is_rejected(stub_dns):
+    server, resolver = stub_dns()
+    assert validate("txt-only.test", resolver) == (False, "Domain validation failed", False)
+
+def test_budget_exhausted_is_degraded(stub_dns):
+    server, resolver = stub_dns(delays={"acme.test": 2.0})
+    assert validate("acme.test", resolver, budget_seconds=0.3) \
+        == (True, "Domain check timed out - accepted pending code verification", True)
+    assert validate("acme.test", resolver, budget_seconds=0.3, accept_on_timeout=False) \
+        == (False, "Domain check timed out", True)
+
+def test_slow_mx_uses_the_finished_a_lookup(stub_dns):
+    server, resolver = stub_dns(delays={("acme.test", "MX"): 2.0})
+    assert validate("acme.test", resolver, budget_seconds=0.3) \
+        == (True, "Domain exists (MX lookup exceeded the time budget)", True)
+
+def test_answers_are_served_from_the_cache(stub_dns):
+    server, resolver = stub_dns()
+    dns_cache = DnsResultCache()
+    for _ in range(3):
+        assert validate("acme.test", resolver, dns_cache=dns_cache)[0]
+    # The concurrent A lookup is cancelled once MX answers, so only MX is sure to be cached
+    assert server.queries.count(("acme.test", "MX")) == 1
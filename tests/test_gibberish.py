@@ -0,0 +1,56 @@
+import pytest
+
+from gibberish import (EVAL_PATH, HOLDOUT_PATH, classify_with_language_model, detect_gibberish, load_eval_set,
+                       split_plain_words)
+
+# Real queries the character model scores as low as gibberish; they must reach the remote check
+LOW_SCORING_QUERIES = [
+    "Need ERP, CRM, MRP & WMS via SFTP/EDI",
+    "Need OCR + NLP for BL/BoL docs, API via REST/gRPC",
+    "SLA for P1/P2 tickets, 24x7 NOC?",
+    "VMS/TMS/WMS + EDI 856/810 w/ 3PLs",
+    "CI/CD on GCP w/ k8s, TF & GH Actions",
+    "Necesitamos un sistema de gestion de flotas para nuestros buques",
+    "Wir brauchen eine Software fuer die Wartungsplanung unserer Schiffe",
+    "Potrzebujemy systemu do zarzadzania zaloga statkow",
+    "kubectl get pods -n prod | grep crashloop",
+    "GET /api/v1/vessels?imo=9321483 returns 500",
+]
+
+@pytest.mark.parametrize("query", LOW_SCORING_QUERIES)
+def test_low_scoring_queries_are_not_rejected_locally(query):
+    assert classify_with_language_model(query)[0] != "GIBBERISH"
+
+def test_no_valid_holdout_sample_is_rejected_locally():
+    rejected = [text for is_gibberish, text in load_eval_set(HOLDOUT_PATH)
+                if not is_gibberish and classify_with_language_model(text)[0] == "GIBBERISH"]
+    assert rejected == []
+
+def test_clearly_degenerate_text_is_rejected_locally():
+    assert classify_with_language_model("uiouio uiouiouio yuiyui")[0] == "GIBBERISH"
+
+def test_plain_business_english_is_valid():
+    assert classify_with_language_model("Is there a webhook for PO.created and GRN.posted events?")[0] == "VALID"
+    assert classify_with_language_model("What is the price of the procurement module per vessel per year?")[0] == "VALID"
+
+@pytest.mark.parametrize("query", [
+    "Need ERP, CRM, MRP & WMS via SFTP/EDI",
+    "VMS/TMS/WMS + EDI 856/810 w/ 3PLs",
+    "Do you support AIS, ECDIS & VDR data feeds over MQTT?",
+    "KPI dashboards for OPEX/CAPEX per VSL in PowerBI",
+])
+def test_acronym_heavy_queries_are_valid_locally(query):
+    assert classify_with_language_model(query)[0] == "VALID"
+
+def test_acronyms_and_identifiers_are_not_scored():
+    assert split_plain_words("Is there a webhook for PO.created and GRN.posted events?") \
+        == ("Is there a webhook for and events", 2)
+
+def test_uppercase_junk_is_left_to_the_heuristics():
+    assert detect_gibberish("XKQZ BVNM PLWR")[0]
+
+@pytest.mark.parametrize("path, max_rate", [(EVAL_PATH, 0.05), (HOLDOUT_PATH, 0.35)])
+def test_remote_check_is_limited_to_the_uncertain_band(path, max_rate):
+    passed = [text for _, text in load_eval_set(path) if not detect_gibberish(text)[0]]
+    remote = [text for text in passed if classify_with_language_model(text)[0] == "UNCLEAR"]
+    assert len(remote) <= max_rate * len(passed)
@@ -0,0 +1,104 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fake_openai_server import Behaviour, FakeOpenAIServer
+from llm_gateway import CircuitBreaker, LlmGateway, LlmUnavailable, LocalTier, OpenAITier
+
+MESSAGES = [{"role": "user", "content": "What does the crewing module cost for 12 vessels?"}]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def fake_api():
+    servers = []
+
+    def start(behaviours):
+        server = FakeOpenAIServer(behaviours, seed=7)
+        servers.append(server)
+        return server, openai.OpenAI(api_key="sk-fake", base_url=server.start())
+
+    yield start
+    for server in servers:
+        server.stop()
+
+def make_gateway(client, primary_breaker=None, deadline=4.0, attempt_timeout=1.0):
+    return LlmGateway([
+        OpenAITier("gpt-4", client, "gpt-4", breaker=primary_breaker or CircuitBreaker(3, 30.0)),
+        OpenAITier("gpt-3.5-turbo", client, "gpt-3.5-turbo", breaker=CircuitBreaker(3, 30.0)),
+        LocalTier("canned", lambda messages: "Contact info@aniketsolutions.com"),
+    ], deadline=deadline, attempt_timeout=attempt_timeout, sleep=lambda seconds: None)
+
+def test_failing_primary_falls_back_to_the_next_model(fake_api):
+    server, client = fake_api({"gpt-4": Behaviour(latency=0.01, error_rate=1.0, status=500),
+                               "*": Behaviour(latency=0.01)})
+    answer, tier = make_gateway(client).complete(MESSAGES)
+    assert tier == "gpt-3.5-turbo" and "aniketsolutions" in answer
+    assert server.requests_by_model == {"gpt-4": 2, "gpt-3.5-turbo": 1}  # 500s are retried once
+
+def test_hung_primary_is_not_retried_while_a_fallback_remains(fake_api):
+    server, client = fake_api({"gpt-4": Behaviour(latency=0.01, hang_rate=1.0, hang_seconds=5.0),
+                               "*": Behaviour(latency=0.01)})
+    gateway = make_gateway(client, deadline=2.5, attempt_timeout=1.0)
+    assert gateway.complete(MESSAGES)[1] == "gpt-3.5-turbo"
+    assert server.requests_by_model["gpt-4"] == 1
+    assert gateway.stats()['tiers']["gpt-4"]['retries'] == 0
+
+def test_all_models_down_ends_on_the_local_tier(fake_api):
+    server, client = fake_api({"*": Behaviour(latency=0.01, error_rate=1.0, status=503)})
+    assert make_gateway(client).complete(MESSAGES)[1] == "canned"
+
+def test_breaker_opens_and_skips_the_failing_model(fake_api):
+    server, client = fake_api({"gpt-4": Behaviour(latency=0.01, error_rate=1.0, status=500),
+                               "*": Behaviour(latency=0.01)})
+    gateway = make_gateway(client, primary_breaker=CircuitBreaker(2, 30.0))
+    for _ in range(2):
+        assert gateway.complete(MESSAGES)[1] == "gpt-3.5-turbo"
+    assert gateway.stats()['tiers']["gpt-4"]['state'] == "open"
+    calls_before = server.requests_by_model["gpt-4"]
+    assert gateway.complete(MESSAGES)[1] == "gpt-3.5-turbo"
+    assert server.requests_by_model["gpt-4"] == calls_before
+    assert gateway.stats()['tiers']["gpt-4"]['skipped'] == 1
+
+def test_half_open_breaker_lets_a_single_trial_through(fake_api):
+    server, client = fake_api({"gpt-4": Behaviour(latency=0.5), "*": Behaviour(latency=0.01)})
+    clock = FakeClock()
+    breaker = CircuitBreaker(1, 30.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 31.0
+    assert breaker.state == "half_open"
+
+    gateway = make_gateway(client, primary_breaker=breaker)
+    with ThreadPoolExecutor(6) as pool:
+        tiers = [tier for answer, tier in pool.map(lambda _: gateway.complete(MESSAGES), range(6))]
+    assert server.requests_by_model["gpt-4"] == 1
+    assert tiers.count("gpt-4") == 1 and tiers.count("gpt-3.5-turbo") == 5
+    assert breaker.state == "closed"
+
+def test_failed_trial_reopens_the_breaker(fake_api):
+    server, client = fake_api({"gpt-4": Behaviour(latency=0.01, error_rate=1.0, status=400),
+                               "*": Behaviour(latency=0.01)})
+    clock = FakeClock()
+    breaker = CircuitBreaker(1, 30.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 31.0
+    assert make_gateway(client, primary_breaker=breaker).complete(MESSAGES)[1] == "gpt-3.5-turbo"
+    assert breaker.state == "open" and server.requests_by_model["gpt-4"] == 1
+
+def test_no_answer_from_any_tier_raises(fake_api):
+    server, client = fake_api({"*": Behaviour(latency=0.01, error_rate=1.0, status=503)})
+    gateway = LlmGateway([OpenAITier("gpt-4", client, "gpt-4")], deadline=2.0, attempt_timeout=1.0,
+                         sleep=lambda seconds: None)
+    with pytest.raises(LlmUnavailable, match="gpt-4"):
+        gateway.complete(MESSAGES)
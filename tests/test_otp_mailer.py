@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+
+import pytest
+from botocore.stub import ANY, Stubber
+
+from otp_mailer import (OTP_HTML, OTP_SUBJECT, OTP_TEXT, FakeTransport, OtpSendQueue, SesTransport, backoff_delay,
+                        ensure_ses_template, make_ses_client, send_otp_email, throttling_error)
+
+SENDER = "noreply@aniketsolutions.com"
+RECIPIENT = "buyer@shipping.example"
+TEMPLATE = {
+    'TemplateName': "otp-code",
+    'SubjectPart': OTP_SUBJECT,
+    'HtmlPart': OTP_HTML.as_ses_template(),
+    'TextPart': OTP_TEXT.as_ses_template(),
+}
+
+@pytest.fixture
+def ses():
+    client = make_ses_client("AKIAEXAMPLE", "secret", "us-east-1")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+def test_send_email_renders_the_code_inline(ses):
+    client, stubber = ses
+    stubber.add_response('send_email', {'MessageId': "msg-1"}, {
+        'Source': SENDER,
+        'Destination': {'ToAddresses': [RECIPIENT]},
+        'Message': {
+            'Subject': {'Data': OTP_SUBJECT, 'Charset': 'UTF-8'},
+            'Body': {
+                'Html': {'Data': OTP_HTML.render("123456"), 'Charset': 'UTF-8'},
+                'Text': {'Data': OTP_TEXT.render("123456"), 'Charset': 'UTF-8'},
+            },
+        },
+    })
+    assert SesTransport(client, SENDER).send(RECIPIENT, "123456") == (SENDER, "msg-1")
+
+def test_send_templated_email_sends_only_the_code(ses):
+    client, stubber = ses
+    stubber.add_response('send_templated_email', {'MessageId': "msg-2"}, {
+        'Source': SENDER,
+        'Destination': {'ToAddresses': [RECIPIENT]},
+        'Template': "otp-code",
+        'TemplateData': json.dumps({'otp': "654321"}),
+    })
+    transport = SesTransport(client, SENDER, template_name="otp-code")
+    assert transport.send(RECIPIENT, "654321") == (SENDER, "msg-2")
+
+def test_detected_sender_is_cached(ses):
+    client, stubber = ses
+    stubber.add_response('list_verified_email_addresses', {'VerifiedEmailAddresses': [SENDER]}, {})
+    for message_id in ("msg-3", "msg-4"):
+        stubber.add_response('send_email', {'MessageId': message_id},
+                             {'Source': SENDER, 'Destination': ANY, 'Message': ANY})
+    transport = SesTransport(client)
+    transport.send(RECIPIENT, "111111")
+    transport.send(RECIPIENT, "222222")
+    assert transport.stats()['api_calls'] == {'send_email': 2, 'list_verified_email_addresses': 1}
+
+def test_throttling_is_retried_with_backoff(ses):
+    client, stubber = ses
+    for _ in range(2):
+        stubber.add_client_error('send_email', service_error_code='Throttling',
+                                 service_message="Maximum sending rate exceeded.", http_status_code=400)
+    stubber.add_response('send_email', {'MessageId': "msg-5"})
+    delays = []
+    success, message, attempts = send_otp_email(SesTransport(client, SENDER), RECIPIENT, "333333",
+                                                max_attempts=4, base_delay=0.5, sleep=delays.append)
+    assert success and "msg-5" in message
+    assert attempts == 3
+    # Full jitter: retry n waits between 0 and base_delay * 2 ** (n - 1)
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 0.5 and 0 <= delays[1] <= 1.0
+
+def test_throttling_gives_up_after_max_attempts(ses):
+    client, stubber = ses
+    for _ in range(3):
+        stubber.add_client_error('send_email', service_error_code='Throttling',
+                                 service_message="Maximum sending rate exceeded.", http_status_code=400)
+    delays = []
+    success, message, attempts = send_otp_email(SesTransport(client, SENDER), RECIPIENT, "444444",
+                                                max_attempts=3, sleep=delays.append)
+    assert not success and "Throttling" in message
+    assert attempts == 3 and len(delays) == 2
+
+def test_message_rejected_is_not_retried(ses):
+    client, stubber = ses
+    stubber.add_client_error('send_email', service_error_code='MessageRejected',
+                             service_message="Email address is not verified.", http_status_code=400)
+    delays = []
+    success, message, attempts = send_otp_email(SesTransport(client, SENDER), RECIPIENT, "555555",
+                                                sleep=delays.append)
+    assert not success and "not verified" in message
+    assert attempts == 1 and delays == []
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, 0.5, 8.0) <= 8.0 for attempt in range(1, 20))
+
+def test_ensure_ses_template_creates_a_missing_template(ses):
+    client, stubber = ses
+    stubber.add_client_error('get_template', service_error_code='TemplateDoesNotExist',
+                             service_message="Template otp-code does not exist.", http_status_code=400,
+                             expected_params={'TemplateName': "otp-code"})
+    stubber.add_response('create_template', {}, {'Template': TEMPLATE})
+    assert ensure_ses_template(client, "otp-code") == "created"
+
+def test_ensure_ses_template_leaves_a_current_template_alone(ses):
+    client, stubber = ses
+    stubber.add_response('get_template', {'Template': TEMPLATE}, {'TemplateName': "otp-code"})
+    assert ensure_ses_template(client, "otp-code") == "unchanged"
+
+def test_ensure_ses_template_updates_a_changed_template(ses):
+    client, stubber = ses
+    stubber.add_response('get_template', {'Template': {**TEMPLATE, 'SubjectPart': "Old subject"}},
+                         {'TemplateName': "otp-code"})
+    stubber.add_response('update_template', {}, {'Template': TEMPLATE})
+    assert ensure_ses_template(client, "otp-code") == "updated"
+
+def test_ensure_ses_template_raises_other_errors(ses):
+    client, stubber = ses
+    stubber.add_client_error('get_template', service_error_code='AccessDenied',
+                             service_message="Not authorized.", http_status_code=403)
+    with pytest.raises(Exception, match="AccessDenied"):
+        ensure_ses_template(client, "otp-code")
+
+def test_connection_errors_are_retried_with_backoff():
+    from botocore.exceptions import ConnectionClosedError, EndpointConnectionError, ReadTimeoutError
+    endpoint = "https://email.us-east-1.amazonaws.com"
+    transport = FakeTransport(failures=[EndpointConnectionError(endpoint_url=endpoint),
+                                        ConnectionClosedError(endpoint_url=endpoint),
+                                        ReadTimeoutError(endpoint_url=endpoint)])
+    delays = []
+    success, message, attempts = send_otp_email(transport, RECIPIENT, "666666", max_attempts=4, sleep=delays.append)
+    assert success and attempts == 4 and len(delays) == 3
+    assert transport.sent == [(RECIPIENT, "666666")]
+
+def test_connection_errors_give_up_after_max_attempts():
+    from botocore.exceptions import EndpointConnectionError
+    endpoint = "https://email.us-east-1.amazonaws.com"
+    transport = FakeTransport(failures=[EndpointConnectionError(endpoint_url=endpoint) for _ in range(2)])
+    success, message, attempts = send_otp_email(transport, RECIPIENT, "777777", max_attempts=2, sleep=lambda s: None)
+    assert not success and attempts == 2
+    assert message.startswith("Could not reach AWS SES")
+
+class GatedTransport(FakeTransport):
+    """FakeTransport whose sends wait until the test opens the gate"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.gate = threading.Event()
+
+    def send(self, email, otp):
+        self.gate.wait(5)
+        return super().send(email, otp)
+
+def wait_for_outcome(otp_queue, delivery_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        outcome = otp_queue.outcome(delivery_id)
+        if outcome[0] != 'pending':
+            return outcome
+        time.sleep(0.01)
+    raise AssertionError(f"delivery {delivery_id} still pending")
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(transport, **options):
+        otp_queue = OtpSendQueue(transport, sleep=lambda seconds: None, **options)
+        queues.append(otp_queue)
+        return otp_queue
+
+    yield make
+    for otp_queue in queues:
+        otp_queue.shutdown()
+
+def test_queued_delivery_is_sent(make_queue):
+    transport = GatedTransport()
+    otp_queue = make_queue(transport, max_workers=1)
+    issued = []
+    first = otp_queue.submit(RECIPIENT, "111111")
+    second = otp_queue.submit(RECIPIENT, "222222", on_sent=lambda: issued.append("222222"))
+    assert otp_queue.status(second)['state'] == 'queued'
+    assert otp_queue.outcome(second) == ('pending', "")
+    transport.gate.set()
+    state, message = wait_for_outcome(otp_queue, second)
+    assert state == 'sent' and RECIPIENT in message
+    assert otp_queue.status(first)['state'] == 'sent'
+    assert issued == ["222222"]
+    assert transport.sent == [(RECIPIENT, "111111"), (RECIPIENT, "222222")]
+
+def test_throttled_delivery_is_retried_then_sent(make_queue):
+    transport = FakeTransport(failures=[throttling_error(), throttling_error()])
+    otp_queue = make_queue(transport, max_attempts=4)
+    delivery_id = otp_queue.submit(RECIPIENT, "333333")
+    assert wait_for_outcome(otp_queue, delivery_id)[0] == 'sent'
+    assert otp_queue.status(delivery_id)['attempts'] == 3
+
+def test_failed_delivery_reports_the_error(make_queue):
+    transport = FakeTransport(failures=[throttling_error('MessageRejected', "Email address is not verified.")])
+    otp_queue = make_queue(transport)
+    issued = []
+    delivery_id = otp_queue.submit(RECIPIENT, "444444", on_sent=lambda: issued.append("444444"))
+    state, message = wait_for_outcome(otp_queue, delivery_id)
+    assert state == 'failed' and "not verified" in message
+    assert issued == [] and transport.sent == []
+
+def test_failing_on_sent_fails_the_delivery(make_queue):
+    def on_sent():
+        raise OSError("database is locked")
+    otp_queue = make_queue(FakeTransport())
+    state, message = wait_for_outcome(otp_queue, otp_queue.submit(RECIPIENT, "555555", on_sent=on_sent))
+    assert state == 'failed' and "database is locked" in message
+
+def test_unknown_delivery_is_a_failure_not_a_success(make_queue):
+    otp_queue = make_queue(FakeTransport())
+    assert otp_queue.status("not-a-delivery") is None
+    state, message = otp_queue.outcome("not-a-delivery")
+    assert state == 'failed' and "request a new code" in message
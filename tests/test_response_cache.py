@@ -0,0 +1,42 @@
+from response_cache import SemanticResponseCache, hashed_ngram_vector, meaning_guard, normalize_query
+
+def similarity(first, second):
+    return float(hashed_ngram_vector(normalize_query(first)) @ hashed_ngram_vector(normalize_query(second)))
+
+def test_similar_wording_is_served_from_cache():
+    cache = SemanticResponseCache(max_entries=10)
+    cache.put("What does the AniSol crewing module cost per vessel?", "crewing pricing")
+    assert cache.get("what does the anisol crewing module cost per vessel") == "crewing pricing"
+    assert cache.get("What does the AniSol crewing module cost per vessel please?") == "crewing pricing"
+
+def test_different_number_is_not_a_similarity_hit():
+    cached = "What is the monthly license cost of the AniSol crewing module for 10 vessels?"
+    query = "What is the monthly license cost of the AniSol crewing module for 50 vessels?"
+    assert similarity(cached, query) >= 0.92
+    cache = SemanticResponseCache(max_entries=10)
+    cache.put(cached, "pricing for 10 vessels")
+    assert cache.get(query) is None
+    assert cache.get(cached) == "pricing for 10 vessels"
+
+def test_added_negation_is_not_a_similarity_hit():
+    cache = SemanticResponseCache(max_entries=10)
+    for cached, query in [
+        ("Is the AniSol procurement module hosted in the EU and gdpr compliant?",
+         "Is the AniSol procurement module hosted in the EU and not gdpr compliant?"),
+        ("Can the AniSol procurement module be deployed on premise with SSO?",
+         "Can the AniSol procurement module be deployed on premise without SSO?"),
+    ]:
+        assert similarity(cached, query) >= 0.92
+        cache.put(cached, cached)
+        assert cache.get(query) is None
+
+def test_meaning_guard_keeps_numbers_and_negations():
+    assert meaning_guard(normalize_query("Isn't it 10 vessels, not 12?")) == ("10", "12", "not", "t")
+    assert meaning_guard(normalize_query("What does crewing cost?")) == ()
+
+def test_context_separates_entries():
+    cache = SemanticResponseCache(max_entries=10)
+    cache.put("How long does it take?", "crewing timeline", context="history-a")
+    assert cache.get("How long does it take?") is None
+    assert cache.get("How long does it take?", context="history-b") is None
+    assert cache.get("How long does it take?", context="history-a") == "crewing timeline"